@@ -9,10 +9,10 @@ import fnmatch
 import logging
 import markdown
 import os
-import re
 import textwrap
+import time
 
-from multiqc.utils import report, config, util_functions
+from multiqc.utils import report, config, util_functions, cache, sample_name_rules, timing, update
 logger = logging.getLogger(__name__)
 
 class BaseMultiqcModule(object):
@@ -57,11 +57,23 @@ class BaseMultiqcModule(object):
 
         self.sections = list()
 
-    def find_log_files(self, sp_key, filecontents=True, filehandles=False):
+        # Samples from the run being updated, by search pattern key
+        self.previous_samples = dict()
+
+    def find_log_files(self, sp_key, filecontents=True, filehandles=False, filelines=False, parse_cache=False):
         """
         Return matches log files of interest.
         :param sp_key: Search pattern key specified in config
         :param filehandles: Set to true to return a file handle instead of slurped file contents
+        :param filelines: Set to true to return an iterator over the lines of the file, without
+                 line endings, instead of slurped file contents. Lines are read as they are used,
+                 so stop iterating once you have everything you need.
+        :param parse_cache: Set to true to look for data saved with save_parsed_data() on a
+                 previous run. If the file and the module's code haven't changed, the data is
+                 returned as f['parsed'] and the file is not read.
+                 For search keys given to load_previous_samples(), files that were used by the
+                 run being updated (--update-from), and haven't changed since, are skipped and
+                 their samples are added to the module's data instead.
         :return: Yields a dict with filename (fn), root directory (root), cleaned sample name
                  generated from the filename (s_name) and either the file contents or file handle
                  for the current matched file (f).
@@ -90,6 +102,7 @@ class BaseMultiqcModule(object):
             return
 
         for f in report.files[sp_key]:
+            start = time.time()
             # Make a note of the filename so that we can report it if something crashes
             report.last_found_file = os.path.join(f['root'], f['fn'])
 
@@ -109,23 +122,82 @@ class BaseMultiqcModule(object):
                 else:
                     logger.debug("{} - Selecting '{}' as it matched the path_filters for '{}'".format(sp_key, f['fn'], self.name))
 
+            # Use the samples from the run being updated if the file hasn't changed
+            if sp_key in self.previous_samples:
+                data, section, by_source = self.previous_samples[sp_key]
+                source = os.path.abspath(report.last_found_file)
+                if source in by_source and update.previous.is_unchanged(source):
+                    logger.debug("{} - Skipping '{}' as it was parsed by the run being updated".format(sp_key, f['fn']))
+                    for s_name, s_data in by_source[source]:
+                        data[s_name] = s_data
+                        self.add_data_source(s_name=s_name, source=source, section=section)
+                    continue
+
             # Make a sample name from the filename
             f['s_name'] = self.clean_s_name(f['fn'], f['root'])
-            if filehandles or filecontents:
+
+            # Return previously parsed data if the file hasn't changed
+            f.pop('parsed', None)
+            f.pop('parse_cache_key', None)
+            if parse_cache and cache.get_parse_cache() is not None:
+                try:
+                    st = os.stat(report.last_found_file)
+                except (IOError, OSError):
+                    pass
+                else:
+                    f['parse_cache_key'] = cache.ParseCache.make_key(self.__module__, sp_key, report.last_found_file, st, getattr(self, 'parse_cache_version', None))
+                    found, data = cache.parse_cache.get(f['parse_cache_key'], self.name)
+                    if found:
+                        f['parsed'] = data
+                        f['f'] = None
+                        yield f
+                        timing.add_file_time(time.time() - start)
+                        continue
+
+            if filehandles or filelines or filecontents:
                 try:
                     with io.open (os.path.join(f['root'],f['fn']), "r", encoding='utf-8') as fh:
                         if filehandles:
                             f['f'] = fh
                             yield f
+                            timing.add_file_time(time.time() - start)
+                        elif filelines:
+                            f['f'] = self._iter_file_lines(fh, f['fn'])
+                            yield f
+                            timing.add_file_time(time.time() - start)
                         elif filecontents:
                             f['f'] = fh.read()
                             yield f
+                            timing.add_file_time(time.time() - start)
                 except (IOError, OSError, ValueError, UnicodeDecodeError):
                     if config.report_readerrors:
                         logger.debug("Couldn't open filehandle when returning file: {}".format(f['fn']))
                         f['f'] = None
             else:
                 yield f
+                timing.add_file_time(time.time() - start)
+
+    @staticmethod
+    def _iter_file_lines(fh, fn):
+        """ Yield lines from an open file without their line endings.
+        Stops at the first part of the file that can't be decoded. """
+        try:
+            for line in fh:
+                yield line.rstrip('\n')
+        except UnicodeDecodeError:
+            if config.report_readerrors:
+                logger.debug("Couldn't read the rest of file: {}".format(fn))
+
+    def save_parsed_data(self, f, data):
+        """ Save data parsed from a log file, so that it can be returned as
+        f['parsed'] by find_log_files(parse_cache=True) on future runs if
+        the file hasn't changed. Data must be picklable.
+        :param f: File dict yielded by find_log_files(parse_cache=True)
+        :param data: Parsed data for this file
+        :return: None
+        """
+        if f.get('parse_cache_key') is not None and cache.parse_cache is not None:
+            cache.parse_cache.put(f['parse_cache_key'], data, self.name)
 
     def add_section(self, name=None, anchor=None, description='', comment='', helptext='', plot='', content='', autoformat=True, autoformat_type='markdown'):
         """ Add a section to the module report output """
@@ -185,50 +257,7 @@ class BaseMultiqcModule(object):
         :config.prepend_dirs: boolean, whether to prepend dir name to s_name
         :return: The cleaned sample name, ready to be used
         """
-        if root is None:
-            root = ''
-        if config.prepend_dirs:
-            sep = config.prepend_dirs_sep
-            root = root.lstrip('.{}'.format(os.sep))
-            dirs = [d.strip() for d in root.split(os.sep) if d.strip() != '']
-            if config.prepend_dirs_depth != 0:
-                d_idx = config.prepend_dirs_depth * -1
-                if config.prepend_dirs_depth > 0:
-                    dirs = dirs[d_idx:]
-                else:
-                    dirs = dirs[:d_idx]
-            if len(dirs) > 0:
-                s_name = "{}{}{}".format(sep.join(dirs), sep, s_name)
-        if config.fn_clean_sample_names:
-            # Split then take first section to remove everything after these matches
-            for ext in config.fn_clean_exts:
-                if type(ext) is str:
-                    ext = {'type': 'truncate', 'pattern': ext}
-                if ext['type'] == 'truncate':
-                    s_name = os.path.basename(s_name.split(ext['pattern'], 1)[0])
-                elif ext['type'] in ('remove', 'replace'):
-                    if ext['type'] == 'replace':
-                        logger.warning("use 'config.fn_clean_sample_names.remove' instead "
-                                       "of 'config.fn_clean_sample_names.replace' [deprecated]")
-                    s_name = s_name.replace(ext['pattern'], '')
-                elif ext['type'] == 'regex':
-                    s_name = re.sub(ext['pattern'], '', s_name)
-                elif ext['type'] == 'regex_keep':
-                    match = re.search(ext['pattern'], s_name)
-                    s_name = match.group() if match else s_name
-                else:
-                    logger.error('Unrecognised config.fn_clean_exts type: {}'.format(ext['type']))
-            # Trim off characters at the end of names
-            for chrs in config.fn_clean_trim:
-                if s_name.endswith(chrs):
-                    s_name = s_name[:-len(chrs)]
-                if s_name.startswith(chrs):
-                    s_name = s_name[len(chrs):]
-
-        # Remove trailing whitespace
-        s_name = s_name.strip()
-
-        return s_name
+        return sample_name_rules.get_rules().clean(s_name, root)
 
     def ignore_samples(self, data):
         """ Strip out samples which match `sample_names_ignore` """
@@ -239,11 +268,10 @@ class BaseMultiqcModule(object):
                 newdata = dict()
             else:
                 return data
+            # Match ignore glob and regex patterns
+            rules = sample_name_rules.get_rules()
             for k,v in data.items():
-                # Match ignore glob patterns
-                glob_match = any( fnmatch.fnmatch(k, sn) for sn in config.sample_names_ignore )
-                re_match = any( re.match(sn, k) for sn in config.sample_names_ignore_re )
-                if not glob_match and not re_match:
+                if not rules.is_ignored(k):
                     newdata[k] = v
             return newdata
         except (TypeError, AttributeError):
@@ -304,6 +332,27 @@ class BaseMultiqcModule(object):
             logger.warning('Tried to add data source for {}, but was missing fields data'.format(self.name))
 
 
+    def load_previous_samples(self, sp_key, fn, section=None):
+        """ Return a dict to collect parsed samples in, when updating a previous
+        run (--update-from). Files that the run being updated used for this
+        module, and that haven't changed since, are then skipped by
+        find_log_files(sp_key) and the samples that they gave are added to the
+        dict instead, in the same order as if they had been parsed again.
+        Only for data files that hold everything the module needs to make its
+        report sections again.
+        :param sp_key: Search pattern key of the files that the samples come from
+        :param fn: Data file name given to write_data_file()
+        :param section: Data source section, as given to add_data_source()
+        :return: Empty dict, to add samples to before any other changes
+        """
+        data = dict()
+        if update.previous is not None:
+            if section is None:
+                section = 'all_sections'
+            by_source = update.previous.samples_by_source(self.name, section, fn)
+            self.previous_samples[sp_key] = (data, section, by_source)
+        return data
+
     def write_data_file(self, data, fn, sort_cols=False, data_format=None):
         """ Saves raw data to a dictionary for downstream use, then redirects
         to report.write_data_file() to create the file in the report directory """
@@ -25,7 +25,7 @@ class MultiqcModule(BaseMultiqcModule):
         info="is an ultrafast, memory-efficient short read aligner.")
 
         # Find and load any Bowtie reports
-        self.bowtie_data = dict()
+        self.bowtie_data = self.load_previous_samples('bowtie1', 'multiqc_bowtie1')
         for f in self.find_log_files('bowtie1'):
             self.parse_bowtie_logs(f)
 
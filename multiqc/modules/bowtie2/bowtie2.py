@@ -26,7 +26,7 @@ class MultiqcModule(BaseMultiqcModule):
                 " reads to long reference sequences.")
 
         # Find and load any Bowtie 2 reports
-        self.bowtie2_data = dict()
+        self.bowtie2_data = self.load_previous_samples('bowtie2', 'multiqc_bowtie2')
         self.num_se = 0
         self.num_pe = 0
         for f in self.find_log_files('bowtie2', filehandles=True):
@@ -4,6 +4,8 @@
 
 from __future__ import print_function
 from collections import defaultdict, OrderedDict
+import gzip
+import io
 import logging
 import json
 import os
@@ -17,6 +19,9 @@ from multiqc.plots import table, bargraph, linegraph, scatter, heatmap, beeswarm
 # Initialise the logger
 log = logging.getLogger(__name__)
 
+# File types read with pyarrow
+columnar_extensions = ['.parquet', '.feather', '.arrow']
+
 def custom_module_classes():
     """
     MultiQC Custom Content class. This module does a lot of different
@@ -65,11 +70,24 @@ def custom_module_classes():
     bm = BaseMultiqcModule()
     for k in search_patterns:
         num_sp_found_files = 0
-        for f in bm.find_log_files(k):
+        # Files are read here, as they may be compressed or binary
+        for f in bm.find_log_files(k, filecontents=False):
             num_sp_found_files += 1
             # Handle any exception without messing up for remaining custom content files
             try:
-                f_extension = os.path.splitext(f['fn'])[1]
+                f_base, f_extension, compressed = _split_extension(f['fn'])
+
+                # Parquet, Feather and Arrow files have typed columns
+                columnar = None
+                if f_extension in columnar_extensions:
+                    columnar = _read_columnar(f, f_extension)
+                    if columnar is None:
+                        continue
+                    f['f'] = None
+                else:
+                    f['f'] = _read_text(f, compressed)
+                    if f['f'] is None:
+                        continue
 
                 # YAML and JSON files are the easiest
                 parsed_data = None
@@ -104,10 +122,19 @@ def custom_module_classes():
                     else:
                         log.warning("No data found in {}".format(f['fn']))
 
-                # txt, csv, tsv etc
+                # txt, csv, tsv, parquet etc
                 else:
-                    # Look for configuration details in the header
-                    m_config = _find_file_header( f )
+                    # Look for configuration details in a separate config file,
+                    # then in the header or file metadata
+                    if columnar is None:
+                        lines = f['f'].splitlines()
+                        f_config = _find_file_header( f, lines )
+                    else:
+                        rows, f_config = columnar
+                    m_config = _find_config_file( f, f_base )
+                    if f_config is not None:
+                        m_config = m_config or dict()
+                        m_config.update( f_config )
                     s_name = None
                     if m_config is not None:
                         c_id = m_config.get('id', k)
@@ -135,11 +162,16 @@ def custom_module_classes():
                     m_config['files'].update( { s_name : { 'fn': f['fn'], 'root': f['root'] } } )
 
                     # Guess file format if not given
-                    if m_config.get('file_format') is None:
-                        m_config['file_format'] = _guess_file_format( f )
+                    if columnar is not None:
+                        m_config['file_format'] = f_extension[1:]
+                    elif m_config.get('file_format') is None:
+                        m_config['file_format'] = _guess_file_format( f, lines )
                     # Parse data
                     try:
-                        parsed_data, conf = _parse_txt( f, m_config )
+                        if columnar is None:
+                            parsed_data, conf = _parse_txt( f, m_config, lines )
+                        else:
+                            parsed_data, conf = _parse_rows( f, m_config, rows, len(rows) )
                         if parsed_data is None or len(parsed_data) == 0:
                             log.warning("Not able to parse custom data in {}".format(f['fn']))
                         else:
@@ -290,25 +322,123 @@ class MultiqcModule(BaseMultiqcModule):
             log.warning("Error - custom content plot type '{}' not recognised for content ID {}".format(mod['config'].get('plot_type'), c_id))
 
 
-def _find_file_header(f):
-    # Collect commented out header lines
-    hlines = []
-    for l in f['f'].splitlines():
-        if l.startswith('#'):
-            hlines.append(l[1:])
+def _split_extension(fn):
+    """
+    Split a filename into the name without any extensions, the file
+    extension (eg. '.tsv') and whether it is gzipped ('.tsv.gz')
+    """
+    f_base, f_extension = os.path.splitext(fn)
+    compressed = f_extension == '.gz'
+    if compressed:
+        f_base, f_extension = os.path.splitext(f_base)
+    return f_base, f_extension, compressed
+
+def _read_text(f, compressed):
+    """ Return the contents of a text file, decompressing it if gzipped """
+    fn = os.path.join(f['root'], f['fn'])
+    try:
+        if compressed:
+            with gzip.open(fn, 'rb') as fh:
+                return fh.read().decode('utf-8')
+        with io.open(fn, 'r', encoding='utf-8') as fh:
+            return fh.read()
+    except (IOError, OSError, ValueError, UnicodeDecodeError):
+        if config.report_readerrors:
+            log.debug("Couldn't read file: {}".format(f['fn']))
+
+def _read_columnar(f, f_extension):
+    """
+    Read a Parquet, Feather or Arrow IPC file with pyarrow. The column names
+    are used as the header row, and a 'multiqc' key in the schema metadata can
+    hold configuration in YAML or JSON, in the same way as a commented file header.
+    Returns a list of rows, starting with the column names, and the configuration
+    from the metadata.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        log.warning("Could not read '{}' - pyarrow is needed for {} files".format(f['fn'], f_extension[1:]))
+        return None
+    fn = os.path.join(f['root'], f['fn'])
+    try:
+        if f_extension == '.parquet':
+            t = pyarrow.parquet.read_table(fn)
+        elif f_extension == '.feather':
+            t = pyarrow.feather.read_table(fn)
+        else:
+            with pa.OSFile(fn, 'rb') as fh:
+                try:
+                    t = pyarrow.ipc.open_file(fh).read_all()
+                except pa.ArrowInvalid:
+                    # Arrow IPC stream rather than file format
+                    fh.seek(0)
+                    t = pyarrow.ipc.open_stream(fh).read_all()
+
+        # Numeric columns are cast to floats and anything else to strings,
+        # a column at a time. Missing values are left empty, as in a text file.
+        columns = list()
+        for col in t.columns:
+            if pa.types.is_integer(col.type) or pa.types.is_floating(col.type) or pa.types.is_boolean(col.type):
+                col = col.cast(pa.float64())
+            elif not pa.types.is_string(col.type):
+                col = col.cast(pa.string())
+            values = col.to_pylist()
+            if col.null_count > 0:
+                values = [ '' if v is None else v for v in values ]
+            columns.append(values)
+    except (IOError, OSError, pa.ArrowException) as e:
+        log.warning("Could not read '{}': {}".format(f['fn'], e))
+        return None
+    rows = [ list(t.column_names) ]
+    rows.extend( zip(*columns) )
+
+    mconfig = None
+    metadata = t.schema.metadata or dict()
+    if b'multiqc' in metadata:
+        mconfig = _load_config(metadata[b'multiqc'].decode('utf-8'), f, 'file metadata')
+    return rows, mconfig
+
+def _load_config(s, f, source):
+    """ Parse YAML (or JSON) configuration for a custom content file """
     hconfig = None
     try:
-        hconfig = yaml.load("\n".join(hlines))
+        hconfig = yaml.load(s)
         assert(isinstance(hconfig, dict))
     except yaml.YAMLError as e:
-        log.warn("Could not parse comment file header for MultiQC custom content: {}".format(f['fn']))
+        log.warn("Could not parse {} for MultiQC custom content: {}".format(source, f['fn']))
         log.debug(e)
     except AssertionError:
-        log.debug("Custom Content comment file header looked wrong: {}".format(hconfig))
+        log.debug("Custom Content {} looked wrong: {}".format(source, hconfig))
     else:
         return hconfig
 
-def _guess_file_format(f):
+def _find_file_header(f, lines):
+    # Collect commented out header lines
+    hlines = []
+    for l in lines:
+        if l.startswith('#'):
+            hlines.append(l[1:])
+    return _load_config("\n".join(hlines), f, 'comment file header')
+
+def _find_config_file(f, f_base):
+    """
+    Look for configuration in a YAML file next to a data file, named
+    after the data file without its extensions, eg. 'mydata_mqc_config.yaml'
+    for 'mydata_mqc.tsv.gz'. Returns a new dict, or None if there isn't one.
+    """
+    fn = os.path.join(f['root'], '{}_config.yaml'.format(f_base))
+    if not os.path.isfile(fn):
+        return None
+    try:
+        with io.open(fn, 'r', encoding='utf-8') as fh:
+            return _load_config(fh.read(), f, 'config file {}'.format(os.path.basename(fn)))
+    except (IOError, OSError, UnicodeDecodeError):
+        log.warning("Could not read custom content config file: {}".format(fn))
+
+def _guess_file_format(f, lines):
     """
     Tries to guess file format, first based on file extension (csv / tsv),
     then by looking for common column separators in the first 10 non-commented lines.
@@ -322,7 +452,7 @@ def _guess_file_format(f):
     commas = []
     spaces = []
     j = 0
-    for l in f['f'].splitlines():
+    for l in lines:
         if not l.startswith('#'):
             j += 1
             tabs.append(len(l.split("\t")))
@@ -355,14 +485,35 @@ def _guess_file_format(f):
                     return 'csv'
     return 'spaces'
 
-def _parse_txt(f, conf):
+def _to_float(v):
+    """ Convert a value to a float if it's a number, otherwise strip any quotes """
+    try:
+        return float(v)
+    except ValueError:
+        if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
+            v = v[1:-1]
+        return v
+
+def _convert_row(values):
+    """
+    Convert a row of values to floats where possible. The first value (usually
+    a sample name) is converted on its own and the rest in one go, only falling
+    back to one value at a time if some aren't numbers.
+    Returns the row and whether all values after the first are floats.
+    """
+    first = _to_float(values[0])
+    try:
+        return [first] + list(map(float, values[1:])), True
+    except ValueError:
+        return [first] + [ _to_float(v) for v in values[1:] ], False
+
+def _parse_txt(f, conf, lines):
     # Split the data into a list of lists by column
     sep = None
     if conf['file_format'] == 'csv':
         sep = ","
     if conf['file_format'] == 'tsv':
         sep = "\t"
-    lines = f['f'].splitlines()
     d = []
 
     # Check for special case - HTML
@@ -383,54 +534,55 @@ def _parse_txt(f, conf):
             elif ncols != len(sections):
                 log.warn("Inconsistent number of columns found in {}! Skipping..".format(f['fn']))
                 return (None, conf)
+    if len(d) == 0:
+        return (None, conf)
+    return _parse_rows(f, conf, d, len(lines))
 
-    # Convert values to floats if we can
-    first_row_str = 0
-    for i,l in enumerate(d):
-        for j, v in enumerate(l):
-            try:
-                d[i][j] = float(v)
-            except ValueError:
-                if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
-                    v = v[1:-1]
-                d[i][j] = v
-                # Count strings in first row (header?)
-                if i == 0:
-                    first_row_str += 1
+def _parse_rows(f, conf, rows, num_lines):
+    """
+    Convert values to floats, work out the plot type and build the plot data.
+    :param rows: List of rows of values (strings, or numbers from a columnar file)
+    :param num_lines: Number of lines in the file, including comments
+    """
+    # Count strings in first row (header?)
+    d0 = [ _to_float(v) for v in rows[0] ]
+    first_row_str = len([ v for v in d0 if type(v) != float ])
+    d = [ d0 ]
+
+    # Convert the other rows, noting which are numeric after the first column
+    numeric = list()
+    for r in rows[1:]:
+        values, all_floats = _convert_row(r)
+        d.append(values)
+        numeric.append(all_floats)
 
-    all_numeric = all([ type(l) == float for l in d[i][1:] for i in range(1, len(d)) ])
+    all_numeric = numeric[-1] if len(numeric) > 0 else True
 
     # Heatmap: Number of headers == number of lines
-    if conf.get('plot_type') is None and first_row_str == len(lines) and all_numeric:
+    if conf.get('plot_type') is None and first_row_str == num_lines and all_numeric:
         conf['plot_type'] = 'heatmap'
     if conf.get('plot_type') == 'heatmap':
-        conf['xcats'] = d[0][1:]
+        conf['xcats'] = d0[1:]
         conf['ycats'] = [s[0] for s in d[1:]]
         data = [s[1:] for s in d[1:]]
         return (data, conf)
 
     # Header row of strings, or configured as table
-    if first_row_str == len(d[0]) or conf.get('plot_type') == 'table':
+    if first_row_str == len(d0) or conf.get('plot_type') == 'table':
+        cats = [ str(c) for c in d0[1:] ]
         data = OrderedDict()
         for s in d[1:]:
-            data[s[0]] = OrderedDict()
-            for i, v in enumerate(s[1:]):
-                cat = str(d[0][i+1])
-                data[s[0]][cat] = v
+            data[s[0]] = OrderedDict(zip(cats, s[1:]))
         # Bar graph or table - if numeric data, go for bar graph
         if conf.get('plot_type') is None:
-            allfloats = True
-            for r in d[1:]:
-                for v in r[1:]:
-                    allfloats = allfloats and type(v) == float
-            if allfloats:
+            if all(numeric):
                 conf['plot_type'] = 'bargraph'
             else:
                 conf['plot_type'] = 'table'
         # Set table col_1 header
-        if conf.get('plot_type') == 'table' and d[0][0].strip() != '':
+        if conf.get('plot_type') == 'table' and d0[0].strip() != '':
             conf['pconfig'] = conf.get('pconfig', {})
-            conf['pconfig']['col1_header'] = d[0][0].strip()
+            conf['pconfig']['col1_header'] = d0[0].strip()
         # Return parsed data
         if conf.get('plot_type') == 'bargraph' or conf.get('plot_type') == 'table':
             return (data, conf)
@@ -438,8 +590,8 @@ def _parse_txt(f, conf):
             data = OrderedDict() # reset
 
     # Scatter plot: First row is  str : num : num
-    if (conf.get('plot_type') is None and len(d[0]) == 3 and
-        type(d[0][0]) != float and type(d[0][1]) == float and type(d[0][2]) == float):
+    if (conf.get('plot_type') is None and len(d0) == 3 and
+        type(d0[0]) != float and type(d0[1]) == float and type(d0[2]) == float):
         conf['plot_type'] = 'scatter'
 
     if conf.get('plot_type') == 'scatter':
@@ -455,12 +607,12 @@ def _parse_txt(f, conf):
         return (data, conf)
 
     # Single sample line / bar graph - first row has two columns
-    if len(d[0]) == 2:
+    if len(d0) == 2:
         # Line graph - num : num
-        if (conf.get('plot_type') is None and type(d[0][0]) == float and type(d[0][1]) == float):
+        if (conf.get('plot_type') is None and type(d0[0]) == float and type(d0[1]) == float):
             conf['plot_type'] = 'linegraph'
         # Bar graph - str : num
-        if (conf.get('plot_type') is None and type(d[0][0]) != float and type(d[0][1]) == float):
+        if (conf.get('plot_type') is None and type(d0[0]) != float and type(d0[1]) == float):
             conf['plot_type'] = 'bargraph'
 
         # Data structure is the same
@@ -468,23 +620,19 @@ def _parse_txt(f, conf):
             # Set section id based on directory if not known
             if conf.get('id') is None:
                 conf['id'] = os.path.basename(f['root'])
-            data = OrderedDict()
-            for s in d:
-                data[s[0]] = s[1]
+            data = OrderedDict( (s[0], s[1]) for s in d )
             return ( { f['s_name']: data }, conf )
 
     # Multi-sample line graph: No header row, str : lots of num columns
-    if conf.get('plot_type') is None and len(d[0]) > 4 and all_numeric:
+    if conf.get('plot_type') is None and len(d0) > 4 and all_numeric:
         conf['plot_type'] = 'linegraph'
 
     if conf.get('plot_type') == 'linegraph':
-        data = dict()
         # Use 1..n range for x values
+        xvals = list(range(1, len(d0)))
+        data = dict()
         for s in d:
-            data[s[0]] = dict()
-            for i,v in enumerate(s[1:]):
-                j = i+1
-                data[s[0]][i+1] = v
+            data[s[0]] = dict(zip(xvals, s[1:]))
         return (data, conf)
 
     # Got to the end and haven't returned. It's a mystery, capn'!
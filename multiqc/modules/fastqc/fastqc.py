@@ -39,12 +39,15 @@ class MultiqcModule(BaseMultiqcModule):
         self.fastqc_data = dict()
 
         # Find and parse unzipped FastQC reports
-        for f in self.find_log_files('fastqc/data'):
+        for f in self.find_log_files('fastqc/data', parse_cache=True):
             s_name = self.clean_s_name(os.path.basename(f['root']), os.path.dirname(f['root']))
-            self.parse_fastqc_report(f['f'], s_name, f)
+            if 'parsed' not in f:
+                f['parsed'] = self.parse_fastqc_data(f['f'])
+                self.save_parsed_data(f, f['parsed'])
+            self.add_fastqc_report(f['parsed'], s_name, f)
 
         # Find and parse zipped FastQC reports
-        for f in self.find_log_files('fastqc/zip', filecontents=False):
+        for f in self.find_log_files('fastqc/zip', filecontents=False, parse_cache=True):
             s_name = f['fn']
             if s_name.endswith('_fastqc.zip'):
                 s_name = s_name[:-11]
@@ -52,6 +55,10 @@ class MultiqcModule(BaseMultiqcModule):
             if s_name in self.fastqc_data.keys():
                 log.debug("Skipping '{}' as already parsed '{}'".format(f['fn'], s_name))
                 continue
+            # Use the parsed data from a previous run if the zip file hasn't changed
+            if 'parsed' in f:
+                self.add_fastqc_report(f['parsed'], s_name, f)
+                continue
             try:
                 fqc_zip = zipfile.ZipFile(os.path.join(f['root'], f['fn']))
             except Exception as e:
@@ -63,7 +70,9 @@ class MultiqcModule(BaseMultiqcModule):
             try:
                 with fqc_zip.open(os.path.join(d_name, 'fastqc_data.txt')) as fh:
                     r_data = fh.read().decode('utf8')
-                    self.parse_fastqc_report(r_data, s_name, f)
+                    parsed = self.parse_fastqc_data(r_data)
+                    self.save_parsed_data(f, parsed)
+                    self.add_fastqc_report(parsed, s_name, f)
             except KeyError:
                 log.warning("Error - can't find fastqc_raw_data.txt in {}".format(f))
 
@@ -115,23 +124,27 @@ class MultiqcModule(BaseMultiqcModule):
 
     def parse_fastqc_report(self, file_contents, s_name=None, f=None):
         """ Takes contents from a fastq_data.txt file and parses out required
-        statistics and data. Returns a dict with keys 'stats' and 'data'.
-        Data is for plotting graphs, stats are for top table. """
+        statistics and data. Results are saved to self.fastqc_data. """
+        self.add_fastqc_report(self.parse_fastqc_data(file_contents), s_name, f)
 
-        # Make the sample name from the input filename if we find it
-        fn_search = re.search(r"Filename\s+(.+)", file_contents)
-        if fn_search:
-            s_name = self.clean_s_name(fn_search.group(1) , f['root'])
+    def parse_fastqc_data(self, file_contents):
+        """ Parse the contents of a fastqc_data.txt file. Does not depend on
+        the sample name, so the results can be saved in the parse cache.
+        Returns a dict with the Filename from the report ('filename'), the
+        parsed data ('data') and the order of duplication keys ('dup_keys'). """
 
-        if s_name in self.fastqc_data.keys():
-            log.debug("Duplicate sample name found! Overwriting: {}".format(s_name))
-        self.add_data_source(f, s_name)
-        self.fastqc_data[s_name] = { 'statuses': dict() }
+        # Get the input filename if we find it
+        fn_search = re.search(r"Filename\s+(.+)", file_contents)
+        parsed = {
+            'filename': fn_search.group(1) if fn_search else None,
+            'data': { 'statuses': dict() },
+            'dup_keys': []
+        }
+        data = parsed['data']
 
         # Parse the report
         section = None
         s_headers = None
-        self.dup_keys = []
         for l in file_contents.splitlines():
             if l == '>>END_MODULE':
                 section = None
@@ -139,13 +152,13 @@ class MultiqcModule(BaseMultiqcModule):
             elif l.startswith('>>'):
                 (section, status) = l[2:].split("\t", 1)
                 section = section.lower().replace(' ', '_')
-                self.fastqc_data[s_name]['statuses'][section] = status
+                data['statuses'][section] = status
             elif section is not None:
                 if l.startswith('#'):
                     s_headers = l[1:].split("\t")
                     # Special case: Total Deduplicated Percentage header line
                     if s_headers[0] == 'Total Deduplicated Percentage':
-                        self.fastqc_data[s_name]['basic_statistics'].append({
+                        data['basic_statistics'].append({
                             'measure': 'total_deduplicated_percentage',
                             'value': float(s_headers[1])
                         })
@@ -154,7 +167,7 @@ class MultiqcModule(BaseMultiqcModule):
                         if s_headers[1] == 'Relative count':
                             s_headers[1] = 'Percentage of total'
                         s_headers = [s.lower().replace(' ', '_') for s in s_headers]
-                        self.fastqc_data[s_name][section] = list()
+                        data[section] = list()
 
                 elif s_headers is not None:
                     s = l.split("\t")
@@ -166,25 +179,40 @@ class MultiqcModule(BaseMultiqcModule):
                         except ValueError:
                             pass
                         row[s_headers[i]] = v
-                    self.fastqc_data[s_name][section].append(row)
+                    data[section].append(row)
                     # Special case - need to remember order of duplication keys
                     if section == 'sequence_duplication_levels':
                         try:
-                            self.dup_keys.append(float(s[0]))
+                            parsed['dup_keys'].append(float(s[0]))
                         except ValueError:
-                            self.dup_keys.append(s[0])
+                            parsed['dup_keys'].append(s[0])
 
         # Tidy up the Basic Stats
-        self.fastqc_data[s_name]['basic_statistics'] = {d['measure']: d['value'] for d in self.fastqc_data[s_name]['basic_statistics']}
+        data['basic_statistics'] = {d['measure']: d['value'] for d in data['basic_statistics']}
 
         # Calculate the average sequence length (Basic Statistics gives a range)
         length_bp = 0
         total_count = 0
-        for d in self.fastqc_data[s_name].get('sequence_length_distribution', {}):
+        for d in data.get('sequence_length_distribution', {}):
             length_bp += d['count'] * self.avg_bp_from_range(d['length'])
             total_count += d['count']
         if total_count > 0:
-            self.fastqc_data[s_name]['basic_statistics']['avg_sequence_length'] = length_bp / total_count
+            data['basic_statistics']['avg_sequence_length'] = length_bp / total_count
+
+        return parsed
+
+    def add_fastqc_report(self, parsed, s_name=None, f=None):
+        """ Save a report parsed by parse_fastqc_data() to self.fastqc_data """
+
+        # Make the sample name from the input filename if we find it
+        if parsed['filename'] is not None:
+            s_name = self.clean_s_name(parsed['filename'], f['root'])
+
+        if s_name in self.fastqc_data.keys():
+            log.debug("Duplicate sample name found! Overwriting: {}".format(s_name))
+        self.add_data_source(f, s_name)
+        self.fastqc_data[s_name] = parsed['data']
+        self.dup_keys = parsed['dup_keys']
 
     def fastqc_general_stats(self):
         """ Add some single-number stats to the basic statistics
@@ -26,10 +26,15 @@ class MultiqcModule(BaseMultiqcModule):
         " promoter, gene bodies, genomic bins and chromosomal locations.")
 
         # Find and load any featureCounts reports
-        self.featurecounts_data = dict()
+        self.featurecounts_data = self.load_previous_samples('featurecounts', 'multiqc_featureCounts')
         self.featurecounts_keys = list()
         for f in self.find_log_files('featurecounts'):
             self.parse_featurecounts_report(f)
+        # Keys of samples from the run being updated
+        for data in self.featurecounts_data.values():
+            for k in data:
+                if k not in self.featurecounts_keys and k not in ['Total', 'percent_assigned']:
+                    self.featurecounts_keys.append(k)
 
         # Filter to strip out ignored sample names
         self.featurecounts_data = self.ignore_samples(self.featurecounts_data)
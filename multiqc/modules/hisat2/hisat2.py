@@ -27,7 +27,7 @@ class MultiqcModule(BaseMultiqcModule):
              "population of reference genomes.")
 
         # Find and load any HISAT2 reports
-        self.hisat2_data = dict()
+        self.hisat2_data = self.load_previous_samples('hisat2', 'multiqc_hisat2')
         for f in self.find_log_files('hisat2', filehandles=True):
             self.parse_hisat2_logs(f)
 
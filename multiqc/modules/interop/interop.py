@@ -2,11 +2,15 @@ from multiqc.modules.base_module import BaseMultiqcModule
 import logging
 import os
 import csv
+import struct
 from collections import OrderedDict
+from xml.etree import ElementTree
 from multiqc import config
 from multiqc.plots import table
 import re
 
+from . import interop_bin
+
 log = logging.getLogger(__name__)
 
 class MultiqcModule(BaseMultiqcModule):
@@ -29,6 +33,24 @@ class MultiqcModule(BaseMultiqcModule):
             parsed_data = self.parse_index_summary_csv(f['f'])
             if max(len(parsed_data['summary']), len(parsed_data['details'])) > 0:
                 self.indexSummary[f['s_name']] = parsed_data
+        # Binary InterOp files in run folders
+        for f in self.find_log_files('interop/runinfo'):
+            interop_dir = os.path.join(f['root'], 'InterOp')
+            if not os.path.isdir(interop_dir):
+                continue
+            run_dir = os.path.abspath(f['root'])
+            s_name = self.clean_s_name(os.path.basename(run_dir), os.path.dirname(f['root']))
+            try:
+                run_summary, index_summary = interop_bin.parse_run(f['f'], interop_dir)
+            except (IOError, ValueError, struct.error, ElementTree.ParseError) as e:
+                log.warning("Could not read InterOp files for {}: {}".format(os.path.join(f['root'], f['fn']), e))
+                continue
+            if max(len(run_summary['summary']), len(run_summary['details'])) > 0:
+                if s_name in self.runSummary:
+                    log.debug("Duplicate sample name found! Overwriting: {}".format(s_name))
+                self.runSummary[s_name] = run_summary
+            if max(len(index_summary['summary']), len(index_summary['details'])) > 0:
+                self.indexSummary[s_name] = index_summary
 
         # No samples
         if max(len(self.runSummary), len(self.indexSummary)) == 0:
@@ -0,0 +1,546 @@
+#!/usr/bin/env python
+
+""" Read the binary InterOp metric files that Illumina RTA writes to the
+InterOp directory of a run folder, and summarise them in to the same tables
+that the InterOp `summary` and `index-summary` tools give. Fixed size records
+are read with NumPy structured dtypes from memory-mapped files, so that big
+NovaSeq runs can be summarised without a Python loop over every record. """
+
+from __future__ import division
+from collections import OrderedDict, defaultdict
+import logging
+import os
+import struct
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Records to read at once from the larger metric files
+chunk_size = 1000000
+
+# Tile metric codes (TileMetricsOut.bin version 2)
+TILE_DENSITY = 100
+TILE_CLUSTERS = 102
+TILE_CLUSTERS_PF = 103
+TILE_PHASING = 200
+TILE_PREPHASING = 201
+TILE_ALIGNED = 300
+
+# Error rates are also summarised over the first cycles of each read
+error_cycle_limits = [35, 75, 100]
+
+
+def parse_run(runinfo, interop_dir):
+    """ Summarise the InterOp files of one sequencing run
+    :param runinfo: Contents of the RunInfo.xml file of the run
+    :param interop_dir: Path to the InterOp directory of the run
+    :return: Run summary and index summary, laid out in the same way as
+             parse_summary_csv() and parse_index_summary_csv() in the interop module
+    """
+    reads = parse_run_info(runinfo)
+    cycles = CycleMap(reads)
+    tiles = read_metrics(interop_dir, 'TileMetricsOut.bin', read_tile_metrics, len(reads))
+    errors = read_metrics(interop_dir, 'ErrorMetricsOut.bin', read_error_metrics, cycles)
+    quality = read_metrics(interop_dir, 'QMetricsOut.bin', read_quality_metrics, cycles)
+    intensity = read_metrics(interop_dir, 'ExtractionMetricsOut.bin', read_extraction_metrics, cycles)
+    index = read_metrics(interop_dir, 'IndexMetricsOut.bin', read_index_metrics)
+    run_summary = summarise_run(reads, tiles, errors, quality, intensity)
+    index_summary = summarise_index(tiles, index)
+    return run_summary, index_summary
+
+
+def parse_run_info(runinfo):
+    """ Get the reads of a run from the contents of RunInfo.xml
+    :return: List of dicts with the read name, number of cycles and whether it's an index read
+    """
+    reads = list()
+    root = ET.fromstring(runinfo.encode('utf-8') if not isinstance(runinfo, bytes) else runinfo)
+    for r in root.iter('Read'):
+        reads.append({
+            'number': int(r.get('Number')),
+            'cycles': int(r.get('NumCycles')),
+            'is_index': r.get('IsIndexedRead', 'N').upper() == 'Y'
+        })
+    reads.sort(key=lambda r: r['number'])
+    for r in reads:
+        r['name'] = 'Read {}{}'.format(r['number'], ' (I)' if r['is_index'] else '')
+    return reads
+
+
+class CycleMap(object):
+    """ Lookup arrays from cycle number to read and cycle within the read.
+    The last cycle of each read is left out of quality and error summaries,
+    in the same way as the InterOp summary tool does. """
+
+    def __init__(self, reads):
+        self.nreads = len(reads)
+        total = sum(r['cycles'] for r in reads)
+        # Index 0 and anything after the last cycle map to no read
+        self.read = np.full(total + 2, -1, dtype=np.int64)
+        self.usable_read = np.full(total + 2, -1, dtype=np.int64)
+        self.offset = np.full(total + 2, -1, dtype=np.int64)
+        self.first_cycles = list()
+        self.usable_cycles = list()
+        cycle = 1
+        for i, r in enumerate(reads):
+            self.read[cycle:cycle + r['cycles']] = i
+            self.usable_read[cycle:cycle + r['cycles'] - 1] = i
+            self.offset[cycle:cycle + r['cycles']] = np.arange(r['cycles'])
+            self.first_cycles.append(cycle)
+            self.usable_cycles.append(max(r['cycles'] - 1, 0))
+            cycle += r['cycles']
+
+    def lookup(self, lookup, cycles):
+        """ Look up cycle numbers in one of the arrays, with -1 for cycles outside the run """
+        return lookup[np.clip(cycles, 0, len(lookup) - 1)]
+
+
+def read_metrics(interop_dir, fn, reader, *args):
+    """ Read one InterOp file if it exists, logging instead of failing if it can't be read """
+    path = os.path.join(interop_dir, fn)
+    if not os.path.isfile(path):
+        return None
+    try:
+        return reader(path, *args)
+    except (ValueError, IOError, OSError, struct.error) as e:
+        log.warning("Could not read InterOp file {}: {}".format(path, e))
+        return None
+
+
+def _read_header(path, size):
+    """ Return the first bytes of a file as a tuple of unsigned bytes """
+    with open(path, 'rb') as fh:
+        header = bytearray(fh.read(size))
+    if len(header) < size:
+        raise ValueError("file is truncated")
+    return tuple(header)
+
+
+def _records(path, dtype, offset):
+    """ Memory-map the fixed size records of a metric file
+    :param dtype: NumPy structured dtype of one record
+    :param offset: Size of the file header in bytes
+    """
+    num = (os.path.getsize(path) - offset) // dtype.itemsize
+    if num <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(num,))
+
+
+def _tile_keys(lanes, tiles):
+    """ Combine lane and tile numbers in to one integer per tile """
+    return (lanes.astype(np.uint64) << np.uint64(32)) | tiles.astype(np.uint64)
+
+
+def _key_lanes(keys):
+    """ Return the lane numbers of tile keys """
+    return (keys >> np.uint64(32)).astype(np.int64)
+
+
+def _group_mean(values, groups, ngroups):
+    """ Mean of the values in each group, leaving out NaN.
+    :param values: Array with one row per tile
+    :param groups: Group number for each tile
+    :param ngroups: Number of groups
+    :return: Array with one row per group, NaN for groups without values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ok = ~np.isnan(values)
+    sums = np.zeros((ngroups,) + values.shape[1:])
+    counts = np.zeros((ngroups,) + values.shape[1:])
+    np.add.at(sums, groups, np.where(ok, values, 0))
+    np.add.at(counts, groups, ok)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def read_tile_metrics(path, nreads):
+    """ Read TileMetricsOut.bin (versions 2 and 3)
+    :return: Dict with tile keys and arrays of per-tile values. Phasing,
+             prephasing and aligned have one column per read.
+    """
+    header = _read_header(path, 2)
+    version = header[0]
+    if version == 2:
+        dtype = np.dtype([('lane', '<u2'), ('tile', '<u2'), ('code', '<u2'), ('value', '<f4')])
+        rec = _records(path, dtype, 2)
+        keys = _tile_keys(rec['lane'], rec['tile'])
+        tiles, inv = np.unique(keys, return_inverse=True)
+        codes = np.asarray(rec['code'])
+        values = np.asarray(rec['value'], dtype=np.float64)
+
+        def by_code(code):
+            out = np.full(len(tiles), np.nan)
+            m = codes == code
+            out[inv[m]] = values[m]
+            return out
+
+        metrics = {
+            'tiles': tiles,
+            'density': by_code(TILE_DENSITY),
+            'clusters': by_code(TILE_CLUSTERS),
+            'clusters_pf': by_code(TILE_CLUSTERS_PF),
+            'phasing': np.column_stack([by_code(TILE_PHASING + 2 * r) * 100 for r in range(nreads)]),
+            'prephasing': np.column_stack([by_code(TILE_PREPHASING + 2 * r) * 100 for r in range(nreads)]),
+            'aligned': np.column_stack([by_code(TILE_ALIGNED + r) for r in range(nreads)])
+        }
+    elif version == 3:
+        # Records are either tile cluster counts ('t') or read percent aligned ('r')
+        with open(path, 'rb') as fh:
+            fh.seek(2)
+            area = struct.unpack('<f', fh.read(4))[0]
+        dtype = np.dtype({
+            'names': ['lane', 'tile', 'code', 'value1', 'read', 'value2'],
+            'formats': ['<u2', '<u4', 'u1', '<f4', '<u4', '<f4'],
+            'offsets': [0, 2, 6, 7, 7, 11],
+            'itemsize': header[1]
+        })
+        rec = _records(path, dtype, 6)
+        keys = _tile_keys(rec['lane'], rec['tile'])
+        tiles, inv = np.unique(keys, return_inverse=True)
+        codes = np.asarray(rec['code'])
+        t = codes == ord('t')
+        r = (codes == ord('r')) & (rec['read'] >= 1) & (rec['read'] <= nreads)
+        clusters = np.full(len(tiles), np.nan)
+        clusters_pf = np.full(len(tiles), np.nan)
+        clusters[inv[t]] = rec['value1'][t]
+        clusters_pf[inv[t]] = rec['value2'][t]
+        aligned = np.full((len(tiles), nreads), np.nan)
+        aligned[inv[r], rec['read'][r].astype(np.int64) - 1] = rec['value2'][r]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            density = clusters / area if area > 0 else np.full(len(tiles), np.nan)
+        # Phasing is in EmpiricalPhasingMetricsOut.bin for these runs
+        metrics = {
+            'tiles': tiles,
+            'density': density,
+            'clusters': clusters,
+            'clusters_pf': clusters_pf,
+            'phasing': np.full((len(tiles), nreads), np.nan),
+            'prephasing': np.full((len(tiles), nreads), np.nan),
+            'aligned': aligned
+        }
+    else:
+        raise ValueError("unsupported tile metrics version {}".format(version))
+    metrics['lanes'] = _key_lanes(metrics['tiles'])
+    return metrics
+
+
+def read_error_metrics(path, cycles):
+    """ Read ErrorMetricsOut.bin (versions 3 to 5). The error rate of each tile
+    is the mean over the usable cycles of each read.
+    :return: Dict with tile keys, error rate arrays with one column per read
+             (also for the first cycles in error_cycle_limits) and the number of
+             cycles with error rates in each lane and read
+    """
+    version, record_size = _read_header(path, 2)
+    header_size = 2
+    if version == 3:
+        tile_fmt = '<u2'
+    elif version == 4:
+        tile_fmt = '<u4'
+    elif version == 5:
+        # Header also has the number of adapter rates after the error rate of each record
+        tile_fmt = '<u4'
+        header_size = 4
+    else:
+        raise ValueError("unsupported error metrics version {}".format(version))
+    tile_size = np.dtype(tile_fmt).itemsize
+    dtype = np.dtype({
+        'names': ['lane', 'tile', 'cycle', 'error'],
+        'formats': ['<u2', tile_fmt, '<u2', '<f4'],
+        'offsets': [0, 2, 2 + tile_size, 4 + tile_size],
+        'itemsize': record_size
+    })
+    rec = _records(path, dtype, header_size)
+    keys = _tile_keys(rec['lane'], rec['tile'])
+    read = cycles.lookup(cycles.usable_read, rec['cycle'])
+    offset = cycles.lookup(cycles.offset, rec['cycle'])
+    error = np.asarray(rec['error'], dtype=np.float64)
+    ok = (read >= 0) & ~np.isnan(error)
+    tiles, inv = np.unique(keys[ok], return_inverse=True)
+    read, offset, error, cycle = read[ok], offset[ok], error[ok], np.asarray(rec['cycle'])[ok]
+    nreads = cycles.nreads
+
+    def tile_means(mask):
+        idx = inv[mask] * nreads + read[mask]
+        sums = np.bincount(idx, weights=error[mask], minlength=len(tiles) * nreads)
+        counts = np.bincount(idx, minlength=len(tiles) * nreads)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (sums / counts).reshape(len(tiles), nreads)
+
+    metrics = {
+        'tiles': tiles,
+        'lanes': _key_lanes(tiles),
+        'error': tile_means(np.ones(len(read), dtype=bool))
+    }
+    for limit in error_cycle_limits:
+        means = tile_means(offset < limit)
+        # Only summarise reads that are long enough
+        for r in range(nreads):
+            if cycles.usable_cycles[r] < limit:
+                means[:, r] = np.nan
+        metrics['error_{}'.format(limit)] = means
+
+    # Number of cycles with error rates for each lane and read
+    lane_read = _key_lanes(keys[ok]) * nreads + read
+    cycle_counts = defaultdict(int)
+    for lr in np.unique(lane_read):
+        cycle_counts[divmod(int(lr), nreads)] = len(np.unique(cycle[lane_read == lr]))
+    metrics['cycles'] = cycle_counts
+    return metrics
+
+
+def read_quality_metrics(path, cycles):
+    """ Read QMetricsOut.bin (versions 4 to 7)
+    :return: Dict of (lane, read index): [number of bases, number of bases >= Q30],
+             counting the usable cycles of each read
+    """
+    header = _read_header(path, 3)
+    version, record_size = header[0], header[1]
+    header_size = 2
+    q30 = np.arange(1, 51) >= 30
+    if version >= 5:
+        header_size = 3
+        if header[2] == 1:
+            nbins = _read_header(path, 4)[3]
+            bins = _read_header(path, 4 + 3 * nbins)
+            remapped = np.array(bins[4 + 2 * nbins:4 + 3 * nbins])
+            header_size = 4 + 3 * nbins
+            if version >= 6:
+                # Histograms only have the binned scores
+                q30 = remapped >= 30
+    if version in (4, 5, 6):
+        tile_fmt = '<u2'
+    elif version == 7:
+        tile_fmt = '<u4'
+    else:
+        raise ValueError("unsupported quality metrics version {}".format(version))
+    tile_size = np.dtype(tile_fmt).itemsize
+    hist_size = (record_size - 4 - tile_size) // 4
+    if hist_size != len(q30):
+        raise ValueError("record size {} does not match {} quality bins".format(record_size, len(q30)))
+    dtype = np.dtype({
+        'names': ['lane', 'tile', 'cycle', 'hist'],
+        'formats': ['<u2', tile_fmt, '<u2', ('<u4', hist_size)],
+        'offsets': [0, 2, 2 + tile_size, 4 + tile_size],
+        'itemsize': record_size
+    })
+    rec = _records(path, dtype, header_size)
+    nreads = cycles.nreads
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for start in range(0, len(rec), chunk_size):
+        chunk = rec[start:start + chunk_size]
+        read = cycles.lookup(cycles.usable_read, chunk['cycle'])
+        ok = read >= 0
+        hist = chunk['hist'][ok]
+        groups = chunk['lane'][ok].astype(np.int64) * nreads + read[ok]
+        bases = np.bincount(groups, weights=hist.sum(axis=1, dtype=np.uint64).astype(np.float64))
+        bases_q30 = np.bincount(groups, weights=hist[:, q30].sum(axis=1, dtype=np.uint64).astype(np.float64))
+        for g in np.nonzero(bases)[0]:
+            t = totals[divmod(int(g), nreads)]
+            t[0] += bases[g]
+            t[1] += bases_q30[g]
+    return dict(totals)
+
+
+def read_extraction_metrics(path, cycles):
+    """ Read ExtractionMetricsOut.bin (versions 2 and 3)
+    :return: Dict with tile keys and the intensity of the first channel
+             at the first cycle of each read, with one column per read
+    """
+    header = _read_header(path, 2)
+    version, record_size = header
+    if version == 2:
+        nchannels = 4
+        tile_fmt = '<u2'
+        header_size = 2
+    elif version == 3:
+        nchannels = _read_header(path, 3)[2]
+        tile_fmt = '<u4'
+        header_size = 3
+    else:
+        raise ValueError("unsupported extraction metrics version {}".format(version))
+    tile_size = np.dtype(tile_fmt).itemsize
+    dtype = np.dtype({
+        'names': ['lane', 'tile', 'cycle', 'intensity'],
+        'formats': ['<u2', tile_fmt, '<u2', '<u2'],
+        'offsets': [0, 2, 2 + tile_size, 4 + tile_size + 4 * nchannels],
+        'itemsize': record_size
+    })
+    rec = _records(path, dtype, header_size)
+    cycle = np.asarray(rec['cycle'])
+    first = np.isin(cycle, cycles.first_cycles)
+    read = cycles.lookup(cycles.read, cycle[first])
+    keys = _tile_keys(rec['lane'][first], rec['tile'][first])
+    tiles, inv = np.unique(keys, return_inverse=True)
+    intensity = np.full((len(tiles), cycles.nreads), np.nan)
+    intensity[inv, read] = rec['intensity'][first]
+    return {'tiles': tiles, 'lanes': _key_lanes(tiles), 'intensity': intensity}
+
+
+def read_index_metrics(path):
+    """ Read IndexMetricsOut.bin (versions 1 and 2). Records have variable
+    length strings, so are read one at a time.
+    :return: Dict of lane: OrderedDict of (index name, sample, project): cluster count,
+             counting the first index read of each lane
+    """
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    version = bytearray(data[:1])[0] if len(data) > 0 else None
+    if version == 1:
+        ids = struct.Struct('<HHH')
+        count_fmt = struct.Struct('<I')
+    elif version == 2:
+        ids = struct.Struct('<HIH')
+        count_fmt = struct.Struct('<Q')
+    else:
+        raise ValueError("unsupported index metrics version {}".format(version))
+    length = struct.Struct('<H')
+
+    def string(pos):
+        n = length.unpack_from(data, pos)[0]
+        pos += length.size
+        return data[pos:pos + n].decode('utf-8', 'replace'), pos + n
+
+    counts = defaultdict(lambda: defaultdict(OrderedDict))
+    pos = 1
+    while pos < len(data):
+        lane, tile, read = ids.unpack_from(data, pos)
+        name, pos = string(pos + ids.size)
+        count = count_fmt.unpack_from(data, pos)[0]
+        sample, pos = string(pos + count_fmt.size)
+        project, pos = string(pos)
+        key = (name, sample, project)
+        counts[lane][read][key] = counts[lane][read].get(key, 0) + count
+    # Dual index runs have records for both index reads
+    return dict((lane, by_read[min(by_read)]) for lane, by_read in counts.items())
+
+
+def summarise_run(reads, tiles, errors, quality, intensity):
+    """ Make the run summary and per-lane tables, in the same layout and units
+    as parse_summary_csv(): yields in Gbp and read counts in millions.
+    Values that can't be worked out from the available files are left out.
+    """
+    nreads = len(reads)
+    metrics = {'summary': OrderedDict(), 'details': OrderedDict()}
+    if tiles is None:
+        return metrics
+    lanes = sorted(set(tiles['lanes'].tolist()))
+    nlanes = max(lanes) + 1 if len(lanes) > 0 else 0
+    quality = quality if quality is not None else dict()
+
+    def lane_means(m, key):
+        """ Mean per lane and read, and over all tiles for each read """
+        if m is None:
+            return np.full((nlanes, nreads), np.nan), np.full(nreads, np.nan)
+        by_lane = _group_mean(m[key], np.clip(m['lanes'], 0, nlanes - 1), nlanes)
+        total = _group_mean(m[key], np.zeros(len(m['lanes']), dtype=np.int64), 1)[0]
+        return by_lane, total
+
+    aligned, aligned_total = lane_means(tiles, 'aligned')
+    phasing, _ = lane_means(tiles, 'phasing')
+    prephasing, _ = lane_means(tiles, 'prephasing')
+    error, error_total = lane_means(errors, 'error')
+    error_limits = dict((limit, lane_means(errors, 'error_{}'.format(limit))[0]) for limit in error_cycle_limits)
+    c1_intensity, c1_intensity_total = lane_means(intensity, 'intensity')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cluster_pf = tiles['clusters_pf'] / tiles['clusters'] * 100
+    tile_lanes = np.clip(tiles['lanes'], 0, nlanes - 1)
+    density = _group_mean(tiles['density'] / 1000, tile_lanes, nlanes)
+    cluster_pf = _group_mean(cluster_pf, tile_lanes, nlanes)
+    clusters = np.bincount(tile_lanes, weights=np.nan_to_num(tiles['clusters']), minlength=nlanes)
+    clusters_pf = np.bincount(tile_lanes, weights=np.nan_to_num(tiles['clusters_pf']), minlength=nlanes)
+    num_tiles = np.bincount(tile_lanes, minlength=nlanes)
+
+    def add(row, key, value):
+        if value is not None and not np.isnan(value):
+            row[key] = float(value)
+
+    # Read summary
+    read_rows = list()
+    for r, read in enumerate(reads):
+        bases = sum(quality.get((lane, r), [0, 0])[0] for lane in lanes)
+        bases_q30 = sum(quality.get((lane, r), [0, 0])[1] for lane in lanes)
+        row = OrderedDict()
+        add(row, 'Yield', bases / 1e9)
+        add(row, 'Projected Yield', bases / 1e9)
+        add(row, 'Aligned', aligned_total[r])
+        add(row, 'Error Rate', error_total[r])
+        add(row, 'Intensity C1', c1_intensity_total[r])
+        if bases > 0:
+            add(row, '%>=Q30', bases_q30 / bases * 100)
+        metrics['summary'][read['name']] = row
+        read_rows.append((read, row, bases, bases_q30))
+    for name, rows in [('Non-indexed', [r for r in read_rows if not r[0]['is_index']]), ('Total', read_rows)]:
+        row = OrderedDict()
+        bases = sum(r[2] for r in rows)
+        bases_q30 = sum(r[3] for r in rows)
+        add(row, 'Yield', bases / 1e9)
+        add(row, 'Projected Yield', bases / 1e9)
+        for k in ['Aligned', 'Error Rate', 'Intensity C1']:
+            vals = [r[1][k] for r in rows if k in r[1]]
+            if len(vals) > 0:
+                add(row, k, sum(vals) / len(vals))
+        if bases > 0:
+            add(row, '%>=Q30', bases_q30 / bases * 100)
+        metrics['summary'][name] = row
+
+    # Per-lane details for each read
+    for r, read in enumerate(reads):
+        for lane in lanes:
+            row = OrderedDict()
+            add(row, 'Tiles', num_tiles[lane])
+            add(row, 'Density', density[lane])
+            add(row, 'Cluster PF', cluster_pf[lane])
+            add(row, 'Phased', phasing[lane, r])
+            add(row, 'Prephased', prephasing[lane, r])
+            add(row, 'Reads', clusters[lane] / 1e6)
+            add(row, 'Reads PF', clusters_pf[lane] / 1e6)
+            bases, bases_q30 = quality.get((lane, r), [0, 0])
+            if bases > 0:
+                add(row, '%>=Q30', bases_q30 / bases * 100)
+                add(row, 'Yield', bases / 1e9)
+            if errors is not None and (lane, r) in errors['cycles']:
+                add(row, 'Cycles Error', errors['cycles'][(lane, r)])
+            add(row, 'Aligned', aligned[lane, r])
+            add(row, 'Error', error[lane, r])
+            for limit in error_cycle_limits:
+                add(row, 'Error ({})'.format(limit), error_limits[limit][lane, r])
+            add(row, 'Intensity C1', c1_intensity[lane, r])
+            metrics['details']['Lane {} - {}'.format(lane, read['name'])] = row
+    return metrics
+
+
+def summarise_index(tiles, index):
+    """ Make the index summary tables, in the same layout as parse_index_summary_csv() """
+    metrics = {'summary': OrderedDict(), 'details': OrderedDict()}
+    if index is None or tiles is None:
+        return metrics
+    for lane in sorted(index):
+        in_lane = tiles['lanes'] == lane
+        total = float(np.nansum(tiles['clusters'][in_lane]))
+        total_pf = float(np.nansum(tiles['clusters_pf'][in_lane]))
+        counts = np.array(list(index[lane].values()), dtype=np.float64)
+        lane_name = 'Lane {}'.format(lane)
+        summary = OrderedDict([('Total Reads', total), ('PF Reads', total_pf)])
+        if total_pf > 0 and len(counts) > 0:
+            pct = counts / total_pf * 100
+            summary['% Read Identified (PF)'] = float(pct.sum())
+            summary['CV'] = float(counts.std() / counts.mean()) if counts.mean() > 0 else 0.0
+            summary['Min'] = float(pct.min())
+            summary['Max'] = float(pct.max())
+        metrics['summary'][lane_name] = summary
+        for (name, sample, project), count in index[lane].items():
+            # Dual indexes are written as I7-I5 (or I7+I5 by some versions of RTA)
+            i7, i5 = name, ''
+            for sep in ['-', '+']:
+                if sep in name:
+                    i7, i5 = name.split(sep, 1)
+                    break
+            details = OrderedDict([('Project', project), ('Index 1 (I7)', i7), ('Index 2 (I5)', i5)])
+            if total_pf > 0:
+                details['% Read Identified (PF)'] = count / total_pf * 100
+            metrics['details']['{} - {}'.format(sample, lane_name)] = details
+    return metrics
@@ -16,7 +16,7 @@ def parse_reports(self):
     """ Find Picard AlignmentSummaryMetrics reports and parse their data """
 
     # Set up vars
-    self.picard_alignment_metrics = dict()
+    self.picard_alignment_metrics = self.load_previous_samples('picard/alignment_metrics', 'multiqc_picard_AlignmentSummaryMetrics', section='AlignmentSummaryMetrics')
 
     # Go through logs and find Metrics
     for f in self.find_log_files('picard/alignment_metrics', filehandles=True):
@@ -17,7 +17,7 @@ def parse_reports(self):
     """ Find Picard MarkDuplicates reports and parse their data """
 
     # Set up vars
-    self.picard_dupMetrics_data = dict()
+    self.picard_dupMetrics_data = self.load_previous_samples('picard/markdups', 'multiqc_picard_dups', section='DuplicationMetrics')
 
     # Go through logs and find Metrics
     for f in self.find_log_files('picard/markdups', filehandles=True):
@@ -64,6 +64,11 @@ def parse_reports(self):
 
     if len(self.picard_dupMetrics_data) > 0:
 
+        # Samples from a run being updated have the plot keys added below
+        for sn in self.picard_dupMetrics_data.keys():
+            for k in ['UNPAIRED_READ_UNIQUE', 'READ_PAIR_NOT_OPTICAL_DUPLICATES', 'READ_PAIR_UNIQUE']:
+                self.picard_dupMetrics_data[sn].pop(k, None)
+
         # Write parsed data to a file
         self.write_data_file(self.picard_dupMetrics_data, 'multiqc_picard_dups')
 
@@ -19,19 +19,19 @@ def parse_reports(self):
 
     # General stats - genome_results.txt
     self.qualimap_bamqc_genome_results = dict()
-    for f in self.find_log_files('qualimap/bamqc/genome_results'):
+    for f in self.find_log_files('qualimap/bamqc/genome_results', filelines=True):
         parse_genome_results(self, f)
     self.qualimap_bamqc_genome_results = self.ignore_samples(self.qualimap_bamqc_genome_results)
 
     # Coverage - coverage_histogram.txt
     self.qualimap_bamqc_coverage_hist = dict()
-    for f in self.find_log_files('qualimap/bamqc/coverage', filehandles=True):
+    for f in self.find_log_files('qualimap/bamqc/coverage', filehandles=True, parse_cache=True):
         parse_coverage(self, f)
     self.qualimap_bamqc_coverage_hist = self.ignore_samples(self.qualimap_bamqc_coverage_hist)
 
     # Insert size - insert_size_histogram.txt
     self.qualimap_bamqc_insert_size_hist = dict()
-    for f in self.find_log_files('qualimap/bamqc/insert_size', filehandles=True):
+    for f in self.find_log_files('qualimap/bamqc/insert_size', filehandles=True, parse_cache=True):
         parse_insert_size(self, f)
     self.qualimap_bamqc_insert_size_hist = self.ignore_samples(self.qualimap_bamqc_insert_size_hist)
 
@@ -87,13 +87,19 @@ def parse_genome_results(self, f):
         'general_error_rate': r"general error rate = ([\d,\.]+)",
     }
     d = dict()
-    for k, r in regexes.items():
-        r_search = re.search(r, f['f'], re.MULTILINE)
-        if r_search:
-            try:
-                d[k] = float(r_search.group(1).replace(',',''))
-            except ValueError:
-                d[k] = r_search.group(1)
+    for l in f['f']:
+        # Everything we need comes before the coverage for each contig, which can be very long
+        if l.startswith('>>>>>>> Coverage per contig'):
+            break
+        for k, r in regexes.items():
+            if k in d:
+                continue
+            r_search = re.search(r, l)
+            if r_search:
+                try:
+                    d[k] = float(r_search.group(1).replace(',',''))
+                except ValueError:
+                    d[k] = r_search.group(1)
     # Check we have an input filename
     if 'bam_file' not in d:
         log.debug("Couldn't find an input filename in genome_results file {}".format(f['fn']))
@@ -125,14 +131,18 @@ def parse_coverage(self, f):
     # Typical path: <sample name>/raw_data_qualimapReport/coverage_histogram.txt
     s_name = self.get_s_name(f)
 
-    d = dict()
-    for l in f['f']:
-        if l.startswith('#'):
-            continue
-        coverage, count = l.split(None, 1)
-        coverage = int(round(float(coverage)))
-        count = float(count)
-        d[coverage] = count
+    # Use the histogram from the parse cache if the file hasn't changed
+    d = f.get('parsed')
+    if d is None:
+        d = dict()
+        for l in f['f']:
+            if l.startswith('#'):
+                continue
+            coverage, count = l.split(None, 1)
+            coverage = int(round(float(coverage)))
+            count = float(count)
+            d[coverage] = count
+        self.save_parsed_data(f, d)
 
     if len(d) == 0:
         log.debug("Couldn't parse contents of coverage histogram file {}".format(f['fn']))
@@ -161,18 +171,22 @@ def parse_insert_size(self, f):
     # Typical path: <sample name>/raw_data_qualimapReport/insert_size_histogram.txt
     s_name = self.get_s_name(f)
 
-    d = dict()
-    zero_insertsize = 0
-    for l in f['f']:
-        if l.startswith('#'):
-            continue
-        insertsize, count = l.split(None, 1)
-        insertsize = int(round(float(insertsize)))
-        count = float(count) / 1000000
-        if(insertsize == 0):
-            zero_insertsize = count
-        else:
-            d[insertsize] = count
+    # Use the histogram from the parse cache if the file hasn't changed
+    d = f.get('parsed')
+    if d is None:
+        d = dict()
+        zero_insertsize = 0
+        for l in f['f']:
+            if l.startswith('#'):
+                continue
+            insertsize, count = l.split(None, 1)
+            insertsize = int(round(float(insertsize)))
+            count = float(count) / 1000000
+            if(insertsize == 0):
+                zero_insertsize = count
+            else:
+                d[insertsize] = count
+        self.save_parsed_data(f, d)
 
     # Find median without importing anything to do it for us
     num_counts = sum(d.values())
@@ -18,7 +18,7 @@ class FlagstatReportMixin():
     def parse_samtools_flagstats(self):
         """ Find Samtools flagstat logs and parse their data """
 
-        self.samtools_flagstat = dict()
+        self.samtools_flagstat = self.load_previous_samples('samtools/flagstat', 'multiqc_samtools_flagstat', section='flagstat')
         for f in self.find_log_files('samtools/flagstat'):
             parsed_data = parse_single_report(f['f'])
             if len(parsed_data) > 0:
@@ -16,7 +16,7 @@ class IdxstatsReportMixin():
     def parse_samtools_idxstats(self):
         """ Find Samtools idxstats logs and parse their data """
 
-        self.samtools_idxstats = dict()
+        self.samtools_idxstats = self.load_previous_samples('samtools/idxstats', 'multiqc_samtools_idxstats', section='idxstats')
         for f in self.find_log_files('samtools/idxstats'):
             parsed_data = parse_single_report(f['f'])
             if len(parsed_data) > 0:
@@ -16,7 +16,7 @@ class RmdupReportMixin():
     def parse_samtools_rmdup(self):
         """ Find Samtools rmdup logs and parse their data """
 
-        self.samtools_rmdup = dict()
+        self.samtools_rmdup = self.load_previous_samples('samtools/rmdup', 'multiqc_samtools_rmdup')
         for f in self.find_log_files('samtools/rmdup', filehandles=True):
             # Example below:
             # [bam_rmdupse_core] 26602816 / 103563641 = 0.2569 in library '   '
@@ -18,11 +18,14 @@ class StatsReportMixin():
     def parse_samtools_stats(self):
         """ Find Samtools stats logs and parse their data """
 
-        self.samtools_stats = dict()
-        for f in self.find_log_files('samtools/stats'):
+        self.samtools_stats = self.load_previous_samples('samtools/stats', 'multiqc_samtools_stats', section='stats')
+        for f in self.find_log_files('samtools/stats', filelines=True):
             parsed_data = dict()
-            for line in f['f'].splitlines():
+            for line in f['f']:
                 if not line.startswith("SN"):
+                    # Summary numbers come in one block near the top, skip the rest of the file
+                    if len(parsed_data) > 0 and not line.startswith("#"):
+                        break
                     continue
                 sections = line.split("\t")
                 field = sections[1].strip()[:-1]
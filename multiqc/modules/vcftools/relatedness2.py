@@ -2,9 +2,13 @@
 
 """ MultiQC module to parse relatedness output from vcftools relatedness """
 
-import csv
 import logging
-from collections import defaultdict
+from array import array
+from operator import itemgetter
+
+import numpy as np
+
+from multiqc import config
 from multiqc.plots import heatmap
 
 # Initialise the logger
@@ -16,7 +20,7 @@ class Relatedness2Mixin():
         matrices = {}
         for f in self.find_log_files('vcftools/relatedness2', filehandles=True):
             m = _Relatedness2Matrix(f)
-            if m.data and m.x_labels and m.y_labels:
+            if m.data.size > 0 and m.x_labels and m.y_labels:
                 matrices[f['s_name']] = m
 
         matrices = self.ignore_samples(matrices)
@@ -30,11 +34,16 @@ class Relatedness2Mixin():
         `RELATEDNESS_PHI` gives a relatedness score between two samples. A higher score indicates a higher degree of
         relatedness, up to a maximum of 0.5. Samples are sorted alphabetically on each axis, and specific IDs can be
         found in the graph with the Highlight tab.
+
+        When there are too many pairs of samples to show every one, samples are put in order so that related
+        samples are next to each other, and each square shows the highest value for a block of samples.
         '''
 
         idx = 0
         for name, m in matrices.items():
             idx += 1
+            # Keep related samples together when blocks of samples are combined
+            big = m.data.size > config.heatmap_max_cells
             self.add_section(
                 name = 'Relatedness2',
                 anchor = 'vcftools-relatedness2-{}'.format(idx),
@@ -48,7 +57,9 @@ class Relatedness2Mixin():
                         'id': 'vcftools-relatedness2-heatmap-{}'.format(idx),
                         'title': 'VCFTools: Relatedness2',
                         'square': True,
-                        'decimalPlaces': 7
+                        'decimalPlaces': 7,
+                        'cluster': big,
+                        'block_agg': 'max'
                     }
                 )
             )
@@ -58,27 +69,56 @@ class Relatedness2Mixin():
 
 class _Relatedness2Matrix():
     def __init__(self, relatedness_file):
-        self.data = []
-        self.x_labels = set()
-        self.y_labels = set()
+        self.data = np.zeros((0, 0), dtype=np.float64)
+        self.x_labels = list()
+        self.y_labels = list()
 
         self.parse(relatedness_file['f'])
 
     def parse(self, f):
-        rels = defaultdict(dict)
-        r = csv.DictReader(f, delimiter='\t')
-        for line in r:
-            self.x_labels.add(line['INDV1'])
-            self.y_labels.add(line['INDV2'])
-
-            rels[line['INDV1']][line['INDV2']] = float(line['RELATEDNESS_PHI'])
+        """ Read the pairs of samples in one pass, filling a float64 matrix
+        indexed by the order that sample IDs are first seen in. Pairs that
+        aren't in the file are NaN. """
+        header = f.readline().rstrip('\r\n').split('\t')
+        try:
+            get_fields = itemgetter(header.index('INDV1'), header.index('INDV2'), header.index('RELATEDNESS_PHI'))
+        except ValueError:
+            log.warning("Could not find relatedness2 columns in {}".format(getattr(f, 'name', 'file')))
+            return
+        x_idx = dict()
+        y_idx = dict()
+        size = 64
+        matrix = np.full((size, size), np.nan, dtype=np.float64)
+        xs, ys, vals = array('l'), array('l'), array('d')
+        for line in f:
+            try:
+                x, y, val = get_fields(line.rstrip('\r\n').split('\t'))
+                val = float(val)
+            except (IndexError, ValueError):
+                continue
+            xs.append(x_idx.setdefault(x, len(x_idx)))
+            ys.append(y_idx.setdefault(y, len(y_idx)))
+            vals.append(val)
+            if len(vals) >= 1000000:
+                matrix = self._fill(matrix, xs, ys, vals, len(x_idx), len(y_idx))
+                xs, ys, vals = array('l'), array('l'), array('d')
+        matrix = self._fill(matrix, xs, ys, vals, len(x_idx), len(y_idx))
 
         # impose alphabetical order and avoid json serialisation errors in utils.report
-        self.x_labels = sorted(self.x_labels)
-        self.y_labels = sorted(self.y_labels)
-
-        for x in self.x_labels:
-            line = []
-            for y in self.y_labels:
-                line.append(rels[x][y])
-            self.data.append(line)
+        self.x_labels = sorted(x_idx)
+        self.y_labels = sorted(y_idx)
+        self.data = matrix[np.ix_([x_idx[x] for x in self.x_labels], [y_idx[y] for y in self.y_labels])]
+
+    @staticmethod
+    def _fill(matrix, xs, ys, vals, num_x, num_y):
+        """ Put values in to the matrix, doubling its size if there are new samples """
+        if num_x > matrix.shape[0] or num_y > matrix.shape[1]:
+            size = max(matrix.shape[0], matrix.shape[1])
+            while size < max(num_x, num_y):
+                size *= 2
+            bigger = np.full((size, size), np.nan, dtype=np.float64)
+            bigger[:matrix.shape[0], :matrix.shape[1]] = matrix
+            matrix = bigger
+        if len(vals) > 0:
+            matrix[np.asarray(xs), np.asarray(ys)] = np.asarray(vals)
+        return matrix
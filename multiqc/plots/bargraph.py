@@ -3,10 +3,8 @@
 """ MultiQC functions to plot a bargraph """
 
 from __future__ import print_function
-import base64
 from collections import OrderedDict
 import inspect
-import io
 import logging
 import math
 import os
@@ -14,7 +12,7 @@ import random
 import re
 import sys
 
-from multiqc.utils import config, report, util_functions
+from multiqc.utils import config, report, util_functions, timing, flat_plots
 logger = logging.getLogger(__name__)
 
 try:
@@ -31,6 +29,10 @@ except Exception as e:
 
 letters = 'abcdefghijklmnopqrstuvwxyz'
 
+# Same defaults as HighCharts for consistency
+default_colors = ['#7cb5ec', '#434348', '#90ed7d', '#f7a35c', '#8085e9',
+                  '#f15c80', '#e4d354', '#2b908f', '#f45b5b', '#91e8e1']
+
 # Load the template so that we can access its configuration
 # Do this lazily to mitigate import-spaghetti when running unit tests
 _template_mod = None
@@ -40,6 +42,7 @@ def get_template_mod():
         _template_mod = config.avail_templates[config.template].load()
     return _template_mod
 
+@timing.time_plot('bargraph')
 def plot (data, cats=None, pconfig=None):
     """ Plot a horizontal bar graph. Expects a 2D dict of sample
     data. Also can take info about categories. There are quite a
@@ -266,19 +269,24 @@ def highcharts_bargraph (plotdata, plotsamples=None, pconfig=None):
 def matplotlib_bargraph (plotdata, plotsamples, pconfig=None):
     """
     Plot a bargraph with Matplot lib and return a HTML string. Either embeds a base64
-    encoded image within HTML or writes the plot and links to it. Should be called by
+    encoded image within HTML or writes the plot and links to it. The figures are
+    queued and drawn by flat_plots once all modules have run. Should be called by
     plot_bargraph, which properly formats the input data.
     """
 
     if pconfig is None:
         pconfig = {}
 
+    # Config for an interactive plot, used instead if the figures can't be drawn
+    hc_pconfig = pconfig.copy()
+
     # Plot group ID
     if pconfig.get('id') is None:
         pconfig['id'] = 'mqc_mplplot_'+''.join(random.sample(letters, 10))
 
     # Sanitise plot ID and check for duplicates
     pconfig['id'] = report.save_htmlid(pconfig['id'])
+    fallback = (pconfig['id'], highcharts_bargraph, (plotdata, plotsamples, hc_pconfig))
 
     # Individual plot IDs
     pids = []
@@ -296,10 +304,6 @@ def matplotlib_bargraph (plotdata, plotsamples, pconfig=None):
           '(see the <a href="http://multiqc.info/docs/#flat--interactive-plots" target="_blank">docs</a>).</small></p>'
     html += '<div class="mqc_mplplot_plotgroup" id="{}">'.format(pconfig['id'])
 
-    # Same defaults as HighCharts for consistency
-    default_colors = ['#7cb5ec', '#434348', '#90ed7d', '#f7a35c', '#8085e9',
-                      '#f15c80', '#e4d354', '#2b908f', '#f45b5b', '#91e8e1']
-
     # Counts / Percentages Switch
     if pconfig.get('cpswitch') is not False and not config.simple_output:
         if pconfig.get('cpswitch_c_active', True) is True:
@@ -366,127 +370,14 @@ def matplotlib_bargraph (plotdata, plotsamples, pconfig=None):
                 if pconfig.get('cpswitch_c_active', True) is not True:
                     hide_plot = True
 
-            # Set up figure
-            plt_height = len(plotsamples[pidx]) / 2.3
-            plt_height = max(6, plt_height) # At least 6" tall
-            plt_height = min(30, plt_height) # Cap at 30" tall
-            bar_width = 0.8
-
-            fig = plt.figure(figsize=(14, plt_height), frameon=False)
-            axes = fig.add_subplot(111)
-            y_ind = range(len(plotsamples[pidx]))
-
-            # Count totals for each sample
-            if plot_pct is True:
-                s_totals = [0 for _ in pdata[0]['data']]
-                for series_idx, d in enumerate(pdata):
-                    for sample_idx, v in enumerate(d['data']):
-                        s_totals[sample_idx] += v
-
-            # Plot bars
-            dlabels = []
-            for idx, d in enumerate(pdata):
-                # Plot percentages
-                values = d['data']
-                if len(values) < len(y_ind):
-                    values.extend([0] * (len(y_ind) - len(values)))
-                if plot_pct is True:
-                    for (key,var) in enumerate(values):
-                        s_total = s_totals[key]
-                        if s_total == 0:
-                            values[key] = 0
-                        else:
-                            values[key] = (float(var+0.0)/float(s_total))*100
-
-                # Get offset for stacked bars
-                if idx == 0:
-                    prevdata = [0] * len(plotsamples[pidx])
-                else:
-                    for i, p in enumerate(prevdata):
-                        prevdata[i] += pdata[idx-1]['data'][i]
-                # Default colour index
-                cidx = idx
-                while cidx >= len(default_colors):
-                    cidx -= len(default_colors)
-                # Save the name of this series
-                dlabels.append(d['name'])
-                # Add the series of bars to the plot
-                axes.barh(
-                    y_ind,
-                    values,
-                    bar_width,
-                    left = prevdata,
-                    color = d.get('color', default_colors[cidx]),
-                    align = 'center',
-                    linewidth = pconfig.get('borderWidth', 0)
-                )
-
-            # Tidy up axes
-            axes.tick_params(labelsize=8, direction='out', left=False, right=False, top=False, bottom=False)
-            axes.set_xlabel(pconfig.get('ylab', '')) # I know, I should fix the fact that the config is switched
-            axes.set_ylabel(pconfig.get('xlab', ''))
-            axes.set_yticks(y_ind) # Specify where to put the labels
-            axes.set_yticklabels(plotsamples[pidx]) # Set y axis sample name labels
-            axes.set_ylim((-0.5, len(y_ind)-0.5)) # Reduce padding around plot area
-            if plot_pct is True:
-                axes.set_xlim((0, 100))
-                # Add percent symbols
-                vals = axes.get_xticks()
-                axes.set_xticklabels(['{:.0f}%'.format(x) for x in vals])
-            else:
-                default_xlimits = axes.get_xlim()
-                axes.set_xlim((pconfig.get('ymin', default_xlimits[0]),pconfig.get('ymax', default_xlimits[1])))
-            if 'title' in pconfig:
-                top_gap = 1 + (0.5 / plt_height)
-                plt.text(0.5, top_gap, pconfig['title'], horizontalalignment='center', fontsize=16, transform=axes.transAxes)
-            axes.grid(True, zorder=0, which='both', axis='x', linestyle='-', color='#dedede', linewidth=1)
-            axes.set_axisbelow(True)
-            axes.spines['right'].set_visible(False)
-            axes.spines['top'].set_visible(False)
-            axes.spines['bottom'].set_visible(False)
-            axes.spines['left'].set_visible(False)
-            plt.gca().invert_yaxis() # y axis is reverse sorted otherwise
-
-            # Hide some labels if we have a lot of samples
-            show_nth = max(1, math.ceil(len(pdata[0]['data'])/150))
-            for idx, label in enumerate(axes.get_yticklabels()):
-                if idx % show_nth != 0:
-                    label.set_visible(False)
-
-            # Legend
-            bottom_gap = -1 * (1 - ((plt_height - 1.5) / plt_height))
-            lgd = axes.legend(dlabels, loc='lower center', bbox_to_anchor=(0, bottom_gap, 1, .102), ncol=5, mode='expand', fontsize=8, frameon=False)
-
             # Should this plot be hidden on report load?
             hidediv = ''
             if pidx > 0 or hide_plot:
                 hidediv = ' style="display:none;"'
 
-            # Save the plot to the data directory if export is requested
-            if config.export_plots:
-                for fformat in config.export_plot_formats:
-                    # Make the directory if it doesn't already exist
-                    plot_dir = os.path.join(config.plots_dir, fformat)
-                    if not os.path.exists(plot_dir):
-                        os.makedirs(plot_dir)
-                    # Save the plot
-                    plot_fn = os.path.join(plot_dir, '{}.{}'.format(pid, fformat))
-                    fig.savefig(plot_fn, format=fformat, bbox_extra_artists=(lgd,), bbox_inches='tight')
-
-            # Output the figure to a base64 encoded string
-            if getattr(get_template_mod(), 'base64_plots', True) is True:
-                img_buffer = io.BytesIO()
-                fig.savefig(img_buffer, format='png', bbox_inches='tight')
-                b64_img = base64.b64encode(img_buffer.getvalue()).decode('utf8')
-                img_buffer.close()
-                html += '<div class="mqc_mplplot" id="{}"{}><img src="data:image/png;base64,{}" /></div>'.format(pid, hidediv, b64_img)
-
-            # Link to the saved image
-            else:
-                plot_relpath = os.path.join(config.plots_dir_name, 'png', '{}.png'.format(pid))
-                html += '<div class="mqc_mplplot" id="{}"{}><img src="{}" /></div>'.format(pid, hidediv, plot_relpath)
-
-            plt.close(fig)
+            # Queue the figure to be drawn once all modules have run
+            embed = getattr(get_template_mod(), 'base64_plots', True) is True
+            html += flat_plots.add_plot(pid, matplotlib_bargraph_figure, (pdata, plotsamples[pidx], pconfig, plot_pct), hidediv, embed, fallback)
 
 
     # Close wrapping div
@@ -494,4 +385,108 @@ def matplotlib_bargraph (plotdata, plotsamples, pconfig=None):
 
     report.num_mpl_plots += 1
 
-    return html
+    return flat_plots.add_group(pconfig['id'], html)
+
+
+def matplotlib_bargraph_figure (pdata, samples, pconfig, plot_pct):
+    """
+    Draw one dataset of a bar graph with MatPlotLib. Called when the
+    flat plots queued by matplotlib_bargraph() are drawn.
+    :param pdata: List of series dicts for this dataset
+    :param samples: List of sample names for this dataset
+    :param pconfig: Plot config dict
+    :param plot_pct: Plot percentages instead of counts
+    :return: MatPlotLib figure and a dict of extra arguments for savefig()
+    """
+    # Set up figure
+    plt_height = len(samples) / 2.3
+    plt_height = max(6, plt_height) # At least 6" tall
+    plt_height = min(30, plt_height) # Cap at 30" tall
+    bar_width = 0.8
+
+    fig = plt.figure(figsize=(14, plt_height), frameon=False)
+    axes = fig.add_subplot(111)
+    y_ind = range(len(samples))
+
+    # Count totals for each sample
+    if plot_pct is True:
+        s_totals = [0 for _ in pdata[0]['data']]
+        for series_idx, d in enumerate(pdata):
+            for sample_idx, v in enumerate(d['data']):
+                s_totals[sample_idx] += v
+
+    # Plot bars
+    dlabels = []
+    for idx, d in enumerate(pdata):
+        # Plot percentages
+        values = d['data']
+        if len(values) < len(y_ind):
+            values.extend([0] * (len(y_ind) - len(values)))
+        if plot_pct is True:
+            for (key,var) in enumerate(values):
+                s_total = s_totals[key]
+                if s_total == 0:
+                    values[key] = 0
+                else:
+                    values[key] = (float(var+0.0)/float(s_total))*100
+
+        # Get offset for stacked bars
+        if idx == 0:
+            prevdata = [0] * len(samples)
+        else:
+            for i, p in enumerate(prevdata):
+                prevdata[i] += pdata[idx-1]['data'][i]
+        # Default colour index
+        cidx = idx
+        while cidx >= len(default_colors):
+            cidx -= len(default_colors)
+        # Save the name of this series
+        dlabels.append(d['name'])
+        # Add the series of bars to the plot
+        axes.barh(
+            y_ind,
+            values,
+            bar_width,
+            left = prevdata,
+            color = d.get('color', default_colors[cidx]),
+            align = 'center',
+            linewidth = pconfig.get('borderWidth', 0)
+        )
+
+    # Tidy up axes
+    axes.tick_params(labelsize=8, direction='out', left=False, right=False, top=False, bottom=False)
+    axes.set_xlabel(pconfig.get('ylab', '')) # I know, I should fix the fact that the config is switched
+    axes.set_ylabel(pconfig.get('xlab', ''))
+    axes.set_yticks(y_ind) # Specify where to put the labels
+    axes.set_yticklabels(samples) # Set y axis sample name labels
+    axes.set_ylim((-0.5, len(y_ind)-0.5)) # Reduce padding around plot area
+    if plot_pct is True:
+        axes.set_xlim((0, 100))
+        # Add percent symbols
+        vals = axes.get_xticks()
+        axes.set_xticklabels(['{:.0f}%'.format(x) for x in vals])
+    else:
+        default_xlimits = axes.get_xlim()
+        axes.set_xlim((pconfig.get('ymin', default_xlimits[0]),pconfig.get('ymax', default_xlimits[1])))
+    if 'title' in pconfig:
+        top_gap = 1 + (0.5 / plt_height)
+        plt.text(0.5, top_gap, pconfig['title'], horizontalalignment='center', fontsize=16, transform=axes.transAxes)
+    axes.grid(True, zorder=0, which='both', axis='x', linestyle='-', color='#dedede', linewidth=1)
+    axes.set_axisbelow(True)
+    axes.spines['right'].set_visible(False)
+    axes.spines['top'].set_visible(False)
+    axes.spines['bottom'].set_visible(False)
+    axes.spines['left'].set_visible(False)
+    plt.gca().invert_yaxis() # y axis is reverse sorted otherwise
+
+    # Hide some labels if we have a lot of samples
+    show_nth = max(1, math.ceil(len(pdata[0]['data'])/150))
+    for idx, label in enumerate(axes.get_yticklabels()):
+        if idx % show_nth != 0:
+            label.set_visible(False)
+
+    # Legend
+    bottom_gap = -1 * (1 - ((plt_height - 1.5) / plt_height))
+    lgd = axes.legend(dlabels, loc='lower center', bbox_to_anchor=(0, bottom_gap, 1, .102), ncol=5, mode='expand', fontsize=8, frameon=False)
+
+    return fig, {'bbox_extra_artists': (lgd,)}
@@ -58,18 +58,9 @@ def make_plot(dt):
             });
 
             # Add the data
-            thisdata = []
-            these_snames = []
-            for (s_name, samp) in dt.data[idx].items():
-                if k in samp:
-
-                    val = samp[k]
-
-                    if 'modify' in header and callable(header['modify']):
-                        val = header['modify'](val)
-
-                    thisdata.append(val)
-                    these_snames.append(s_name)
+            these_snames, thisdata = dt.data[idx].column(k)
+            if 'modify' in header and callable(header['modify']):
+                thisdata = [ header['modify'](val) for val in thisdata ]
 
             data.append(thisdata)
             s_names.append(these_snames)
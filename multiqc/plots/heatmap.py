@@ -2,11 +2,16 @@
 
 """ MultiQC functions to plot a heatmap """
 
-from __future__ import print_function
+from __future__ import print_function, division
+import base64
 import logging
+import math
 import random
+import warnings
 
-from multiqc.utils import report
+import numpy as np
+
+from multiqc.utils import config, report
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +19,8 @@ letters = 'abcdefghijklmnopqrstuvwxyz'
 
 def plot (data, xcats, ycats=None, pconfig=None):
     """ Plot a 2D heatmap.
-    :param data: List of lists, each a representing a row of values.
+    :param data: List of lists, each a representing a row of values,
+                 or a 2D NumPy array. Missing values can be NaN.
     :param xcats: Labels for x axis
     :param ycats: Labels for y axis. Defaults to same as x.
     :param pconfig: optional dict with config key:value pairs.
@@ -27,12 +33,127 @@ def plot (data, xcats, ycats=None, pconfig=None):
     if ycats is None:
         ycats = xcats
 
+    # Big heatmaps and arrays are saved in the report as typed arrays
+    if isinstance(data, np.ndarray) or pconfig.get('cluster') or _num_cells(data) > config.heatmap_max_cells:
+        try:
+            data = np.asarray(data, dtype=np.float32 if getattr(data, 'dtype', None) == np.float32 else np.float64)
+        except (TypeError, ValueError):
+            pass # Values that aren't numbers - plot as they are
+        else:
+            return array_heatmap(data, xcats, ycats, pconfig)
+
     # Make a plot
     return highcharts_heatmap(data, xcats, ycats, pconfig)
 
 
 
-def highcharts_heatmap (data, xcats, ycats, pconfig=None):
+def _num_cells(data):
+    """ Count the values in a list of lists """
+    try:
+        return sum(len(row) for row in data)
+    except TypeError:
+        return 0
+
+
+def array_heatmap (data, xcats, ycats, pconfig):
+    """
+    Plot a heatmap from a 2D NumPy array. Rows and columns can be put
+    in order of similarity (pconfig 'cluster'), then if there are more than
+    config.heatmap_max_cells values (or pconfig 'max_cells'), blocks of cells
+    are combined with the mean or max (pconfig 'block_agg'). The values
+    are saved in the report as a base64 typed array instead of a list of
+    [x, y, value] points.
+    """
+    xcats = list(xcats)
+    ycats = list(ycats)
+    if data.ndim != 2 or data.shape != (len(ycats), len(xcats)):
+        raise ValueError("Heatmap data has shape {}, but there are {} x and {} y categories".format(
+            data.shape, len(xcats), len(ycats)))
+
+    if pconfig.get('cluster'):
+        if xcats == ycats:
+            order = cluster_order(data)
+            data = data[np.ix_(order, order)]
+            xcats = [xcats[i] for i in order]
+            ycats = xcats
+        else:
+            logger.warning("Can only cluster heatmaps with the same x and y categories: '{}'".format(pconfig.get('id')))
+
+    max_cells = pconfig.get('max_cells', config.heatmap_max_cells)
+    if max_cells and data.size > max_cells:
+        block = int(math.ceil(math.sqrt(data.size / max_cells)))
+        logger.debug("Combining {0}x{0} blocks of cells in heatmap '{1}', {2} values".format(block, pconfig.get('id'), data.size))
+        data = block_reduce(data, block, pconfig.get('block_agg', 'mean'))
+        xcats = _block_cats(xcats, block)
+        ycats = _block_cats(ycats, block)
+
+    typed_data = {
+        'dtype': 'float32' if data.dtype == np.float32 else 'float64',
+        'shape': list(data.shape),
+        'data': base64.b64encode(np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<')).tobytes()).decode('ascii')
+    }
+    return highcharts_heatmap(None, xcats, ycats, pconfig, typed_data=typed_data)
+
+
+def cluster_order(data):
+    """
+    Order rows of a square matrix so that similar rows are next to each
+    other. Single linkage clustering on the matrix values (higher is more
+    similar): rows are added in the order that they join a maximum
+    spanning tree, grown with Prim's algorithm.
+    :param data: 2D NumPy array, with the same samples on both axes
+    :return: Array of row indexes
+    """
+    n = data.shape[0]
+    if n < 3:
+        return np.arange(n)
+    joined = np.zeros(n, dtype=bool)
+    best = np.full(n, -np.inf)
+    order = np.zeros(n, dtype=np.int64)
+    cur = 0
+    for i in range(n):
+        order[i] = cur
+        joined[cur] = True
+        row = np.fmax(data[cur], data[:, cur])
+        np.fmax(best, np.where(np.isnan(row), -np.inf, row), out=best)
+        best[joined] = -np.inf
+        cur = int(np.argmax(best))
+        # Rows without any values go at the end
+        if best[cur] == -np.inf:
+            cur = int(np.argmin(joined))
+    return order
+
+
+def block_reduce(data, block, agg='mean'):
+    """
+    Combine square blocks of cells, leaving out NaN
+    :param data: 2D NumPy array
+    :param block: Number of rows and columns in each block
+    :param agg: 'mean' or 'max'
+    :return: Smaller 2D NumPy array
+    """
+    rows = int(math.ceil(data.shape[0] / block))
+    cols = int(math.ceil(data.shape[1] / block))
+    padded = np.full((rows * block, cols * block), np.nan, dtype=data.dtype)
+    padded[:data.shape[0], :data.shape[1]] = data
+    blocks = padded.reshape(rows, block, cols, block)
+    # Blocks with no values are NaN, which warns
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if agg == 'max':
+            return np.nanmax(np.nanmax(blocks, axis=3), axis=1)
+        return np.nanmean(blocks, axis=(1, 3))
+
+
+def _block_cats(cats, block):
+    """ Category names for blocks of cells """
+    if block == 1:
+        return cats
+    return [ cats[i] if len(cats[i:i+block]) == 1 else '{} to {}'.format(cats[i], cats[min(i+block, len(cats))-1])
+        for i in range(0, len(cats), block) ]
+
+
+def highcharts_heatmap (data, xcats, ycats, pconfig=None, typed_data=None):
     """
     Build the HTML needed for a HighCharts line graph. Should be
     called by plot_xy_data, which properly formats input data.
@@ -42,9 +163,10 @@ def highcharts_heatmap (data, xcats, ycats, pconfig=None):
 
     # Reformat the data for highcharts
     pdata = []
-    for i, arr in enumerate(data):
-        for j, val in enumerate(arr):
-            pdata.append([j,i,val])
+    if typed_data is None:
+        for i, arr in enumerate(data):
+            for j, val in enumerate(arr):
+                pdata.append([j,i,val])
 
     # Get the plot ID
     if pconfig.get('id') is None:
@@ -75,6 +197,10 @@ def highcharts_heatmap (data, xcats, ycats, pconfig=None):
         'ycats': ycats,
         'config': pconfig
     }
+    if typed_data is not None:
+        # The report makes the list of points from this when the plot is drawn
+        del report.plot_data[pconfig['id']]['data']
+        report.plot_data[pconfig['id']]['typed_data'] = typed_data
 
     return html
 
@@ -4,14 +4,15 @@
 
 from __future__ import print_function
 from collections import OrderedDict
-import base64
 import io
 import logging
+import math
+import numbers
 import os
 import random
 import sys
 
-from multiqc.utils import config, report, util_functions
+from multiqc.utils import config, report, util_functions, timing, flat_plots
 logger = logging.getLogger(__name__)
 
 try:
@@ -28,6 +29,10 @@ except Exception as e:
 
 letters = 'abcdefghijklmnopqrstuvwxyz'
 
+# Same defaults as HighCharts for consistency
+default_colors = ['#7cb5ec', '#434348', '#90ed7d', '#f7a35c', '#8085e9',
+                  '#f15c80', '#e4d354', '#2b908f', '#f45b5b', '#91e8e1']
+
 # Load the template so that we can access its configuration
 # Do this lazily to mitigate import-spaghetti when running unit tests
 _template_mod = None
@@ -37,6 +42,7 @@ def get_template_mod():
         _template_mod = config.avail_templates[config.template].load()
     return _template_mod
 
+@timing.time_plot('linegraph')
 def plot (data, pconfig=None):
     """ Plot a line graph with X,Y data.
     :param data: 2D dict, first keys as sample names, then x:y data pairs
@@ -204,6 +210,9 @@ def highcharts_linegraph (plotdata, pconfig=None):
 
     report.num_hc_plots += 1
 
+    # Reduce the number of points in dense lines
+    plotdata = downsample_plotdata(plotdata, pconfig)
+
     report.plot_data[pconfig['id']] = {
         'plot_type': "xy_line",
         'datasets': plotdata,
@@ -216,28 +225,28 @@ def highcharts_linegraph (plotdata, pconfig=None):
 def matplotlib_linegraph (plotdata, pconfig=None):
     """
     Plot a line graph with Matplot lib and return a HTML string. Either embeds a base64
-    encoded image within HTML or writes the plot and links to it. Should be called by
+    encoded image within HTML or writes the plot and links to it. The figures are
+    queued and drawn by flat_plots once all modules have run. Should be called by
     plot_bargraph, which properly formats the input data.
     """
     if pconfig is None:
         pconfig = {}
 
+    # Config for an interactive plot, used instead if the figures can't be drawn
+    hc_pconfig = pconfig.copy()
+
     # Plot group ID
     if pconfig.get('id') is None:
         pconfig['id'] = 'mqc_mplplot_'+''.join(random.sample(letters, 10))
 
     # Sanitise plot ID and check for duplicates
     pconfig['id'] = report.save_htmlid(pconfig['id'])
+    fallback = (pconfig['id'], highcharts_linegraph, (plotdata, hc_pconfig))
 
     # Individual plot IDs
     pids = []
     for k in range(len(plotdata)):
-        try:
-            name = pconfig['data_labels'][k]['name']
-        except:
-            name = k+1
-        pid = 'mqc_{}_{}'.format(pconfig['id'], name)
-        pid = report.save_htmlid(pid, skiplint=True)
+        pid = report.save_htmlid(_dataset_id(pconfig, k), skiplint=True)
         pids.append(pid)
 
     html = '<p class="text-info"><small><span class="glyphicon glyphicon-picture" aria-hidden="true"></span> ' + \
@@ -245,10 +254,6 @@ def matplotlib_linegraph (plotdata, pconfig=None):
           '(see the <a href="http://multiqc.info/docs/#flat--interactive-plots" target="_blank">docs</a>).</small></p>'
     html += '<div class="mqc_mplplot_plotgroup" id="{}">'.format(pconfig['id'])
 
-    # Same defaults as HighCharts for consistency
-    default_colors = ['#7cb5ec', '#434348', '#90ed7d', '#f7a35c', '#8085e9',
-                      '#f15c80', '#e4d354', '#2b908f', '#f45b5b', '#91e8e1']
-
     # Buttons to cycle through different datasets
     if len(plotdata) > 1 and not config.simple_output:
         html += '<div class="btn-group mpl_switch_group mqc_mplplot_bargraph_switchds">\n'
@@ -269,184 +274,302 @@ def matplotlib_linegraph (plotdata, pconfig=None):
         pid = pids[pidx]
 
         # Save plot data to file
-        fdata = OrderedDict()
-        lastcats = None
-        sharedcats = True
-        for d in pdata:
-            fdata[d['name']] = OrderedDict()
-            for i, x in enumerate(d['data']):
-                if type(x) is list:
-                    fdata[d['name']][str(x[0])] = x[1]
-                    # Check to see if all categories are the same
-                    if lastcats is None:
-                        lastcats = [x[0] for x in d['data']]
-                    elif lastcats != [x[0] for x in d['data']]:
-                        sharedcats = False
-                else:
-                    try:
-                        fdata[d['name']][pconfig['categories'][i]] = x
-                    except (KeyError, IndexError):
-                        fdata[d['name']][str(i)] = x
-
-        # Custom tsv output if the x axis varies
-        if not sharedcats and config.data_format == 'tsv':
-            fout = ''
-            for d in pdata:
-                fout += "\t"+"\t".join([str(x[0]) for x in d['data']])
-                fout += "\n{}\t".format(d['name'])
-                fout += "\t".join([str(x[1]) for x in d['data']])
-                fout += "\n"
-            with io.open (os.path.join(config.data_dir, '{}.txt'.format(pid)), 'w', encoding='utf-8') as f:
-                print( fout.encode('utf-8', 'ignore').decode('utf-8'), file=f )
-        else:
-            util_functions.write_data_file(fdata, pid)
+        write_plot_data_file(pdata, pconfig, pid)
 
-        # Set up figure
-        fig = plt.figure(figsize=(14, 6), frameon=False)
-        axes = fig.add_subplot(111)
+        # Should this plot be hidden on report load?
+        hidediv = ''
+        if pidx > 0:
+            hidediv = ' style="display:none;"'
 
-        # Go through data series
-        for idx, d in enumerate(pdata):
+        # Queue the figure to be drawn once all modules have run
+        embed = getattr(get_template_mod(), 'base64_plots', True) is True
+        html += flat_plots.add_plot(pid, matplotlib_linegraph_figure, (pdata, pconfig, pidx), hidediv, embed, fallback)
 
-            # Default colour index
-            cidx = idx
-            while cidx >= len(default_colors):
-                cidx -= len(default_colors)
 
-            # Line style
-            linestyle = 'solid'
-            if d.get('dashStyle', None) == 'Dash':
-                linestyle = 'dashed'
+    # Close wrapping div
+    html += '</div>'
 
-            # Reformat data (again)
-            try:
-                axes.plot([x[0] for x in d['data']], [x[1] for x in d['data']], label=d['name'], color=d.get('color', default_colors[cidx]), linestyle=linestyle, linewidth=1, marker=None)
-            except TypeError:
-                # Categorical data on x axis
-                axes.plot(d['data'], label=d['name'], color=d.get('color', default_colors[cidx]), linewidth=1, marker=None)
+    report.num_mpl_plots += 1
 
-        # Tidy up axes
-        axes.tick_params(labelsize=8, direction='out', left=False, right=False, top=False, bottom=False)
-        axes.set_xlabel(pconfig.get('xlab', ''))
-        axes.set_ylabel(pconfig.get('ylab', ''))
+    return flat_plots.add_group(pconfig['id'], html)
 
-        # Dataset specific y label
-        try:
-            axes.set_ylabel(pconfig['data_labels'][pidx]['ylab'])
-        except:
-            pass
 
-        # Axis limits
-        default_ylimits = axes.get_ylim()
-        ymin = default_ylimits[0]
-        if 'ymin' in pconfig:
-            ymin = pconfig['ymin']
-        elif 'yCeiling' in pconfig:
-            ymin = min(pconfig['yCeiling'], default_ylimits[0])
-        ymax = default_ylimits[1]
-        if 'ymax' in pconfig:
-            ymax = pconfig['ymax']
-        elif 'yFloor' in pconfig:
-            ymax = max(pconfig['yCeiling'], default_ylimits[1])
-        if (ymax - ymin) < pconfig.get('yMinRange', 0):
-            ymax = ymin + pconfig['yMinRange']
-        axes.set_ylim((ymin, ymax))
-
-        # Dataset specific ymax
+def matplotlib_linegraph_figure (pdata, pconfig, pidx):
+    """
+    Draw one dataset of a line graph with MatPlotLib. Called when the
+    flat plots queued by matplotlib_linegraph() are drawn.
+    :param pdata: List of series dicts for this dataset
+    :param pconfig: Plot config dict
+    :param pidx: Index of the dataset
+    :return: MatPlotLib figure and a dict of extra arguments for savefig()
+    """
+    # Set up figure
+    fig = plt.figure(figsize=(14, 6), frameon=False)
+    axes = fig.add_subplot(111)
+
+    # Go through data series
+    for idx, d in enumerate(pdata):
+
+        # Default colour index
+        cidx = idx
+        while cidx >= len(default_colors):
+            cidx -= len(default_colors)
+
+        # Line style
+        linestyle = 'solid'
+        if d.get('dashStyle', None) == 'Dash':
+            linestyle = 'dashed'
+
+        # Reformat data (again)
         try:
-            axes.set_ylim((ymin, pconfig['data_labels'][pidx]['ymax']))
-        except:
-            pass
+            axes.plot([x[0] for x in d['data']], [x[1] for x in d['data']], label=d['name'], color=d.get('color', default_colors[cidx]), linestyle=linestyle, linewidth=1, marker=None)
+        except TypeError:
+            # Categorical data on x axis
+            axes.plot(d['data'], label=d['name'], color=d.get('color', default_colors[cidx]), linewidth=1, marker=None)
+
+    # Tidy up axes
+    axes.tick_params(labelsize=8, direction='out', left=False, right=False, top=False, bottom=False)
+    axes.set_xlabel(pconfig.get('xlab', ''))
+    axes.set_ylabel(pconfig.get('ylab', ''))
+
+    # Dataset specific y label
+    try:
+        axes.set_ylabel(pconfig['data_labels'][pidx]['ylab'])
+    except:
+        pass
 
-        default_xlimits = axes.get_xlim()
-        xmin = default_xlimits[0]
-        if 'xmin' in pconfig:
-            xmin = pconfig['xmin']
-        elif 'xCeiling' in pconfig:
-            xmin = min(pconfig['xCeiling'], default_xlimits[0])
-        xmax = default_xlimits[1]
-        if 'xmax' in pconfig:
-            xmax = pconfig['xmax']
-        elif 'xFloor' in pconfig:
-            xmax = max(pconfig['xCeiling'], default_xlimits[1])
-        if (xmax - xmin) < pconfig.get('xMinRange', 0):
-            xmax = xmin + pconfig['xMinRange']
-        axes.set_xlim((xmin, xmax))
-
-        # Plot title
-        if 'title' in pconfig:
-            plt.text(0.5, 1.05, pconfig['title'], horizontalalignment='center', fontsize=16, transform=axes.transAxes)
-        axes.grid(True, zorder=10, which='both', axis='y', linestyle='-', color='#dedede', linewidth=1)
-
-        # X axis categories, if specified
-        if 'categories' in pconfig:
-            axes.set_xticks([i for i,v in enumerate(pconfig['categories'])])
-            axes.set_xticklabels(pconfig['categories'])
-
-        # Axis lines
+    # Axis limits
+    default_ylimits = axes.get_ylim()
+    ymin = default_ylimits[0]
+    if 'ymin' in pconfig:
+        ymin = pconfig['ymin']
+    elif 'yCeiling' in pconfig:
+        ymin = min(pconfig['yCeiling'], default_ylimits[0])
+    ymax = default_ylimits[1]
+    if 'ymax' in pconfig:
+        ymax = pconfig['ymax']
+    elif 'yFloor' in pconfig:
+        ymax = max(pconfig['yCeiling'], default_ylimits[1])
+    if (ymax - ymin) < pconfig.get('yMinRange', 0):
+        ymax = ymin + pconfig['yMinRange']
+    axes.set_ylim((ymin, ymax))
+
+    # Dataset specific ymax
+    try:
+        axes.set_ylim((ymin, pconfig['data_labels'][pidx]['ymax']))
+    except:
+        pass
+
+    default_xlimits = axes.get_xlim()
+    xmin = default_xlimits[0]
+    if 'xmin' in pconfig:
+        xmin = pconfig['xmin']
+    elif 'xCeiling' in pconfig:
+        xmin = min(pconfig['xCeiling'], default_xlimits[0])
+    xmax = default_xlimits[1]
+    if 'xmax' in pconfig:
+        xmax = pconfig['xmax']
+    elif 'xFloor' in pconfig:
+        xmax = max(pconfig['xCeiling'], default_xlimits[1])
+    if (xmax - xmin) < pconfig.get('xMinRange', 0):
+        xmax = xmin + pconfig['xMinRange']
+    axes.set_xlim((xmin, xmax))
+
+    # Plot title
+    if 'title' in pconfig:
+        plt.text(0.5, 1.05, pconfig['title'], horizontalalignment='center', fontsize=16, transform=axes.transAxes)
+    axes.grid(True, zorder=10, which='both', axis='y', linestyle='-', color='#dedede', linewidth=1)
+
+    # X axis categories, if specified
+    if 'categories' in pconfig:
+        axes.set_xticks([i for i,v in enumerate(pconfig['categories'])])
+        axes.set_xticklabels(pconfig['categories'])
+
+    # Axis lines
+    xlim = axes.get_xlim()
+    axes.plot([xlim[0], xlim[1]], [0, 0], linestyle='-', color='#dedede', linewidth=2)
+    axes.set_axisbelow(True)
+    axes.spines['right'].set_visible(False)
+    axes.spines['top'].set_visible(False)
+    axes.spines['bottom'].set_visible(False)
+    axes.spines['left'].set_visible(False)
+
+    # Background colours, if specified
+    if 'yPlotBands' in pconfig:
         xlim = axes.get_xlim()
-        axes.plot([xlim[0], xlim[1]], [0, 0], linestyle='-', color='#dedede', linewidth=2)
-        axes.set_axisbelow(True)
-        axes.spines['right'].set_visible(False)
-        axes.spines['top'].set_visible(False)
-        axes.spines['bottom'].set_visible(False)
-        axes.spines['left'].set_visible(False)
-
-        # Background colours, if specified
-        if 'yPlotBands' in pconfig:
-            xlim = axes.get_xlim()
-            for pb in pconfig['yPlotBands']:
-                axes.barh(pb['from'], xlim[1], height = pb['to']-pb['from'], left=xlim[0], color=pb['color'], linewidth=0, zorder=0)
-        if 'xPlotBands' in pconfig:
-            ylim = axes.get_ylim()
-            for pb in pconfig['xPlotBands']:
-                axes.bar(pb['from'], ylim[1], width = pb['to']-pb['from'], bottom=ylim[0], color=pb['color'], linewidth=0, zorder=0)
-
-        # Tight layout - makes sure that legend fits in and stuff
-        if len(pdata) <= 15:
-            axes.legend(loc='lower center', bbox_to_anchor=(0, -0.22, 1, .102), ncol=5, mode='expand', fontsize=8, frameon=False)
-            plt.tight_layout(rect=[0,0.08,1,0.92])
-        else:
-            plt.tight_layout(rect=[0,0,1,0.92])
+        for pb in pconfig['yPlotBands']:
+            axes.barh(pb['from'], xlim[1], height = pb['to']-pb['from'], left=xlim[0], color=pb['color'], linewidth=0, zorder=0)
+    if 'xPlotBands' in pconfig:
+        ylim = axes.get_ylim()
+        for pb in pconfig['xPlotBands']:
+            axes.bar(pb['from'], ylim[1], width = pb['to']-pb['from'], bottom=ylim[0], color=pb['color'], linewidth=0, zorder=0)
 
-        # Should this plot be hidden on report load?
-        hidediv = ''
-        if pidx > 0:
-            hidediv = ' style="display:none;"'
+    # Tight layout - makes sure that legend fits in and stuff
+    if len(pdata) <= 15:
+        axes.legend(loc='lower center', bbox_to_anchor=(0, -0.22, 1, .102), ncol=5, mode='expand', fontsize=8, frameon=False)
+        plt.tight_layout(rect=[0,0.08,1,0.92])
+    else:
+        plt.tight_layout(rect=[0,0,1,0.92])
 
-        # Save the plot to the data directory if export is requests
-        if config.export_plots:
-            for fformat in config.export_plot_formats:
-                # Make the directory if it doesn't already exist
-                plot_dir = os.path.join(config.plots_dir, fformat)
-                if not os.path.exists(plot_dir):
-                    os.makedirs(plot_dir)
-                # Save the plot
-                plot_fn = os.path.join(plot_dir, '{}.{}'.format(pid, fformat))
-                fig.savefig(plot_fn, format=fformat, bbox_inches='tight')
-
-        # Output the figure to a base64 encoded string
-        if getattr(get_template_mod(), 'base64_plots', True) is True:
-            img_buffer = io.BytesIO()
-            fig.savefig(img_buffer, format='png', bbox_inches='tight')
-            b64_img = base64.b64encode(img_buffer.getvalue()).decode('utf8')
-            img_buffer.close()
-            html += '<div class="mqc_mplplot" id="{}"{}><img src="data:image/png;base64,{}" /></div>'.format(pid, hidediv, b64_img)
-
-        # Save to a file and link <img>
-        else:
-            plot_relpath = os.path.join(config.plots_dir_name, 'png', '{}.png'.format(pid))
-            html += '<div class="mqc_mplplot" id="{}"{}><img src="{}" /></div>'.format(pid, hidediv, plot_relpath)
+    return fig, {}
 
-        plt.close(fig)
 
+def write_plot_data_file(pdata, pconfig, fn):
+    """
+    Save the data for one line graph dataset to a file in the data directory.
+    :param pdata: List of series dicts, as made by linegraph.plot()
+    :param pconfig: Plot config dict
+    :param fn: Filename, without the file extension
+    """
+    if config.data_dir is None:
+        return
+
+    fdata = OrderedDict()
+    lastcats = None
+    sharedcats = True
+    for d in pdata:
+        fdata[d['name']] = OrderedDict()
+        # Check to see if all categories are the same
+        if any(type(x) is list for x in d['data']):
+            cats = [x[0] for x in d['data']]
+            if lastcats is None:
+                lastcats = cats
+            elif lastcats != cats:
+                sharedcats = False
+        for i, x in enumerate(d['data']):
+            if type(x) is list:
+                fdata[d['name']][str(x[0])] = x[1]
+            else:
+                try:
+                    fdata[d['name']][pconfig['categories'][i]] = x
+                except (KeyError, IndexError):
+                    fdata[d['name']][str(i)] = x
 
-    # Close wrapping div
-    html += '</div>'
+    # Custom tsv output if the x axis varies
+    if not sharedcats and config.data_format == 'tsv':
+        fout = ''
+        for d in pdata:
+            fout += "\t"+"\t".join([str(x[0]) for x in d['data']])
+            fout += "\n{}\t".format(d['name'])
+            fout += "\t".join([str(x[1]) for x in d['data']])
+            fout += "\n"
+        with io.open (os.path.join(config.data_dir, '{}.txt'.format(fn)), 'w', encoding='utf-8') as f:
+            print( fout.encode('utf-8', 'ignore').decode('utf-8'), file=f )
+    else:
+        util_functions.write_data_file(fdata, fn)
+
+
+def _dataset_id(pconfig, k):
+    """ Return the ID for one dataset of a plot, before it is cleaned.
+    Also used for the name of the dataset's data file. """
+    try:
+        name = pconfig['data_labels'][k]['name']
+    except:
+        name = k+1
+    return 'mqc_{}_{}'.format(pconfig['id'], name)
 
-    report.num_mpl_plots += 1
 
-    return html
+def downsample_plotdata(plotdata, pconfig):
+    """
+    Reduce each series with more than the maximum number of points
+    (config.linegraph_max_points, or pconfig 'max_points') using
+    lttb_downsample(). When any series in a dataset is reduced, the full
+    resolution data for that dataset is saved to the data directory first.
+    Series with categories, missing values or non-numeric x values are left as they are.
+    :param plotdata: List of datasets, each a list of series dicts
+    :param pconfig: Plot config dict
+    :return: List of datasets, with downsampled series
+    """
+    max_points = pconfig.get('max_points')
+    if max_points is None:
+        max_points = config.linegraph_max_points
+    if not max_points or pconfig.get('categories'):
+        return plotdata
+
+    downsampled = list()
+    for k, pdata in enumerate(plotdata):
+        newdata = list()
+        num_reduced = 0
+        for d in pdata:
+            pairs = d.get('data', [])
+            if len(pairs) > max_points and _numeric_pairs(pairs):
+                reduced = lttb_downsample(pairs, max_points)
+                if len(reduced) < len(pairs):
+                    d = d.copy()
+                    d['data'] = reduced
+                    num_reduced += 1
+            newdata.append(d)
+        if num_reduced > 0:
+            try:
+                name = pconfig['data_labels'][k]['name']
+            except:
+                name = k+1
+            logger.debug("Downsampled {} series in plot '{}' ({}) to {} points".format(num_reduced, pconfig['id'], name, max_points))
+            # Always saved here, as the flat plot that also writes this file may not have been made
+            write_plot_data_file(pdata, pconfig, report.clean_htmlid(_dataset_id(pconfig, k)))
+        downsampled.append(newdata)
+    return downsampled
+
+
+def _numeric_pairs(pairs):
+    """ Check that every point is an [x, y] pair of numbers """
+    for p in pairs:
+        try:
+            x, y = p
+        except (TypeError, ValueError):
+            return False
+        # NaN is not equal to itself
+        if not isinstance(x, numbers.Real) or not isinstance(y, numbers.Real) or x != x or y != y:
+            return False
+    return True
+
+
+def lttb_downsample(pairs, threshold):
+    """
+    Reduce a line to a number of points with the Largest-Triangle-Three-Buckets
+    algorithm (Steinarsson, 2013). The points between the first and last are split
+    into equal buckets and the point in each bucket that makes the largest triangle
+    with the point picked from the previous bucket and the average of the next bucket
+    is kept, so that peaks and troughs survive.
+    :param pairs: List of [x, y] number pairs, sorted by x
+    :param threshold: Number of points to keep
+    :return: List of [x, y] pairs
+    """
+    n = len(pairs)
+    if threshold >= n or threshold < 3:
+        return pairs
+
+    xs = [p[0] for p in pairs]
+    ys = [p[1] for p in pairs]
+    every = float(n - 2) / (threshold - 2)
+    sampled = [pairs[0]]
+    a = 0
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_len = float(avg_end - avg_start)
+        avg_x = sum(xs[avg_start:avg_end]) / avg_len
+        avg_y = sum(ys[avg_start:avg_end]) / avg_len
+
+        # Point in this bucket making the largest triangle
+        start = int(math.floor(i * every)) + 1
+        end = avg_start
+        ax = xs[a]
+        ay = ys[a]
+        dx = ax - avg_x
+        dy = avg_y - ay
+        max_area = -1
+        next_a = start
+        for j in range(start, end):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > max_area:
+                max_area = area
+                next_a = j
+        sampled.append(pairs[next_a])
+        a = next_a
+    sampled.append(pairs[-1])
+    return sampled
 
 
 def smooth_line_data(data, numpoints, sumcounts=True):
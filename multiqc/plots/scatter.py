@@ -4,13 +4,12 @@
 
 import logging
 import random
-import os
 import numpy as np
 import re
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-from multiqc.utils import report, config
+from multiqc.utils import report, config, flat_plots
 from math import ceil
 
 logger = logging.getLogger(__name__)
@@ -134,11 +133,22 @@ def highcharts_scatter_plot (plotdata, pconfig=None):
     return html
 
 def export_scatter(plotdata, pconfig):
-    # for fformat in config.export_plot_formats: # Only need png for now
+    """ Queue a flat version of a scatter plot to be saved in the plots directory """
+    # define plot id
+    # name = pconfig['data_labels'][k].get('name','')
+    # pid = 'mqc_{}_{}'.format(pconfig['id'], name)
+    pid = 'mqc_{}'.format(pconfig['id'])
+    pid = report.save_htmlid(pid, skiplint=True)
+    flat_plots.add_plot(pid, export_scatter_figure, (plotdata, pconfig), embed=False)
+
+def export_scatter_figure(plotdata, pconfig):
+    """ Draw all datasets of a scatter plot with MatPlotLib, two per row.
+    Called when the flat plots queued by export_scatter() are drawn.
+    :return: MatPlotLib figure and a dict of extra arguments for savefig()
+    """
     nb_plots = len(plotdata)
     nb_rows = ceil((nb_plots * 1.0) / 2.0)
     vert_size = 7 * nb_rows
-    plt.axis('equal')
     p = plt.figure(figsize=(14, vert_size), frameon=False)
     num_pat = re.compile('[0-9]+')
     for k, single_pd in enumerate(plotdata):
@@ -152,18 +162,8 @@ def export_scatter(plotdata, pconfig):
         axes.tick_params(labelsize=8, direction='out', left=False, right=False, top=False, bottom=False)
         axes.set_xlabel(pconfig['data_labels'][k].get('xlab', ''))
         axes.set_ylabel(pconfig['data_labels'][k].get('ylab', ''))
-    # define plot id
-    # name = pconfig['data_labels'][k].get('name','')
-    # pid = 'mqc_{}_{}'.format(pconfig['id'], name)
-    pid = 'mqc_{}'.format(pconfig['id'])
-    pid = report.save_htmlid(pid, skiplint=True)
-    # Make the directory if it doesn't already exist
-    plot_dir = os.path.join(config.plots_dir, 'png')
-    if not os.path.exists(plot_dir):
-        os.makedirs(plot_dir)
-    # Make and save plot
-    plot_fn = os.path.join(plot_dir, '{}.{}'.format(pid, 'png'))
-    p.savefig(plot_fn, format='png')
+    # Saved without cropping to the plotted area
+    return p, {'bbox_inches': None}
 
 
 def matplotlib_scatter(single_pd, k, pconfig=None):
@@ -2,16 +2,20 @@
 
 """ MultiQC functions to plot a table """
 
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
+import functools
 import logging
+import numbers
+import operator
 import random
 
-from multiqc.utils import config, report, util_functions, mqc_colour
+from multiqc.utils import config, report, util_functions, mqc_colour, timing, general_stats
 from multiqc.plots import table_object, beeswarm
 logger = logging.getLogger(__name__)
 
 letters = 'abcdefghijklmnopqrstuvwxyz'
 
+@timing.time_plot('table')
 def plot (data, headers=None, pconfig=None):
     """ Return HTML for a MultiQC table.
     :param data: 2D dict, first keys as sample names, then x:y data pairs
@@ -27,10 +31,18 @@ def plot (data, headers=None, pconfig=None):
     dt = table_object.datatable(data, headers, pconfig)
 
     # Collect unique sample names
-    s_names = set()
-    for d in dt.data:
-        for s_name in d.keys():
-            s_names.add(s_name)
+    s_names = dt.data.sample_names()
+
+    # Draw big tables in the browser from the plot data, if enabled.
+    # Not possible in simple reports, which don't load multiqc_tables.js
+    virtual = pconfig.get('virtual')
+    if virtual is None:
+        virtual = config.virtual_tables is True and config.max_table_rows <= len(s_names) < config.max_virtual_table_rows
+    if config.simple_output:
+        virtual = False
+    if virtual is True:
+        logger.debug('Making virtual table, {} samples'.format(len(s_names)))
+        return make_virtual_table( dt )
 
     # Make a beeswarm plot if we have lots of samples
     if len(s_names) >= config.max_table_rows and pconfig.get('no_beeswarm') is not True:
@@ -55,7 +67,7 @@ def make_table (dt):
     t_headers = OrderedDict()
     t_modal_headers = OrderedDict()
     t_rows = OrderedDict()
-    dt.raw_vals = defaultdict(lambda: dict())
+    dt.raw_vals = general_stats.Section()
     empty_cells = dict()
     hidden_cols = 1
     table_title = dt.pconfig.get('table_title')
@@ -66,158 +78,85 @@ def make_table (dt):
 
         rid = header['rid']
 
-        # Build the table header cell
-        shared_key = ''
-        if header.get('shared_key', None) is not None:
-            shared_key = ' data-shared-key={}'.format(header['shared_key'])
-
+        # Build the table header cell and the modal table row
+        t_headers[rid], t_modal_headers[rid] = make_header_cells(table_id, k, header)
         hide = ''
-        muted = ''
-        checked = ' checked="checked"'
         if header.get('hidden', False) is True:
             hide = 'hidden'
-            muted = ' text-muted'
-            checked = ''
             hidden_cols += 1
 
-        data_attr = 'data-dmax="{}" data-dmin="{}" data-namespace="{}" {}' \
-            .format(header['dmax'], header['dmin'], header['namespace'], shared_key)
-
-        cell_contents = '<span class="mqc_table_tooltip" title="{}: {}">{}</span>' \
-            .format(header['namespace'], header['description'], header['title'])
-
-        t_headers[rid] = '<th id="header_{rid}" class="{rid} {h}" {da}>{c}</th>' \
-            .format(rid=rid, h=hide, da=data_attr, c=cell_contents)
-
         empty_cells[rid] = '<td class="data-coloured {rid} {h}"></td>'.format(rid=rid, h=hide)
 
-        # Build the modal table row
-        t_modal_headers[rid] = """
-        <tr class="{rid}{muted}" style="background-color: rgba({col}, 0.15);">
-          <td class="sorthandle ui-sortable-handle">||</span></td>
-          <td style="text-align:center;">
-            <input class="mqc_table_col_visible" type="checkbox" {checked} value="{rid}" data-target="#{tid}">
-          </td>
-          <td>{name}</td>
-          <td>{title}</td>
-          <td>{desc}</td>
-          <td>{col_id}</td>
-          <td>{sk}</td>
-        </tr>""".format(
-                rid = rid,
-                muted = muted,
-                checked = checked,
-                tid = table_id,
-                col = header['colour'],
-                name = header['namespace'],
-                title = header['title'],
-                desc = header['description'],
-                col_id = '<code>{}</code>'.format(k),
-                sk = header.get('shared_key', '')
-            )
-
         # Make a colour scale
         if header['scale'] == False:
             c_scale = None
         else:
-            c_scale = mqc_colour.mqc_colour_scale(header['scale'], header['dmin'], header['dmax'])
+            c_scale = mqc_colour.get_colour_scale(header['scale'], header['dmin'], header['dmax'])
+
+        # Get the values for this column
+        col_vals = get_column_values(dt, idx, k, header)
+
+        # Work out the cell colours for the whole column at once
+        if c_scale is not None:
+            col_colours = c_scale.get_colour_column([val for s_name, val in col_vals])
+        else:
+            col_colours = [None] * len(col_vals)
+
+        # Compile the conditional formatting rules for this column
+        cond_formatting = compile_cond_formatting(rid)
+
+        # This is horrible, but Python locale settings are worse
+        if len(col_vals) > 0:
+            if config.thousandsSep_format is None:
+                config.thousandsSep_format = '<span class="mqc_thousandSep"></span>'
+            if config.decimalPoint_format is None:
+                config.decimalPoint_format = '.'
 
         # Add the data table cells
-        for (s_name, samp) in dt.data[idx].items():
-            if k in samp:
-                val = samp[k]
-                kname = '{}_{}'.format(header['namespace'], rid)
-                dt.raw_vals[s_name][kname] = val
-
-                if 'modify' in header and callable(header['modify']):
-                    val = header['modify'](val)
-
-                try:
-                    dmin = header['dmin']
-                    dmax = header['dmax']
-                    percentage = ((float(val) - dmin) / (dmax - dmin)) * 100
-                    percentage = min(percentage, 100)
-                    percentage = max(percentage, 0)
-                except (ZeroDivisionError,ValueError):
-                    percentage = 0
-
-                try:
-                    valstring = str(header['format'].format(val))
-                except ValueError:
-                    try:
-                        valstring = str(header['format'].format(float(val)))
-                    except ValueError:
-                        valstring = str(val)
-                except:
-                    valstring = str(val)
-
-                # This is horrible, but Python locale settings are worse
-                if config.thousandsSep_format is None:
-                    config.thousandsSep_format = '<span class="mqc_thousandSep"></span>'
-                if config.decimalPoint_format is None:
-                    config.decimalPoint_format = '.'
-                valstring = valstring.replace('.', 'DECIMAL').replace(',', 'THOUSAND')
-                valstring = valstring.replace('DECIMAL', config.decimalPoint_format).replace('THOUSAND', config.thousandsSep_format)
-
-                # Percentage suffixes etc
-                valstring += header.get('suffix', '')
-
-                # Conditional formatting
-                cmatches = { cfck: False for cfc in config.table_cond_formatting_colours for cfck in cfc }
-                # Find general rules followed by column-specific rules
-                for cfk in ['all_columns', rid]:
-                    if cfk in config.table_cond_formatting_rules:
-                        # Loop through match types
-                        for ftype in cmatches.keys():
-                            # Loop through array of comparison types
-                            for cmp in config.table_cond_formatting_rules[cfk].get(ftype, []):
-                                try:
-                                    # Each comparison should be a dict with single key: val
-                                    if 's_eq' in cmp and str(cmp['s_eq']).lower() == str(val).lower():
-                                        cmatches[ftype] = True
-                                    if 's_contains' in cmp and str(cmp['s_contains']).lower() in str(val).lower():
-                                        cmatches[ftype] = True
-                                    if 's_ne' in cmp and str(cmp['s_ne']).lower() != str(val).lower():
-                                        cmatches[ftype] = True
-                                    if 'eq' in cmp and float(cmp['eq']) == float(val):
-                                        cmatches[ftype] = True
-                                    if 'ne' in cmp and float(cmp['ne']) != float(val):
-                                        cmatches[ftype] = True
-                                    if 'gt' in cmp and float(cmp['gt']) < float(val):
-                                        cmatches[ftype] = True
-                                    if 'lt' in cmp and float(cmp['lt']) > float(val):
-                                        cmatches[ftype] = True
-                                except:
-                                    logger.warn("Not able to apply table conditional formatting to '{}' ({})".format(val, cmp))
-                # Apply HTML in order of config keys
-                bgcol = None
-                for cfc in config.table_cond_formatting_colours:
-                    for cfck in cfc: # should always be one, but you never know
-                        if cmatches[cfck]:
-                            bgcol = cfc[cfck]
+        dmin = header['dmin']
+        dmax = header['dmax']
+        val_format = header.get('format')
+        suffix = header.get('suffix', '')
+        if not header['scale']:
+            td_start = '<td class="{rid} {h}">'.format(rid=rid, h=hide)
+        else:
+            td_start = '<td class="data-coloured {rid} {h}">'.format(rid=rid, h=hide)
+            cell_html = '<div class="wrapper"><span class="bar" style="width:{}%;{}"></span><span class="val">{}</span></div></td>'
+        for (s_name, val), colour in zip(col_vals, col_colours):
+            try:
+                percentage = ((float(val) - dmin) / (dmax - dmin)) * 100
+                percentage = min(percentage, 100)
+                percentage = max(percentage, 0)
+            except (ZeroDivisionError,ValueError):
+                percentage = 0
+
+            valstring = format_value(val, val_format)
+            valstring = valstring.replace('.', 'DECIMAL').replace(',', 'THOUSAND')
+            valstring = valstring.replace('DECIMAL', config.decimalPoint_format).replace('THOUSAND', config.thousandsSep_format)
+
+            # Percentage suffixes etc
+            valstring += suffix
+
+            # Conditional formatting
+            if len(cond_formatting) > 0:
+                bgcol = cond_formatting_colour(val, cond_formatting)
                 if bgcol is not None:
                     valstring = '<span class="badge" style="background-color:{}">{}</span>'.format(bgcol, valstring)
 
-                # Build HTML
-                if not header['scale']:
-                    if s_name not in t_rows:
-                        t_rows[s_name] = dict()
-                    t_rows[s_name][rid] = '<td class="{rid} {h}">{v}</td>'.format(rid=rid, h=hide, v=valstring)
+            # Build HTML
+            if s_name not in t_rows:
+                t_rows[s_name] = dict()
+            if not header['scale']:
+                t_rows[s_name][rid] = td_start + valstring + '</td>'
+            else:
+                if c_scale is not None:
+                    col = ' background-color:{};'.format(colour)
                 else:
-                    if c_scale is not None:
-                        col = ' background-color:{};'.format(c_scale.get_colour(val))
-                    else:
-                        col = ''
-                    bar_html = '<span class="bar" style="width:{}%;{}"></span>'.format(percentage, col)
-                    val_html = '<span class="val">{}</span>'.format(valstring)
-                    wrapper_html = '<div class="wrapper">{}{}</div>'.format(bar_html, val_html)
-
-                    if s_name not in t_rows:
-                        t_rows[s_name] = dict()
-                    t_rows[s_name][rid] = '<td class="data-coloured {rid} {h}">{c}</td>'.format(rid=rid, h=hide, c=wrapper_html)
+                    col = ''
+                t_rows[s_name][rid] = td_start + cell_html.format(percentage, col, valstring)
 
         # Remove header if we don't have any filled cells for it
-        if sum([len(rows) for rows in t_rows.values()]) == 0:
+        if len(t_rows) == 0:
             t_headers.pop(rid, None)
             t_modal_headers.pop(rid, None)
             logger.debug('Removing header {} from general stats table, as no data'.format(k))
@@ -227,76 +166,316 @@ def make_table (dt):
     #
 
     # Buttons above the table
-    html = ''
+    html = list()
     if not config.simple_output:
 
         # Copy Table Button
-        html += """
+        html.append("""
         <button type="button" class="mqc_table_copy_btn btn btn-default btn-sm" data-clipboard-target="#{tid}">
             <span class="glyphicon glyphicon-copy"></span> Copy table
         </button>
-        """.format(tid=table_id)
+        """.format(tid=table_id))
 
         # Configure Columns Button
         if len(t_headers) > 1:
-            html += """
+            html.append("""
             <button type="button" class="mqc_table_configModal_btn btn btn-default btn-sm" data-toggle="modal" data-target="#{tid}_configModal">
                 <span class="glyphicon glyphicon-th"></span> Configure Columns
             </button>
-            """.format(tid=table_id)
+            """.format(tid=table_id))
 
         # Sort By Highlight button
-        html += """
+        html.append("""
         <button type="button" class="mqc_table_sortHighlight btn btn-default btn-sm" data-target="#{tid}" data-direction="desc" style="display:none;">
             <span class="glyphicon glyphicon-sort-by-attributes-alt"></span> Sort by highlight
         </button>
-        """.format(tid=table_id)
+        """.format(tid=table_id))
 
         # Scatter Plot Button
         if len(t_headers) > 1:
-            html += """
+            html.append("""
             <button type="button" class="mqc_table_makeScatter btn btn-default btn-sm" data-toggle="modal" data-target="#tableScatterModal" data-table="#{tid}">
                 <span class="glyphicon glyphicon glyphicon-stats"></span> Plot
             </button>
-            """.format(tid=table_id)
+            """.format(tid=table_id))
 
         # "Showing x of y columns" text
-        html += """
+        html.append("""
         <small id="{tid}_numrows_text" class="mqc_table_numrows_text">Showing <sup id="{tid}_numrows" class="mqc_table_numrows">{nrows}</sup>/<sub>{nrows}</sub> rows and <sup id="{tid}_numcols" class="mqc_table_numcols">{ncols_vis}</sup>/<sub>{ncols}</sub> columns.</small>
-        """.format(tid=table_id, nrows=len(t_rows), ncols_vis = (len(t_headers)+1)-hidden_cols, ncols=len(t_headers))
+        """.format(tid=table_id, nrows=len(t_rows), ncols_vis = (len(t_headers)+1)-hidden_cols, ncols=len(t_headers)))
 
     # Build the table itself
     collapse_class = 'mqc-table-collapse' if len(t_rows) > 10 and config.collapse_tables else ''
-    html += """
+    html.append("""
         <div id="{tid}_container" class="mqc_table_container">
             <div class="table-responsive mqc-table-responsive {cc}">
                 <table id="{tid}" class="table table-condensed mqc_table" data-title="{title}">
-        """.format( tid=table_id, title=table_title, cc=collapse_class)
+        """.format( tid=table_id, title=table_title, cc=collapse_class))
 
     # Build the header row
     col1_header = dt.pconfig.get('col1_header', 'Sample Name')
-    html += '<thead><tr><th class="rowheader">{}</th>{}</tr></thead>'.format(col1_header, ''.join(t_headers.values()))
+    html.append('<thead><tr><th class="rowheader">{}</th>{}</tr></thead>'.format(col1_header, ''.join(t_headers.values())))
 
     # Build the table body
-    html += '<tbody>'
+    html.append('<tbody>')
     t_row_keys = t_rows.keys()
     if dt.pconfig.get('sortRows') is not False:
         t_row_keys = sorted(t_row_keys)
     for s_name in t_row_keys:
-        html += '<tr>'
+        row = t_rows[s_name]
+        html.append('<tr>')
         # Sample name row header
-        html += '<th class="rowheader" data-original-sn="{sn}">{sn}</th>'.format(sn=s_name)
-        for k in t_headers:
-            html += t_rows[s_name].get(k, empty_cells[k])
-        html += '</tr>'
-    html += '</tbody></table></div>'
+        html.append('<th class="rowheader" data-original-sn="{sn}">{sn}</th>'.format(sn=s_name))
+        html.extend([ row.get(k, empty_cells[k]) for k in t_headers ])
+        html.append('</tr>')
+    html.append('</tbody></table></div>')
     if len(t_rows) > 10 and config.collapse_tables:
-        html += '<div class="mqc-table-expand"><span class="glyphicon glyphicon-chevron-down" aria-hidden="true"></span></div>'
-    html += '</div>'
+        html.append('<div class="mqc-table-expand"><span class="glyphicon glyphicon-chevron-down" aria-hidden="true"></span></div>')
+    html.append('</div>')
 
     # Build the bootstrap modal to customise columns and order
     if not config.simple_output:
-        html += """
+        html.append(make_columns_modal(table_id, table_title, t_modal_headers.values()))
+
+    # Save the raw values to a file if requested
+    save_raw_values(dt, table_id)
+
+    return ''.join(html)
+
+
+def make_virtual_table (dt):
+    """
+    Build a MultiQC table that is drawn in the browser, a screenful of rows
+    at a time. The table values are saved in the report plot data as one list
+    per column, instead of as HTML for every cell.
+    :param dt: MultiQC datatable object
+    :return: HTML ready to be inserted into the page
+    """
+
+    table_id = dt.pconfig.get('id', 'table_{}'.format(''.join(random.sample(letters, 4))) )
+    table_id = report.save_htmlid(table_id)
+    t_headers = OrderedDict()
+    t_modal_headers = OrderedDict()
+    dt.raw_vals = general_stats.Section()
+    hidden_cols = 1
+    table_title = dt.pconfig.get('table_title')
+    if table_title is None:
+        table_title = table_id.replace("_", " ").title()
+
+    # Collect the values for each column
+    columns = list()
+    s_names = OrderedDict()
+    for idx, k, header in dt.get_headers_in_order():
+        t_headers[header['rid']], t_modal_headers[header['rid']] = make_header_cells(table_id, k, header)
+        if header.get('hidden', False) is True:
+            hidden_cols += 1
+        col_vals = get_column_values(dt, idx, k, header)
+        for s_name, val in col_vals:
+            s_names[s_name] = None
+        columns.append((header, col_vals))
+
+    s_names = list(s_names.keys())
+    if dt.pconfig.get('sortRows') is not False:
+        s_names = sorted(s_names)
+    s_idx = dict((s_name, i) for i, s_name in enumerate(s_names))
+
+    # This is horrible, but Python locale settings are worse
+    if len(s_names) > 0:
+        if config.thousandsSep_format is None:
+            config.thousandsSep_format = '<span class="mqc_thousandSep"></span>'
+        if config.decimalPoint_format is None:
+            config.decimalPoint_format = '.'
+
+    # Make the plot data - raw values for sorting, colours and bars,
+    # and formatted text for display. Missing values are None.
+    plot_columns = list()
+    for header, col_vals in columns:
+        rid = header['rid']
+        values = [None] * len(s_names)
+        text = [None] * len(s_names)
+        badges = dict()
+        val_format = header.get('format')
+        cond_formatting = compile_cond_formatting(rid)
+        for s_name, val in col_vals:
+            i = s_idx[s_name]
+            if isinstance(val, numbers.Number) and not isinstance(val, bool) and val == val and abs(val) != float('inf'):
+                values[i] = val if type(val) in (int, float) else float(val)
+            else:
+                values[i] = str(val)
+            text[i] = format_value(val, val_format)
+            if len(cond_formatting) > 0:
+                bgcol = cond_formatting_colour(val, cond_formatting)
+                if bgcol is not None:
+                    badges[i] = bgcol
+        scale = None
+        if header['scale'] != False:
+            c_scale = mqc_colour.get_colour_scale(header['scale'], header['dmin'], header['dmax'])
+            scale = { 'domain': c_scale.domain.tolist(), 'rgb': c_scale.rgb.tolist() }
+        plot_columns.append({
+            'rid': rid,
+            'dmin': header['dmin'],
+            'dmax': header['dmax'],
+            'suffix': header.get('suffix', ''),
+            'bar': bool(header['scale']),
+            'scale': scale,
+            'values': values,
+            'text': text,
+            'badges': badges
+        })
+
+    report.plot_data[table_id] = {
+        'plot_type': 'table',
+        'samples': s_names,
+        'columns': plot_columns,
+        'config': {
+            'id': table_id,
+            'title': table_title,
+            'decimalPoint': config.decimalPoint_format,
+            'thousandsSep': config.thousandsSep_format
+        }
+    }
+
+    #
+    # Put everything together
+    #
+
+    # Buttons above the table
+    html = list()
+    if not config.simple_output:
+
+        # Configure Columns Button
+        if len(t_headers) > 1:
+            html.append("""
+            <button type="button" class="mqc_table_configModal_btn btn btn-default btn-sm" data-toggle="modal" data-target="#{tid}_configModal">
+                <span class="glyphicon glyphicon-th"></span> Configure Columns
+            </button>
+            """.format(tid=table_id))
+
+        # Scatter Plot Button
+        if len(t_headers) > 1:
+            html.append("""
+            <button type="button" class="mqc_table_makeScatter btn btn-default btn-sm" data-toggle="modal" data-target="#tableScatterModal" data-table="#{tid}">
+                <span class="glyphicon glyphicon glyphicon-stats"></span> Plot
+            </button>
+            """.format(tid=table_id))
+
+        # "Showing x of y columns" text
+        html.append("""
+        <small id="{tid}_numrows_text" class="mqc_table_numrows_text">Showing <sup id="{tid}_numrows" class="mqc_table_numrows">{nrows}</sup>/<sub>{nrows}</sub> rows and <sup id="{tid}_numcols" class="mqc_table_numcols">{ncols_vis}</sup>/<sub>{ncols}</sub> columns.</small>
+        """.format(tid=table_id, nrows=len(s_names), ncols_vis = (len(t_headers)+1)-hidden_cols, ncols=len(t_headers)))
+
+    # Build the table, with an empty body to be filled in by the browser
+    col1_header = dt.pconfig.get('col1_header', 'Sample Name')
+    html.append("""
+        <div id="{tid}_container" class="mqc_table_container">
+            <div class="table-responsive mqc-table-responsive mqc-table-collapse">
+                <table id="{tid}" class="table table-condensed mqc_table mqc_virtual_table" data-title="{title}">
+        """.format( tid=table_id, title=table_title))
+    html.append('<thead><tr><th class="rowheader">{}</th>{}</tr></thead>'.format(col1_header, ''.join(t_headers.values())))
+    html.append('<tbody></tbody></table></div></div>')
+
+    # Build the bootstrap modal to customise columns and order
+    if not config.simple_output:
+        html.append(make_columns_modal(table_id, table_title, t_modal_headers.values()))
+
+    # Save the raw values to a file if requested
+    save_raw_values(dt, table_id)
+
+    return ''.join(html)
+
+
+def get_column_values (dt, idx, k, header):
+    """
+    Get the values for one table column, saving the raw values in dt.raw_vals
+    and applying any modify function from the header.
+    :param dt: MultiQC datatable object
+    :param idx: Index of the table section in the datatable
+    :param k: Data key for the column
+    :param header: Header config for the column
+    :return: List of (sample name, value) tuples
+    """
+    s_names, vals = dt.data[idx].column(k)
+    dt.raw_vals.set_column('{}_{}'.format(header['namespace'], header['rid']), s_names, vals)
+    if 'modify' in header and callable(header['modify']):
+        vals = [ header['modify'](val) for val in vals ]
+    return list(zip(s_names, vals))
+
+
+def format_value (val, val_format):
+    """ Format a table value with the column's format string, falling back
+    to the plain value if it can't be formatted """
+    try:
+        return str(val_format.format(val))
+    except ValueError:
+        try:
+            return str(val_format.format(float(val)))
+        except ValueError:
+            return str(val)
+    except:
+        return str(val)
+
+
+def make_header_cells (table_id, k, header):
+    """
+    Build the HTML for a table column header, and for the column's row in the
+    Configure Columns modal.
+    :param table_id: HTML ID of the table
+    :param k: Data key for the column
+    :param header: Header config for the column, from the datatable object
+    :return: Tuple of header cell HTML, modal table row HTML
+    """
+    rid = header['rid']
+    shared_key = ''
+    if header.get('shared_key', None) is not None:
+        shared_key = ' data-shared-key={}'.format(header['shared_key'])
+
+    hide = ''
+    muted = ''
+    checked = ' checked="checked"'
+    if header.get('hidden', False) is True:
+        hide = 'hidden'
+        muted = ' text-muted'
+        checked = ''
+
+    data_attr = 'data-dmax="{}" data-dmin="{}" data-namespace="{}" {}' \
+        .format(header['dmax'], header['dmin'], header['namespace'], shared_key)
+
+    cell_contents = '<span class="mqc_table_tooltip" title="{}: {}">{}</span>' \
+        .format(header['namespace'], header['description'], header['title'])
+
+    th = '<th id="header_{rid}" class="{rid} {h}" {da}>{c}</th>' \
+        .format(rid=rid, h=hide, da=data_attr, c=cell_contents)
+
+    modal_row = """
+        <tr class="{rid}{muted}" style="background-color: rgba({col}, 0.15);">
+          <td class="sorthandle ui-sortable-handle">||</span></td>
+          <td style="text-align:center;">
+            <input class="mqc_table_col_visible" type="checkbox" {checked} value="{rid}" data-target="#{tid}">
+          </td>
+          <td>{name}</td>
+          <td>{title}</td>
+          <td>{desc}</td>
+          <td>{col_id}</td>
+          <td>{sk}</td>
+        </tr>""".format(
+            rid = rid,
+            muted = muted,
+            checked = checked,
+            tid = table_id,
+            col = header['colour'],
+            name = header['namespace'],
+            title = header['title'],
+            desc = header['description'],
+            col_id = '<code>{}</code>'.format(k),
+            sk = header.get('shared_key', '')
+        )
+
+    return th, modal_row
+
+
+def make_columns_modal (table_id, table_title, modal_rows):
+    """ Build the bootstrap modal to customise table columns and their order """
+    return """
     <!-- MultiQC Table Columns Modal -->
     <div class="modal fade" id="{tid}_configModal" tabindex="-1">
       <div class="modal-dialog modal-lg">
@@ -329,12 +508,98 @@ def make_table (dt):
             </table>
         </div>
         <div class="modal-footer"> <button type="button" class="btn btn-default" data-dismiss="modal">Close</button> </div>
-    </div> </div> </div>""".format( tid=table_id, title=table_title, trows=''.join(t_modal_headers.values()) )
+    </div> </div> </div>""".format( tid=table_id, title=table_title, trows=''.join(modal_rows) )
 
-    # Save the raw values to a file if requested
+
+def save_raw_values (dt, table_id):
+    """ Save the raw table values to a file if requested """
     if dt.pconfig.get('save_file') is True:
         fn = dt.pconfig.get('raw_data_fn', 'multiqc_{}'.format(table_id) )
         util_functions.write_data_file(dt.raw_vals, fn )
         report.saved_raw_data[fn] = dt.raw_vals
 
-    return html
+
+# Conditional formatting comparisons, in the order that they are checked.
+# Each is (key, compare as lower case strings, function to make a predicate from the rule value)
+cond_formatting_tests = [
+    ('s_eq', True, lambda r: functools.partial(operator.eq, r)),
+    ('s_contains', True, lambda r: lambda v: r in v),
+    ('s_ne', True, lambda r: functools.partial(operator.ne, r)),
+    ('eq', False, lambda r: functools.partial(operator.eq, r)),
+    ('ne', False, lambda r: functools.partial(operator.ne, r)),
+    ('gt', False, lambda r: functools.partial(operator.lt, r)),
+    ('lt', False, lambda r: functools.partial(operator.gt, r))
+]
+
+
+def compile_cond_formatting(rid):
+    """ Compile the conditional formatting rules that apply to a table column,
+    so that the rule values only need to be parsed once per column.
+    :param rid: Column ID
+    :return: List of (match type, rule, [(string comparison, predicate)])
+    """
+    ftypes = [ cfck for cfc in config.table_cond_formatting_colours for cfck in cfc ]
+    rules = list()
+    # General rules followed by column-specific rules
+    for cfk in ['all_columns', rid]:
+        if cfk in config.table_cond_formatting_rules:
+            for ftype in ftypes:
+                # Each comparison should be a dict with single key: val
+                s_eq = set()
+                for cmp in config.table_cond_formatting_rules[cfk].get(ftype, []):
+                    # Plain string matches are checked together with a set
+                    if isinstance(cmp, dict) and list(cmp.keys()) == ['s_eq']:
+                        s_eq.add(str(cmp['s_eq']).lower())
+                    else:
+                        rules.append((ftype, cmp, _compile_comparison(cmp)))
+                if len(s_eq) > 0:
+                    rules.append((ftype, {'s_eq': sorted(s_eq)}, [(True, frozenset(s_eq).__contains__)]))
+    return rules
+
+
+def _compile_comparison(cmp):
+    """ Return a list of (string comparison, predicate) for one conditional formatting rule.
+    Bad rules give a predicate that raises, so that they are reported for each value as before. """
+    predicates = list()
+    try:
+        for key, is_str, make_predicate in cond_formatting_tests:
+            if key in cmp:
+                rval = str(cmp[key]).lower() if is_str else float(cmp[key])
+                predicates.append((is_str, make_predicate(rval)))
+    except Exception as e:
+        def bad_rule(v, e=e):
+            raise e
+        predicates.append((False, bad_rule))
+    return predicates
+
+
+def cond_formatting_colour(val, rules):
+    """ Find the conditional formatting background colour for a table value.
+    :param val: Value from the table cell
+    :param rules: Compiled rules from compile_cond_formatting()
+    :return: Colour string, or None if no rules matched
+    """
+    matches = set()
+    sval = fval = None
+    for ftype, cmp, predicates in rules:
+        try:
+            for is_str, predicate in predicates:
+                if is_str:
+                    if sval is None:
+                        sval = str(val).lower()
+                    matched = predicate(sval)
+                else:
+                    if fval is None:
+                        fval = float(val)
+                    matched = predicate(fval)
+                if matched:
+                    matches.add(ftype)
+        except:
+            logger.warn("Not able to apply table conditional formatting to '{}' ({})".format(val, cmp))
+    # Apply colours in order of config keys
+    bgcol = None
+    for cfc in config.table_cond_formatting_colours:
+        for cfck in cfc: # should always be one, but you never know
+            if cfck in matches:
+                bgcol = cfc[cfck]
+    return bgcol
@@ -3,10 +3,11 @@
 """ MultiQC datatable class, used by tables and beeswarm plots """
 
 from collections import defaultdict, OrderedDict
+from itertools import chain
 import logging
 import re
 
-from multiqc.utils import config, report
+from multiqc.utils import config, report, general_stats
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +23,16 @@ class datatable (object):
             pconfig = {}
 
         # Given one dataset - turn it into a list
-        if type(data) is not list:
+        if type(data) is not list and not isinstance(data, general_stats.GeneralStats):
             data = [data]
         if type(headers) is not list:
             headers = [headers]
 
+        # Keep the data in columns. Sample names and keys are converted to strings.
+        if not isinstance(data, general_stats.GeneralStats):
+            data = general_stats.GeneralStats(data)
+        data.build()
+
         sectcols = ['55,126,184', '77,175,74', '152,78,163', '255,127,0', '228,26,28', '255,255,51', '166,86,40', '247,129,191', '153,153,153']
         shared_keys = defaultdict(lambda: dict())
 
@@ -38,11 +44,7 @@ class datatable (object):
                 keys = headers[idx].keys()
                 assert len(keys) > 0
             except (IndexError, AttributeError, AssertionError):
-                keys = list()
-                for samp in d.values():
-                    for k in samp.keys():
-                        if k not in keys:
-                            keys.append(k)
+                keys = d.column_keys()
                 try:
                     headers[idx]
                 except IndexError:
@@ -55,21 +57,9 @@ class datatable (object):
             keys = [str(k) for k in keys]
             for k in list(headers[idx].keys()):
                 headers[idx][str(k)] = headers[idx].pop(k)
-            # Ensure that all sample names are strings as well
-            data[idx] = {str(k):v for k,v in data[idx].items()}
-            for s_name in data[idx].keys():
-                for k in list(data[idx][s_name].keys()):
-                    data[idx][s_name][str(k)] = data[idx][s_name].pop(k)
 
             # Check that we have some data in each column
-            empties = list()
-            for k in keys:
-                n = 0
-                for samp in d.values():
-                    if k in samp:
-                        n += 1
-                if n == 0:
-                    empties.append(k)
+            empties = [k for k in keys if d.column_count(k) == 0]
             for k in empties:
                 keys = [j for j in keys if j != k]
                 del headers[idx][k]
@@ -150,19 +140,23 @@ class datatable (object):
 
                 # Figure out the min / max if not supplied
                 if setdmax or setdmin:
-                    for s_name, samp in data[idx].items():
-                        try:
-                            val = float(samp[k])
-                            if callable(headers[idx][k]['modify']):
-                                val = float(headers[idx][k]['modify'](val))
-                            if setdmax:
-                                headers[idx][k]['dmax'] = max(headers[idx][k]['dmax'], val)
-                            if setdmin:
-                                headers[idx][k]['dmin'] = min(headers[idx][k]['dmin'], val)
-                        except ValueError:
-                            val = samp[k] # couldn't convert to float - keep as a string
-                        except KeyError:
-                            pass # missing data - skip
+                    modify = headers[idx][k]['modify']
+                    if d.column_is_numeric(k) and not callable(modify):
+                        vals = [ float(val) for val in d.column_values(k) ]
+                    else:
+                        vals = list()
+                        for val in d.column_values(k):
+                            try:
+                                val = float(val)
+                                if callable(modify):
+                                    val = float(modify(val))
+                                vals.append(val)
+                            except ValueError:
+                                pass # couldn't convert to float - skip strings
+                    if setdmax:
+                        headers[idx][k]['dmax'] = max(chain([headers[idx][k]['dmax']], vals))
+                    if setdmin:
+                        headers[idx][k]['dmin'] = min(chain([headers[idx][k]['dmin']], vals))
                     # Limit auto-generated scales with floor, ceiling and minRange.
                     if headers[idx][k]['ceiling'] is not None and headers[idx][k]['max'] is None:
                         headers[idx][k]['dmax'] = min(headers[idx][k]['dmax'], float(headers[idx][k]['ceiling']))
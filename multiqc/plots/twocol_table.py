@@ -2,11 +2,11 @@
 
 """ MultiQC functions to plot a table """
 
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
 import logging
 import random
 
-from multiqc.utils import config, report, util_functions, mqc_colour
+from multiqc.utils import config, report, util_functions, mqc_colour, general_stats
 from multiqc.plots import table_object, beeswarm
 logger = logging.getLogger(__name__)
 
@@ -27,10 +27,7 @@ def plot (data, headers=None, pconfig=None):
     dt = table_object.datatable(data, headers, pconfig)
 
     # Collect unique sample names
-    s_names = set()
-    for d in dt.data:
-        for s_name in d.keys():
-            s_names.add(s_name)
+    s_names = dt.data.sample_names()
 
     return make_table ( dt )
 
@@ -46,7 +43,7 @@ def make_table (dt):
     t_headers = OrderedDict()
     t_modal_headers = OrderedDict()
     t_rows = OrderedDict()
-    dt.raw_vals = defaultdict(lambda: dict())
+    dt.raw_vals = general_stats.Section()
     empty_cells = dict()
     hidden_cols = 1
     table_title = dt.pconfig.get('table_title')
@@ -114,60 +111,58 @@ def make_table (dt):
             c_scale = mqc_colour.mqc_colour_scale(header['scale'], header['dmin'], header['dmax'])
 
         # Add the data table cells
-        for (s_name, samp) in dt.data[idx].items():
-            if k in samp:
-                val = samp[k]
-                kname = '{}_{}'.format(header['namespace'], rid)
-                dt.raw_vals[s_name][kname] = val
-
-                if 'modify' in header and callable(header['modify']):
-                    val = header['modify'](val)
-
+        kname = '{}_{}'.format(header['namespace'], rid)
+        for s_name, val in dt.data[idx].column_items(k):
+            dt.raw_vals.set_value(s_name, kname, val)
+
+            if 'modify' in header and callable(header['modify']):
+                val = header['modify'](val)
+
+            try:
+                dmin = header['dmin']
+                dmax = header['dmax']
+                percentage = ((float(val) - dmin) / (dmax - dmin)) * 100
+                percentage = min(percentage, 100)
+                percentage = max(percentage, 0)
+            except (ZeroDivisionError,ValueError):
+                percentage = 0
+
+            try:
+                valstring = str(header['format'].format(val))
+            except ValueError:
                 try:
-                    dmin = header['dmin']
-                    dmax = header['dmax']
-                    percentage = ((float(val) - dmin) / (dmax - dmin)) * 100
-                    percentage = min(percentage, 100)
-                    percentage = max(percentage, 0)
-                except (ZeroDivisionError,ValueError):
-                    percentage = 0
-
-                try:
-                    valstring = str(header['format'].format(val))
+                    valstring = str(header['format'].format(float(val)))
                 except ValueError:
-                    try:
-                        valstring = str(header['format'].format(float(val)))
-                    except ValueError:
-                        valstring = str(val)
-                except:
                     valstring = str(val)
-
-                # This is horrible, but Python locale settings are worse
-                if config.thousandsSep_format is None:
-                    config.thousandsSep_format = '<span class="mqc_thousandSep"></span>'
-                if config.decimalPoint_format is None:
-                    config.decimalPoint_format = '.'
-                valstring = valstring.replace('.', 'DECIMAL').replace(',', 'THOUSAND')
-                valstring = valstring.replace('DECIMAL', config.decimalPoint_format).replace('THOUSAND', config.thousandsSep_format)
-
-                # Percentage suffixes etc
-                valstring += header.get('suffix', '')
-                # Build HTML
-                if s_name not in t_rows:
-                    t_rows[s_name] = dict()
-                t_rows[s_name][rid] = '<td class="{rid} {h}">{v}</td>'.format(rid=rid, h=hide, v=valstring)
-                # else:
-                #     if c_scale is not None:
-                #         col = ' background-color:{};'.format(c_scale.get_colour(val))
-                #     else:
-                #         col = ''
-                #     bar_html = '<span class="bar" style="width:{}%;{}"></span>'.format(percentage, col)
-                #     val_html = '<span class="val">{}</span>'.format(valstring)
-                #     wrapper_html = '<div class="wrapper">{}{}</div>'.format(bar_html, val_html)
-                #
-                #     if s_name not in t_rows:
-                #         t_rows[s_name] = dict()
-                #     t_rows[s_name][rid] = '<td class="data-coloured {rid} {h}">{c}</td>'.format(rid=rid, h=hide, c=wrapper_html)
+            except:
+                valstring = str(val)
+
+            # This is horrible, but Python locale settings are worse
+            if config.thousandsSep_format is None:
+                config.thousandsSep_format = '<span class="mqc_thousandSep"></span>'
+            if config.decimalPoint_format is None:
+                config.decimalPoint_format = '.'
+            valstring = valstring.replace('.', 'DECIMAL').replace(',', 'THOUSAND')
+            valstring = valstring.replace('DECIMAL', config.decimalPoint_format).replace('THOUSAND', config.thousandsSep_format)
+
+            # Percentage suffixes etc
+            valstring += header.get('suffix', '')
+            # Build HTML
+            if s_name not in t_rows:
+                t_rows[s_name] = dict()
+            t_rows[s_name][rid] = '<td class="{rid} {h}">{v}</td>'.format(rid=rid, h=hide, v=valstring)
+            # else:
+            #     if c_scale is not None:
+            #         col = ' background-color:{};'.format(c_scale.get_colour(val))
+            #     else:
+            #         col = ''
+            #     bar_html = '<span class="bar" style="width:{}%;{}"></span>'.format(percentage, col)
+            #     val_html = '<span class="val">{}</span>'.format(valstring)
+            #     wrapper_html = '<div class="wrapper">{}{}</div>'.format(bar_html, val_html)
+            #
+            #     if s_name not in t_rows:
+            #         t_rows[s_name] = dict()
+            #     t_rows[s_name][rid] = '<td class="data-coloured {rid} {h}">{c}</td>'.format(rid=rid, h=hide, c=wrapper_html)
 
         # Remove header if we don't have any filled cells for it
         if sum([len(rows) for rows in t_rows.values()]) == 0:
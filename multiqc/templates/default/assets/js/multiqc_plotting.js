@@ -17,6 +17,80 @@ window.mqc_hide_f_texts = [];
 window.mqc_hide_regex_mode = false;
 window.HCDefaults = undefined;
 
+// Decompress the plot data embedded in the report. zlib data is prefixed with 'zlib:',
+// anything else was compressed with lzstring
+function mqc_decompress_plotdata(data){
+  if(data.substr(0, 5) == 'zlib:'){
+    var binary = atob(data.substr(5));
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++){
+      bytes[i] = binary.charCodeAt(i);
+    }
+    return JSON.parse(mqc_utf8_decode(mqc_inflate(bytes)));
+  }
+  return JSON.parse(LZString.decompressFromBase64(data));
+}
+
+// Turn UTF-8 bytes into a string
+function mqc_utf8_decode(bytes){
+  if(typeof TextDecoder !== 'undefined'){
+    return new TextDecoder('utf-8').decode(bytes);
+  }
+  var chunks = [];
+  for (var i = 0; i < bytes.length; i += 8192){
+    chunks.push(String.fromCharCode.apply(null, bytes.subarray(i, i + 8192)));
+  }
+  return decodeURIComponent(escape(chunks.join('')));
+}
+
+// Make heatmap [x, y, value] points from values saved as a base64 typed array.
+// NaN values become null, which HighCharts leaves empty
+function mqc_heatmap_points(typed_data){
+  var binary = atob(typed_data['data']);
+  var bytes = new Uint8Array(binary.length);
+  for (var i = 0; i < binary.length; i++){
+    bytes[i] = binary.charCodeAt(i);
+  }
+  var values = typed_data['dtype'] == 'float32' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+  var rows = typed_data['shape'][0];
+  var cols = typed_data['shape'][1];
+  var points = [];
+  for (var y = 0; y < rows; y++){
+    for (var x = 0; x < cols; x++){
+      var val = values[y * cols + x];
+      points.push([x, y, isNaN(val) ? null : val]);
+    }
+  }
+  return points;
+}
+
+// Set up plot data saved as one chunk per plot (config plot_data_lazy). Each chunk
+// is only decompressed the first time that its mqc_plots entry is used.
+// Returns true if there were any chunks
+function mqc_register_plot_chunks(){
+  var num_chunks = 0;
+  $('script.mqc_plot_data').each(function(){
+    var el = this;
+    var target = $(el).attr('data-plotid');
+    Object.defineProperty(mqc_plots, target, {
+      configurable: true,
+      enumerable: true,
+      get: function(){
+        var data = mqc_decompress_plotdata($.trim($(el).text()));
+        mqc_set_plot_data(target, data);
+        $(el).remove();
+        return data;
+      },
+      set: function(data){ mqc_set_plot_data(target, data); }
+    });
+    num_chunks++;
+  });
+  return num_chunks > 0;
+}
+function mqc_set_plot_data(target, data){
+  Object.defineProperty(mqc_plots, target, { value: data, writable: true, configurable: true, enumerable: true });
+}
+
 // Execute when page load has finished loading
 $(function () {
 
@@ -24,7 +98,9 @@ $(function () {
   $('.mqc_loading_warning').show();
 
   // Decompress the JSON plot data
-  mqc_plots = JSON.parse(LZString.decompressFromBase64(mqc_compressed_plotdata));
+  mqc_plots = mqc_decompress_plotdata(mqc_compressed_plotdata);
+  var lazy_plot_data = mqc_register_plot_chunks();
+  $(document).trigger('mqc_plotdata_loaded');
 
   // HighCharts Defaults
   window.HCDefaults = $.extend(true, {}, Highcharts.getOptions(), {});
@@ -62,18 +138,36 @@ $(function () {
   });
 
   // Render plots on page load
-  $('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').each(function(){
-    var target = $(this).attr('id');
-    // Only one point per dataset, so multiply limit by arbitrary number.
-    var max_num = num_datasets_plot_limit * 50;
-    // Deferring each plot call prevents browser from locking up
-    setTimeout(function(){
-        plot_graph(target, undefined, max_num);
-        if($('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').length == 0){
-          $('.mqc_loading_warning').hide();
+  // Only one point per dataset, so multiply limit by arbitrary number.
+  var max_num = num_datasets_plot_limit * 50;
+  if(lazy_plot_data && 'IntersectionObserver' in window){
+    // Plot data is in separate chunks - only decompress and render plots as they scroll into view
+    var plot_observer = new IntersectionObserver(function(entries, observer){
+      entries.forEach(function(entry){
+        if(entry.isIntersecting){
+          observer.unobserve(entry.target);
+          if($(entry.target).hasClass('not_rendered')){
+            plot_graph(entry.target.id, undefined, max_num);
+          }
         }
-    }, 50);
-  });
+      });
+    }, { rootMargin: '200px 0px' });
+    $('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').each(function(){
+      plot_observer.observe(this);
+    });
+    $('.mqc_loading_warning').hide();
+  } else {
+    $('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').each(function(){
+      var target = $(this).attr('id');
+      // Deferring each plot call prevents browser from locking up
+      setTimeout(function(){
+          plot_graph(target, undefined, max_num);
+          if($('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').length == 0){
+            $('.mqc_loading_warning').hide();
+          }
+      }, 50);
+    });
+  }
   if($('.hc-plot.not_rendered:visible:not(.gt_max_num_ds)').length == 0){
     $('.mqc_loading_warning').hide();
   }
@@ -1155,6 +1249,12 @@ function plot_heatmap(target, ds){
 
   if(config['square'] === undefined){ config['square'] = true; }
 
+  // Big heatmaps are saved as a typed array - make the points the first time
+  if(mqc_plots[target]['data'] === undefined && mqc_plots[target]['typed_data'] !== undefined){
+    mqc_plots[target]['data'] = mqc_heatmap_points(mqc_plots[target]['typed_data']);
+    delete mqc_plots[target]['typed_data'];
+  }
+
   // Make a clone of the data, so that we can mess with it,
   // while keeping the original data in tact
   var data = JSON.parse(JSON.stringify(mqc_plots[target]['data']));
@@ -1365,11 +1465,13 @@ function plot_heatmap(target, ds){
 
   // We set undefined config vars so that they stay the same when hiding samples
   if(config['min'] === undefined || config['max'] === undefined){
-    var dmin = data[0][2];
-    var dmax = data[0][2];
+    var dmin = undefined;
+    var dmax = undefined;
     for (n=0; n < data.length; n++) {
-      dmin = Math.min(dmin, data[n][2]);
-      dmax = Math.max(dmax, data[n][2]);
+      // Skip empty cells
+      if(data[n][2] === null || data[n][2] === undefined){ continue; }
+      dmin = dmin === undefined ? data[n][2] : Math.min(dmin, data[n][2]);
+      dmax = dmax === undefined ? data[n][2] : Math.max(dmax, data[n][2]);
     }
     if(config['min'] === undefined){ config['min'] = dmin; }
     if(config['max'] === undefined){ config['max'] = dmax; }
@@ -17,7 +17,7 @@ $(function () {
     var strip_non_numeric = function(node){
       return node.innerText.replace(/[^\d.-]/g, '');
     }
-    $('.mqc_table').tablesorter({sortInitialOrder: 'desc', textExtraction: strip_non_numeric});
+    $('.mqc_table:not(.mqc_virtual_table)').tablesorter({sortInitialOrder: 'desc', textExtraction: strip_non_numeric});
 
     // Update tablesorter if samples renamed
     $(document).on('mqc_renamesamples', function(e, f_texts, t_texts, regex_mode){
@@ -174,8 +174,8 @@ $(function () {
     // Hide samples
     $(document).on('mqc_hidesamples', function(e, f_texts, regex_mode){
 
-      // Hide rows in MultiQC tables
-      $(".mqc_table tbody th").each(function(){
+      // Hide rows in MultiQC tables. Virtual tables are redrawn separately.
+      $(".mqc_table:not(.mqc_virtual_table) tbody th").each(function(){
         var match = false;
         var hfilter = $(this).text();
         $.each(f_texts, function(idx, f_text){
@@ -198,7 +198,7 @@ $(function () {
       });
 
       // Hide empty columns
-      $('.mqc_table').each(function(){
+      $('.mqc_table:not(.mqc_virtual_table)').each(function(){
         var table = $(this);
         var gsthidx = 0;
         table.find("thead th, tbody tr td").show();
@@ -281,18 +281,34 @@ $(function () {
         },
         'datasets': [[]]
       };
-      $(tid+' tbody tr').each(function(e){
-        var s_name = $(this).children('th.rowheader').text();
-        var val_1 = $(this).children('td.'+col1).text().replace(/[^\d\.]/g,'');
-        var val_2 = $(this).children('td.'+col2).text().replace(/[^\d\.]/g,'');
-        if(!isNaN(parseFloat(val_1)) && isFinite(val_1) && !isNaN(parseFloat(val_2)) && isFinite(val_2)){
-          mqc_plots['tableScatterPlot']['datasets'][0].push({
-            'name': s_name,
-            'x': parseFloat(val_1),
-            'y': parseFloat(val_2)
-          });
-        }
-      });
+      var vt = mqc_vtables[tid.replace(/^#/, '')];
+      if(vt !== undefined){
+        // Virtual tables - use the column values
+        $.each(vt.rows, function(idx, i){
+          var val_1 = mqc_vtable_number(vt.columns[col1].values[i]);
+          var val_2 = mqc_vtable_number(vt.columns[col2].values[i]);
+          if(!isNaN(val_1) && isFinite(val_1) && !isNaN(val_2) && isFinite(val_2)){
+            mqc_plots['tableScatterPlot']['datasets'][0].push({
+              'name': vt.names[i],
+              'x': val_1,
+              'y': val_2
+            });
+          }
+        });
+      } else {
+        $(tid+' tbody tr').each(function(e){
+          var s_name = $(this).children('th.rowheader').text();
+          var val_1 = $(this).children('td.'+col1).text().replace(/[^\d\.]/g,'');
+          var val_2 = $(this).children('td.'+col2).text().replace(/[^\d\.]/g,'');
+          if(!isNaN(parseFloat(val_1)) && isFinite(val_1) && !isNaN(parseFloat(val_2)) && isFinite(val_2)){
+            mqc_plots['tableScatterPlot']['datasets'][0].push({
+              'name': s_name,
+              'x': parseFloat(val_1),
+              'y': parseFloat(val_2)
+            });
+          }
+        });
+      }
       if(Object.keys(mqc_plots['tableScatterPlot']['datasets'][0]).length > 0){
         if(plot_scatter_plot('tableScatterPlot') == false){
           $('#tableScatterPlot').html('<small>Error: Something went wrong when plotting the scatter plot.</small>');
@@ -348,3 +364,273 @@ function change_mqc_table_col_order(table){
     }
   });
 }
+
+
+////////////////////////////////////////////////
+// Virtual tables
+////////////////////////////////////////////////
+// Big tables (config virtual_tables) have their values saved in the plot data
+// as one array per column. Only the rows scrolled into view are drawn, and
+// sorting, colouring and sample filtering work on the column arrays.
+
+var mqc_vtables = {};
+
+// Number of rows to draw above and below those in view
+var mqc_vtable_buffer = 20;
+
+$(function () {
+  if($('.mqc_virtual_table').length == 0){ return; }
+
+  // Draw the tables once the plot data has been loaded
+  $(document).on('mqc_plotdata_loaded', function(){
+    $('.mqc_virtual_table').each(function(){
+      mqc_vtable_init($(this).attr('id'));
+    });
+  });
+
+  // Draw new rows when scrolled
+  $('.mqc_virtual_table').closest('.mqc-table-responsive').scroll(function(){
+    mqc_vtable_draw($(this).find('.mqc_virtual_table').attr('id'));
+  });
+
+  // Sort when a column header is clicked
+  $('.mqc_virtual_table thead th').click(function(){
+    var tid = $(this).closest('table').attr('id');
+    var rid = $(this).hasClass('rowheader') ? null : $(this).attr('id').replace(/^header_/, '');
+    mqc_vtable_sort(tid, rid, $(this));
+  });
+
+  // Redraw when columns are shown, hidden or reordered
+  $('.mqc_table_col_visible, .mqc_configModal_bulkVisible').on('change click', function(){
+    mqc_vtable_redraw($(this).data('target'));
+  });
+  $('.mqc_configModal_table').on('sortstop sortEnd', function(){
+    mqc_vtable_redraw('#'+$(this).attr('id').replace('_configModal_table', ''));
+  });
+
+  // Highlight, rename and hide samples
+  $(document).on('mqc_highlights mqc_renamesamples mqc_hidesamples', function(){
+    $.each(mqc_vtables, function(tid, vt){
+      mqc_vtable_filter(tid);
+      mqc_vtable_draw(tid, true);
+    });
+  });
+});
+
+// Set up a virtual table from its plot data
+function mqc_vtable_init(tid){
+  var data = mqc_plots[tid];
+  if(data === undefined || data['plot_type'] != 'table'){ return false; }
+  var vt = {
+    'data': data,
+    'columns': {},
+    'order': [],
+    'rows': [],
+    'names': data['samples'].slice(),
+    'highlights': [],
+    'sort_rid': undefined,
+    'sort_dir': undefined,
+    'row_height': 30,
+    'measured': false,
+    'first': -1,
+    'last': -1,
+    'table': $('#'+tid),
+    'tbody': $('#'+tid+' tbody'),
+    'scroller': $('#'+tid).closest('.mqc-table-responsive')
+  };
+  $.each(data['columns'], function(idx, col){
+    vt.columns[col['rid']] = col;
+  });
+  for (var i = 0; i < data['samples'].length; i++){
+    vt.order.push(i);
+  }
+  mqc_vtables[tid] = vt;
+  mqc_vtable_filter(tid);
+  mqc_vtable_draw(tid, true);
+  return true;
+}
+
+// Apply the toolbox renames, highlights and hidden samples
+function mqc_vtable_filter(tid){
+  var vt = mqc_vtables[tid];
+  var samples = vt.data['samples'];
+  var hidden = [];
+  for (var i = 0; i < samples.length; i++){
+    var s_name = samples[i];
+    $.each(window.mqc_rename_f_texts, function(idx, f_text){
+      if(window.mqc_rename_regex_mode){
+        s_name = s_name.replace(new RegExp(f_text, 'g'), window.mqc_rename_t_texts[idx]);
+      } else {
+        s_name = s_name.replace(f_text, window.mqc_rename_t_texts[idx]);
+      }
+    });
+    vt.names[i] = s_name;
+    vt.highlights[i] = undefined;
+    $.each(window.mqc_highlight_f_texts, function(idx, f_text){
+      if((window.mqc_highlight_regex_mode && s_name.match(f_text)) || (!window.mqc_highlight_regex_mode && s_name.indexOf(f_text) > -1)){
+        vt.highlights[i] = window.mqc_highlight_f_cols[idx];
+      }
+    });
+    var match = false;
+    $.each(window.mqc_hide_f_texts, function(idx, f_text){
+      if((window.mqc_hide_regex_mode && s_name.match(f_text)) || (!window.mqc_hide_regex_mode && s_name.indexOf(f_text) > -1)){
+        match = true;
+      }
+    });
+    hidden[i] = window.mqc_hide_mode == 'show' ? !match : match;
+  }
+  vt.rows = $.grep(vt.order, function(i){ return !hidden[i]; });
+  $('#'+tid+'_numrows').text(vt.rows.length);
+}
+
+// Sort the rows by a column, or by sample name if rid is null
+function mqc_vtable_sort(tid, rid, th){
+  var vt = mqc_vtables[tid];
+  if(vt === undefined){ return; }
+  vt.sort_dir = (vt.sort_rid === rid && vt.sort_dir == 'desc') ? 'asc' : 'desc';
+  vt.sort_rid = rid;
+  var keys = rid === null ? vt.names : vt.columns[rid]['values'];
+  var nums = $.map(keys, function(k){ return [mqc_vtable_number(k)]; });
+  // Numbers first, then text, then empty cells
+  var ranks = $.map(keys, function(k, i){ return (k === null || k === undefined) ? 2 : (isNaN(nums[i]) ? 1 : 0); });
+  var dir = vt.sort_dir == 'desc' ? -1 : 1;
+  vt.order.sort(function(a, b){
+    var c;
+    if(ranks[a] != ranks[b]){ return ranks[a] - ranks[b]; }
+    if(ranks[a] == 0){
+      c = nums[a] - nums[b];
+    } else if(ranks[a] == 1){
+      c = String(keys[a]).localeCompare(String(keys[b]));
+    } else {
+      c = 0;
+    }
+    return c == 0 ? a - b : c * dir;
+  });
+  vt.table.find('thead th').removeClass('headerSortDown headerSortUp');
+  th.addClass(vt.sort_dir == 'desc' ? 'headerSortUp' : 'headerSortDown');
+  mqc_vtable_filter(tid);
+  vt.scroller.scrollTop(0);
+  mqc_vtable_draw(tid, true);
+}
+
+// Redraw a virtual table after its columns have changed
+function mqc_vtable_redraw(target){
+  var tid = String(target).replace(/^#/, '');
+  if(mqc_vtables[tid] !== undefined){
+    mqc_vtable_draw(tid, true);
+    $('#'+tid+'_numrows').text(mqc_vtables[tid].rows.length);
+  }
+}
+
+// Draw the rows of a virtual table that are scrolled into view
+function mqc_vtable_draw(tid, force){
+  var vt = mqc_vtables[tid];
+  if(vt === undefined){ return; }
+  var num_rows = vt.rows.length;
+  var view_height = vt.scroller.innerHeight() || 500;
+  var first = Math.max(0, Math.floor(vt.scroller.scrollTop() / vt.row_height) - mqc_vtable_buffer);
+  var last = Math.min(num_rows, first + Math.ceil(view_height / vt.row_height) + (2 * mqc_vtable_buffer));
+  if(!force && first == vt.first && last == vt.last){ return; }
+  vt.first = first;
+  vt.last = last;
+
+  // Columns in the order shown in the table header
+  var cols = [];
+  vt.table.find('thead th').each(function(){
+    var id = $(this).attr('id');
+    if(id !== undefined && vt.columns[id.replace(/^header_/, '')] !== undefined){
+      cols.push([vt.columns[id.replace(/^header_/, '')], $(this).hasClass('hidden') ? 'hidden' : '']);
+    }
+  });
+  var cfg = vt.data['config'];
+  var html = [];
+  if(first > 0){
+    html.push('<tr class="mqc_vtable_spacer"><td colspan="'+(cols.length+1)+'" style="height:'+(first * vt.row_height)+'px; padding:0; border:0;"></td></tr>');
+  }
+  for (var r = first; r < last; r++){
+    var i = vt.rows[r];
+    var s_name = vt.data['samples'][i];
+    var style = vt.highlights[i] !== undefined ? ' style="color:'+vt.highlights[i]+';"' : '';
+    html.push('<tr><th class="rowheader" data-original-sn="'+s_name+'"'+style+'>'+vt.names[i]+'</th>');
+    for (var c = 0; c < cols.length; c++){
+      html.push(mqc_vtable_cell(cols[c][0], i, cols[c][1], cfg));
+    }
+    html.push('</tr>');
+  }
+  if(last < num_rows){
+    html.push('<tr class="mqc_vtable_spacer"><td colspan="'+(cols.length+1)+'" style="height:'+((num_rows - last) * vt.row_height)+'px; padding:0; border:0;"></td></tr>');
+  }
+  vt.tbody.html(html.join(''));
+
+  // Use the real height of the rows once they are drawn
+  if(!vt.measured){
+    var row_height = vt.tbody.find('tr:not(.mqc_vtable_spacer)').first().outerHeight();
+    if(row_height > 0){
+      vt.measured = true;
+      if(row_height != vt.row_height){
+        vt.row_height = row_height;
+        mqc_vtable_draw(tid, true);
+      }
+    }
+  }
+}
+
+// Build the HTML for one table cell, in the same way as table.make_table() in Python
+function mqc_vtable_cell(col, i, hide, cfg){
+  var text = col['text'][i];
+  if(text === null || text === undefined){
+    return '<td class="data-coloured '+col['rid']+' '+hide+'"></td>';
+  }
+  var valstring = text.split('.').join('DECIMAL').split(',').join('THOUSAND');
+  valstring = valstring.split('DECIMAL').join(cfg['decimalPoint']).split('THOUSAND').join(cfg['thousandsSep']);
+  valstring += col['suffix'];
+  if(col['badges'][i] !== undefined){
+    valstring = '<span class="badge" style="background-color:'+col['badges'][i]+'">'+valstring+'</span>';
+  }
+  if(!col['bar']){
+    return '<td class="'+col['rid']+' '+hide+'">'+valstring+'</td>';
+  }
+  var bg = col['scale'] ? ' background-color:'+mqc_vtable_colour(col['scale'], col['values'][i])+';' : '';
+  var percentage = ((mqc_vtable_number(col['values'][i], true) - col['dmin']) / (col['dmax'] - col['dmin'])) * 100;
+  percentage = isNaN(percentage) ? 0 : Math.max(0, Math.min(100, percentage));
+  return '<td class="data-coloured '+col['rid']+' '+hide+'"><div class="wrapper"><span class="bar" style="width:'+percentage+'%;'+bg+'"></span><span class="val">'+valstring+'</span></div></td>';
+}
+
+// Turn a table value into a number. Non-numeric characters are stripped from
+// strings, unless strict is set. Returns NaN if this isn't possible.
+function mqc_vtable_number(val, strict){
+  if(typeof val === 'number'){ return val; }
+  if(val === null || val === undefined){ return NaN; }
+  val = strict ? String(val) : String(val).replace(/[^\d.-]/g, '');
+  return $.trim(val) === '' ? NaN : Number(val);
+}
+
+// Colour for a value from a table colour scale, in the same way as
+// mqc_colour_scale.get_colour_column() in Python
+function mqc_vtable_colour(scale, val){
+  var domain = scale['domain'];
+  var num;
+  if(typeof val === 'number'){
+    num = isFinite(val) ? Math.abs(val) : domain[0];
+  } else if(val === null || val === undefined){
+    num = domain[0];
+  } else {
+    var clean = String(val).replace(/[^0-9\.]/g, '');
+    num = clean === '' ? domain[0] : Number(clean);
+    if(isNaN(num)){ return ''; }
+  }
+  num = Math.min(Math.max(num, domain[0]), domain[domain.length - 1]);
+  var step = 0;
+  while(step < domain.length - 2 && num > domain[step + 1]){ step++; }
+  var num_range = domain[step + 1] - domain[step];
+  if(num_range == 0){ return ''; }
+  var prop = (num - domain[step]) / num_range;
+  var hex = '#';
+  for (var c = 0; c < 3; c++){
+    var v = scale['rgb'][step][c] * (1.0 - prop) + scale['rgb'][step + 1][c] * prop;
+    v = Math.max(0, Math.min(1, 1 + ((v - 1) * 0.3)));
+    v = Math.floor(0.5 + v * 255);
+    hex += (v < 16 ? '0' : '') + v.toString(16);
+  }
+  return hex;
+}
@@ -0,0 +1,172 @@
+/*
+ * Small zlib (RFC 1950) / DEFLATE (RFC 1951) decoder.
+ *
+ * Used to unpack report plot data compressed with Python's zlib module
+ * (config plot_data_compression: zlib). Synchronous and dependency-free,
+ * so that it works in any browser and when the report is opened from disk.
+ *
+ * mqc_inflate(Uint8Array) returns a Uint8Array of the uncompressed bytes.
+ */
+(function (root) {
+  'use strict';
+
+  var LEN_BASE = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258];
+  var LEN_EXTRA = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0];
+  var DIST_BASE = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577];
+  var DIST_EXTRA = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13];
+  var CODE_LENGTH_ORDER = [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15];
+
+  // Build a lookup table for a canonical Huffman code from its code lengths.
+  // Indexed by the next (bit-reversed) input bits, each entry is symbol << 4 | code length
+  function build_table(lengths) {
+    var max_bits = 0, count = new Int32Array(16), next_code = new Int32Array(16), i;
+    for (i = 0; i < lengths.length; i++) {
+      count[lengths[i]]++;
+      if (lengths[i] > max_bits) { max_bits = lengths[i]; }
+    }
+    count[0] = 0;
+    var code = 0;
+    for (i = 1; i <= max_bits; i++) {
+      code = (code + count[i - 1]) << 1;
+      next_code[i] = code;
+    }
+    var size = 1 << max_bits, table = new Int32Array(size);
+    for (i = 0; i < lengths.length; i++) {
+      var len = lengths[i];
+      if (len === 0) { continue; }
+      // Codes are packed starting with the most significant bit, so reverse them
+      var c = next_code[len]++, rev = 0;
+      for (var j = 0; j < len; j++) {
+        rev = (rev << 1) | (c & 1);
+        c >>= 1;
+      }
+      for (var k = rev; k < size; k += 1 << len) {
+        table[k] = (i << 4) | len;
+      }
+    }
+    return { table: table, bits: max_bits };
+  }
+
+  var fixed_lit = null, fixed_dist = null;
+  function build_fixed_tables() {
+    var lengths = new Uint8Array(288), i;
+    for (i = 0; i < 144; i++) { lengths[i] = 8; }
+    for (i = 144; i < 256; i++) { lengths[i] = 9; }
+    for (i = 256; i < 280; i++) { lengths[i] = 7; }
+    for (i = 280; i < 288; i++) { lengths[i] = 8; }
+    fixed_lit = build_table(lengths);
+    lengths = new Uint8Array(30);
+    for (i = 0; i < 30; i++) { lengths[i] = 5; }
+    fixed_dist = build_table(lengths);
+  }
+
+  function inflate(data) {
+    var pos = 0, bitbuf = 0, bitcnt = 0;
+    var out = new Uint8Array(Math.max(1024, data.length * 4)), op = 0;
+
+    // zlib header: compression method must be deflate, no preset dictionary
+    if ((data[0] & 0x0f) !== 8 || ((data[0] << 8) | data[1]) % 31 !== 0 || (data[1] & 0x20)) {
+      throw new Error('Not a zlib stream');
+    }
+    pos = 2;
+
+    function need(n) {
+      while (bitcnt < n) {
+        bitbuf |= (data[pos++] | 0) << bitcnt;
+        bitcnt += 8;
+      }
+    }
+    function bits(n) {
+      need(n);
+      var v = bitbuf & ((1 << n) - 1);
+      bitbuf >>>= n;
+      bitcnt -= n;
+      return v;
+    }
+    function decode(h) {
+      need(h.bits);
+      var entry = h.table[bitbuf & ((1 << h.bits) - 1)], len = entry & 15;
+      if (len === 0) { throw new Error('Invalid Huffman code'); }
+      bitbuf >>>= len;
+      bitcnt -= len;
+      return entry >> 4;
+    }
+    function ensure(n) {
+      if (op + n > out.length) {
+        var bigger = new Uint8Array(Math.max(out.length * 2, op + n));
+        bigger.set(out.subarray(0, op));
+        out = bigger;
+      }
+    }
+
+    var last_block = 0;
+    while (!last_block) {
+      last_block = bits(1);
+      var type = bits(2);
+
+      // Stored block - skip to the next byte boundary and copy
+      if (type === 0) {
+        pos -= bitcnt >> 3;
+        bitbuf = 0;
+        bitcnt = 0;
+        var stored_len = data[pos] | (data[pos + 1] << 8);
+        pos += 4;
+        ensure(stored_len);
+        out.set(data.subarray(pos, pos + stored_len), op);
+        pos += stored_len;
+        op += stored_len;
+        continue;
+      }
+
+      var lit, dist;
+      if (type === 1) {
+        if (fixed_lit === null) { build_fixed_tables(); }
+        lit = fixed_lit;
+        dist = fixed_dist;
+      } else if (type === 2) {
+        var hlit = bits(5) + 257, hdist = bits(5) + 1, hclen = bits(4) + 4, i;
+        var cl_lengths = new Uint8Array(19);
+        for (i = 0; i < hclen; i++) { cl_lengths[CODE_LENGTH_ORDER[i]] = bits(3); }
+        var cl = build_table(cl_lengths);
+        var lengths = new Uint8Array(hlit + hdist), n = 0;
+        while (n < hlit + hdist) {
+          var sym = decode(cl);
+          if (sym < 16) {
+            lengths[n++] = sym;
+          } else {
+            var val = 0, repeat;
+            if (sym === 16) { val = lengths[n - 1]; repeat = 3 + bits(2); }
+            else if (sym === 17) { repeat = 3 + bits(3); }
+            else { repeat = 11 + bits(7); }
+            while (repeat--) { lengths[n++] = val; }
+          }
+        }
+        lit = build_table(lengths.subarray(0, hlit));
+        dist = build_table(lengths.subarray(hlit));
+      } else {
+        throw new Error('Invalid DEFLATE block type');
+      }
+
+      // Compressed block - literals and back references
+      for (;;) {
+        var s = decode(lit);
+        if (s < 256) {
+          ensure(1);
+          out[op++] = s;
+        } else if (s === 256) {
+          break;
+        } else {
+          s -= 257;
+          var len = LEN_BASE[s] + bits(LEN_EXTRA[s]);
+          var ds = decode(dist);
+          var from = op - (DIST_BASE[ds] + bits(DIST_EXTRA[ds]));
+          ensure(len);
+          for (var k = 0; k < len; k++) { out[op++] = out[from + k]; }
+        }
+      }
+    }
+    return out.subarray(0, op);
+  }
+
+  root.mqc_inflate = inflate;
+})(this);
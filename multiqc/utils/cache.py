@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+
+""" MultiQC on-disk caches. Used to avoid repeating work
+when MultiQC is run on the same files many times. """
+
+from __future__ import print_function
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import types
+try:
+    import cPickle as pickle # Python 2
+except ImportError:
+    import pickle
+
+from multiqc.utils import config
+logger = config.logger
+
+# Parsed data cache, loaded on first use by get_parse_cache()
+parse_cache = None
+# Parsed data cache hits and misses for each module
+parse_cache_stats = dict()
+# Identity of the code of each module package, made by parser_id()
+_parser_ids = dict()
+
+def get_cache_dir():
+    """ Return the directory to use for MultiQC cache files, creating it
+    if needed. Uses config.cache_dir, $XDG_CACHE_HOME/multiqc or ~/.cache/multiqc """
+    cache_dir = getattr(config, 'cache_dir', None)
+    if cache_dir is None:
+        cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        cache_dir = os.path.join(cache_home, 'multiqc')
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+class SearchCache(object):
+    """ Cache of file search results, keyed by file path, size, mtime and inode.
+    Stored in a SQLite database, with separate results for each set of search
+    patterns and MultiQC version, so that runs with different modules don't
+    discard each other's results. The whole cache for the current search patterns
+    is read into memory when loaded, so lookups are safe to make from search threads. """
+
+    # Number of different sets of search patterns to keep results for
+    max_fingerprints = 10
+
+    def __init__(self, spatterns, rebuild=False):
+        """ Open the search cache database
+        :param spatterns: Search patterns, as returned by report.prep_search_patterns()
+        :param rebuild: Discard any existing cache entries
+        """
+        self.entries = dict()
+        self.updates = list()
+        self.seen = set()
+        self.hits = 0
+        self.fingerprint = hashlib.sha1(json.dumps(
+            [config.version, config.log_filesize_limit, spatterns], sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()
+
+        self.db_fn = os.path.join(get_cache_dir(), 'search_cache.sqlite')
+        self.db = sqlite3.connect(self.db_fn, timeout=30)
+        self.db.execute('CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY, last_used REAL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS search_results (fingerprint TEXT, path TEXT, size INTEGER, mtime REAL, inode INTEGER, keys TEXT, PRIMARY KEY (fingerprint, path))')
+        if rebuild:
+            self.db.execute('DELETE FROM fingerprints')
+            self.db.execute('DELETE FROM search_results')
+        self.db.execute('INSERT OR REPLACE INTO fingerprints (fingerprint, last_used) VALUES (?, ?)', (self.fingerprint, time.time()))
+        # Forget the least recently used search patterns
+        old = self.db.execute('SELECT fingerprint FROM fingerprints ORDER BY last_used DESC LIMIT -1 OFFSET ?', (self.max_fingerprints,)).fetchall()
+        if len(old) > 0:
+            logger.debug("Removing search cache results for {} old sets of search patterns".format(len(old)))
+            self.db.executemany('DELETE FROM fingerprints WHERE fingerprint = ?', old)
+            self.db.executemany('DELETE FROM search_results WHERE fingerprint = ?', old)
+        self.db.commit()
+        for path, size, mtime, inode, keys in self.db.execute('SELECT path, size, mtime, inode, keys FROM search_results WHERE fingerprint = ?', (self.fingerprint,)):
+            self.entries[path] = (size, mtime, inode, keys)
+        logger.info("Using search cache: {} ({} entries)".format(self.db_fn, len(self.entries)))
+
+    def get(self, path, st):
+        """ Return the list of search keys for a file if it hasn't changed
+        since it was cached, otherwise None.
+        :param path: Path to the file
+        :param st: os.stat() result for the file
+        """
+        path = os.path.abspath(path)
+        self.seen.add(path)
+        entry = self.entries.get(path)
+        if entry is None or entry[:3] != (st.st_size, st.st_mtime, st.st_ino):
+            return None
+        self.hits += 1
+        return json.loads(entry[3])
+
+    def add(self, path, st, keys):
+        """ Remember the search keys found for a file. Saved with save() """
+        self.updates.append((os.path.abspath(path), st.st_size, st.st_mtime, st.st_ino, json.dumps(keys)))
+
+    def save(self, analysis_dirs=()):
+        """ Write new entries to the database, dropping those for files
+        within the searched directories that no longer exist """
+        stale = list()
+        for d in analysis_dirs:
+            d = os.path.join(os.path.abspath(d), '')
+            stale.extend([(p,) for p in self.entries if p.startswith(d) and p not in self.seen])
+        self.db.executemany('DELETE FROM search_results WHERE fingerprint = ? AND path = ?', [(self.fingerprint, p) for p, in stale])
+        self.db.executemany('INSERT OR REPLACE INTO search_results (fingerprint, path, size, mtime, inode, keys) VALUES (?, ?, ?, ?, ?, ?)',
+            [(self.fingerprint,) + u for u in self.updates])
+        self.db.commit()
+        logger.debug("Search cache: {} files unchanged, {} new or changed, {} removed".format(self.hits, len(self.updates), len(stale)))
+
+    def close(self):
+        self.db.close()
+
+
+def get_parse_cache():
+    """ Return the parsed data cache, opening it on first use.
+    Returns None if the cache is disabled or can't be opened. """
+    global parse_cache
+    if parse_cache is None and config.parse_cache:
+        try:
+            parse_cache = ParseCache(config.parse_cache_max_size)
+        except (sqlite3.Error, IOError, OSError) as e:
+            logger.warning("Could not load parsed data cache: {}".format(e))
+            config.parse_cache = False
+    return parse_cache
+
+
+class ParseCache(object):
+    """ Cache of data parsed from log files by modules, so that unchanged
+    files don't need to be read and parsed again. Stored in a SQLite database
+    with least-recently-used entries evicted when it grows beyond max_size bytes. """
+
+    db_name = 'parse_cache.sqlite'
+    description = 'parsed data cache'
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.used = list()
+        self.db_fn = os.path.join(get_cache_dir(), self.db_name)
+        self.db = sqlite3.connect(self.db_fn, timeout=30)
+        self.db.execute('CREATE TABLE IF NOT EXISTS parsed (key TEXT PRIMARY KEY, data BLOB, size INTEGER, last_used REAL)')
+        logger.info("Using {}: {}".format(self.description, self.db_fn))
+
+    @staticmethod
+    def make_key(module, sp_key, path, st, version=None):
+        """ Build a cache key from the module, search key, file path,
+        file size and mtime, the MultiQC version and the module's code
+        :param module: Python module name of the module doing the parsing
+        :param version: Optional parse cache version set by the module
+        """
+        key = [module, sp_key, os.path.abspath(path), st.st_size, st.st_mtime, config.version, parser_id(module), version]
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+    def get(self, key, module):
+        """ Look up parsed data. Returns a tuple of (found, data) """
+        stats = parse_cache_stats.setdefault(module, [0, 0])
+        row = self.db.execute('SELECT data FROM parsed WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            try:
+                data = pickle.loads(bytes(row[0]))
+            except Exception as e:
+                logger.debug("Could not load cached data for {}: {}".format(module, e))
+            else:
+                stats[0] += 1
+                self.used.append((time.time(), key))
+                return True, data
+        stats[1] += 1
+        return False, None
+
+    def put(self, key, data, module):
+        """ Save parsed data. Must be picklable. """
+        try:
+            blob = pickle.dumps(data, 2)
+        except Exception as e:
+            logger.debug("Could not cache parsed data for {}: {}".format(module, e))
+            return
+        self.db.execute('INSERT OR REPLACE INTO parsed (key, data, size, last_used) VALUES (?, ?, ?, ?)',
+            (key, sqlite3.Binary(blob), len(blob), time.time()))
+
+    def save(self):
+        """ Commit new entries and evict the least recently used entries
+        if the cache is too big """
+        self.db.executemany('UPDATE parsed SET last_used = ? WHERE key = ?', self.used)
+        total_size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM parsed').fetchone()[0]
+        if total_size > self.max_size:
+            evict = list()
+            for key, size in self.db.execute('SELECT key, size FROM parsed ORDER BY last_used ASC'):
+                if total_size <= self.max_size:
+                    break
+                evict.append((key,))
+                total_size -= size
+            self.db.executemany('DELETE FROM parsed WHERE key = ?', evict)
+            logger.debug("Evicted {} entries from {}".format(len(evict), self.description))
+        self.used = list()
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def parser_id(module):
+    """ Return a string that changes whenever the code of a module's package
+    changes, made from the size and mtime of its Python files. Keeps stale parsed
+    data from being used in a development checkout, or with a plugin whose parsing
+    has changed without a new MultiQC version.
+    :param module: Python module name, eg. multiqc.modules.fastqc.fastqc
+    """
+    if module not in _parser_ids:
+        files = list()
+        mod_file = getattr(sys.modules.get(module), '__file__', None)
+        if mod_file is not None:
+            pkg_dir = os.path.dirname(os.path.abspath(mod_file))
+            for root, dirnames, filenames in os.walk(pkg_dir):
+                dirnames.sort()
+                for fn in sorted(filenames):
+                    if fn.endswith('.py'):
+                        try:
+                            st = os.stat(os.path.join(root, fn))
+                        except (IOError, OSError):
+                            continue
+                        files.append([os.path.relpath(os.path.join(root, fn), pkg_dir), st.st_size, st.st_mtime])
+        _parser_ids[module] = hashlib.sha1(json.dumps(files).encode('utf-8')).hexdigest()
+    return _parser_ids[module]
+
+
+class PlotCache(ParseCache):
+    """ Cache of the images drawn for flat plots, keyed on a hash of the plot
+    data and config, so that plots that haven't changed since the last run don't
+    need to be drawn again. Uses the same storage and eviction as ParseCache. """
+
+    db_name = 'plot_cache.sqlite'
+    description = 'flat plot cache'
+
+    def __init__(self, max_size):
+        super(PlotCache, self).__init__(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*args):
+        """ Build a cache key from anything that can be saved as JSON.
+        Returns None if the arguments can't be saved as JSON. """
+        def default(obj):
+            # Python functions are identified by their code and the values that they close
+            # over, as their repr changes between runs and lambdas all share the same name
+            if isinstance(obj, types.FunctionType):
+                try:
+                    cells = [c.cell_contents for c in obj.__closure__ or ()]
+                except ValueError:
+                    raise TypeError("Can't make a cache key from an empty closure cell")
+                return [obj.__module__, obj.__name__, obj.__code__, obj.__defaults__, cells]
+            if isinstance(obj, types.CodeType):
+                return [hashlib.sha1(obj.co_code).hexdigest(), obj.co_consts, obj.co_names]
+            if isinstance(obj, types.MethodType):
+                raise TypeError("Can't make a cache key from a bound method")
+            if callable(obj):
+                return '{}.{}'.format(getattr(obj, '__module__', ''), getattr(obj, '__name__', ''))
+            if hasattr(obj, 'tolist'):
+                return obj.tolist() # NumPy arrays and numbers
+            raise TypeError("Can't make a cache key from {}".format(type(obj).__name__))
+        try:
+            key = json.dumps([config.version] + list(args), default=default)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """ Look up a cached plot. Returns a dict of file format: image bytes, or None """
+        row = self.db.execute('SELECT data FROM parsed WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            try:
+                images = pickle.loads(bytes(row[0]))
+            except Exception as e:
+                logger.debug("Could not load cached plot: {}".format(e))
+            else:
+                self.hits += 1
+                self.used.append((time.time(), key))
+                return images
+        self.misses += 1
+        return None
+
+    def put(self, key, images):
+        """ Save the images drawn for a plot, as a dict of file format: image bytes """
+        super(PlotCache, self).put(key, images, 'flat plots')
+
+
+def get_plot_cache():
+    """ Return a newly opened flat plot cache, or None if the
+    cache is disabled or can't be opened. """
+    if not config.plot_cache:
+        return None
+    try:
+        return PlotCache(config.plot_cache_max_size)
+    except (sqlite3.Error, IOError, OSError) as e:
+        logger.warning("Could not load flat plot cache: {}".format(e))
+        return None
+
+
+def log_parse_cache_stats():
+    """ Log the parsed data cache hit / miss statistics """
+    for module, (hits, misses) in sorted(parse_cache_stats.items()):
+        logger.debug("Parsed data cache for {}: {} hits, {} misses".format(module, hits, misses))
+    if len(parse_cache_stats) > 0:
+        hits = sum(s[0] for s in parse_cache_stats.values())
+        misses = sum(s[1] for s in parse_cache_stats.values())
+        logger.info("Parsed data cache: {} hits, {} misses".format(hits, misses))
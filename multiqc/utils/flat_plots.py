@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+""" Queue of flat (MatPlotLib) plots. The flat plot functions add a job
+for each figure and return HTML with a placeholder for the image. Once
+all modules have run, the figures are drawn (in several processes if
+config.flat_plot_processes is set) and the images are put in place of
+the placeholders in the module output. Images are saved in the flat plot
+cache, so plots with the same data and config aren't drawn again next time.
+If a figure can't be drawn, its plot is made as an interactive plot instead. """
+
+from __future__ import print_function
+import base64
+import copy
+import io
+import multiprocessing
+import os
+import re
+import signal
+import sqlite3
+import traceback
+
+from multiqc.utils import cache, config, report
+logger = config.logger
+
+try:
+    # Import matplot lib but avoid default X environment
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except Exception:
+    # The plot modules print an error about this when they are imported
+    plt = None
+
+try:
+    string_types = basestring # Python 2
+except NameError:
+    string_types = str
+
+_placeholder = '<!-- mqc_flat_plot {} -->'
+_placeholder_re = re.compile(r'<!-- mqc_flat_plot ([^ ]+) -->')
+_group_start = '<!-- mqc_flat_plot_group {} -->'
+_group_end = '<!-- /mqc_flat_plot_group {} -->'
+_group_re = re.compile(r'<!-- mqc_flat_plot_group ([^ ]+) -->(.*?)<!-- /mqc_flat_plot_group \1 -->', re.DOTALL)
+
+# Jobs being drawn, inherited by forked worker processes
+_jobs = list()
+
+
+def add_plot(pid, render, args, hidediv='', embed=True, fallback=None):
+    """ Queue a flat plot to be drawn and return its HTML.
+    :param pid: HTML ID of the plot, also used for the exported file names
+    :param render: Function taking args that draws the plot and returns the
+                   MatPlotLib figure and a dict of extra arguments for savefig()
+    :param args: Tuple of arguments for render. Copied, so can be changed afterwards.
+    :param hidediv: Attributes to hide the plot div on report load
+    :param embed: Embed the image in the report. Otherwise link to the exported PNG.
+    :param fallback: Optional tuple of (group ID, function, args) from the plot group
+                     wrapped with add_group(). If the figure can't be drawn, the group
+                     is replaced with the HTML returned by function(*args).
+    :return: HTML for the plot, with a placeholder for embedded images
+    """
+    if plt is None:
+        raise ImportError("MatPlotLib could not be loaded")
+    report.flat_plot_jobs.append({
+        'pid': pid,
+        'render': render,
+        'args': copy.deepcopy(args),
+        'embed': embed,
+        'fallback': fallback
+    })
+    if embed:
+        img = _placeholder.format(pid)
+    else:
+        plot_relpath = os.path.join(config.plots_dir_name, 'png', '{}.png'.format(pid))
+        img = '<img src="{}" />'.format(plot_relpath)
+    return '<div class="mqc_mplplot" id="{}"{}>{}</div>'.format(pid, hidediv, img)
+
+
+def add_group(gid, html):
+    """ Mark the HTML of a group of flat plots, so that it can be replaced
+    by an interactive plot if any of its figures can't be drawn.
+    :param gid: Group ID, as given in the fallback for add_plot()
+    :param html: HTML for the whole group of plots
+    :return: Marked HTML
+    """
+    return _group_start.format(gid) + html + _group_end.format(gid)
+
+
+def render_plots(processes=1):
+    """ Draw all queued flat plots, save exported files and put the images
+    in to the module output. Plots that are in the flat plot cache are not drawn again.
+    :param processes: Number of worker processes to draw plots with
+    """
+    global _jobs
+    jobs = report.flat_plot_jobs
+    report.flat_plot_jobs = list()
+    if len(jobs) == 0:
+        return
+
+    # Look for plots that have already been drawn
+    plot_cache = cache.get_plot_cache()
+    results = [None] * len(jobs)
+    keys = [None] * len(jobs)
+    if plot_cache is not None:
+        for i, job in enumerate(jobs):
+            keys[i] = _cache_key(job)
+            if keys[i] is not None:
+                images = plot_cache.get(keys[i])
+                if images is not None:
+                    results[i] = (images, None)
+    todo = [i for i, r in enumerate(results) if r is None]
+
+    if len(todo) > 0:
+        processes = min(processes, len(todo))
+        if processes > 1 and not hasattr(os, 'fork'):
+            logger.warning("Drawing flat plots in parallel is not supported on this platform, drawing them one at a time")
+            processes = 1
+        logger.info("Drawing {} flat plot{}".format(len(todo), 's' if len(todo) > 1 else ''))
+        _jobs = jobs
+        try:
+            if processes > 1:
+                try:
+                    ctx = multiprocessing.get_context('fork')
+                except AttributeError:
+                    ctx = multiprocessing # Python 2 always forks
+                pool = ctx.Pool(processes, initializer=_init_worker)
+                try:
+                    drawn = pool.map(_render_job, todo, chunksize=1)
+                    pool.close()
+                except:
+                    pool.terminate()
+                    raise
+                finally:
+                    pool.join()
+            else:
+                drawn = [_render_job(i) for i in todo]
+        finally:
+            _jobs = list()
+        for i, r in zip(todo, drawn):
+            results[i] = r
+            if plot_cache is not None and keys[i] is not None and r[1] is None:
+                plot_cache.put(keys[i], r[0])
+
+    if plot_cache is not None:
+        logger.debug("Flat plot cache: {} hits, {} misses".format(plot_cache.hits, plot_cache.misses))
+        try:
+            plot_cache.save()
+            plot_cache.close()
+        except sqlite3.Error as e:
+            logger.warning("Could not save flat plot cache: {}".format(e))
+
+    images = dict()
+    fallbacks = dict()
+    for job, (imgs, tb) in zip(jobs, results):
+        if tb is not None:
+            logger.error("Error making MatPlotLib figure '{}':\n{}".format(job['pid'], tb))
+            images[job['pid']] = '<p class="text-danger">Error - was not able to plot data.</p>'
+            if job.get('fallback') is not None:
+                fallbacks[job['fallback'][0]] = job['fallback'][1:]
+            continue
+        # Save the plot to the plots directory if export is requested
+        for fformat in _export_formats():
+            plot_dir = os.path.join(config.plots_dir, fformat)
+            if not os.path.exists(plot_dir):
+                os.makedirs(plot_dir)
+            with io.open(os.path.join(plot_dir, '{}.{}'.format(job['pid'], fformat)), 'wb') as f:
+                f.write(imgs[fformat])
+        if job['embed']:
+            images[job['pid']] = '<img src="data:image/png;base64,{}" />'.format(base64.b64encode(imgs['png']).decode('utf8'))
+    fill_placeholders(images, fallbacks)
+
+
+def fill_placeholders(images, fallbacks=None):
+    """ Replace flat plot placeholders in the module output
+    :param images: Dict of plot ID: image HTML
+    :param fallbacks: Dict of group ID: (function, args) for plot groups
+                      to replace with the HTML returned by function(*args)
+    """
+    if fallbacks is None:
+        fallbacks = dict()
+    def replace_group(m):
+        if m.group(1) in fallbacks:
+            logger.error("############### Falling back to HighCharts for plot '{}'".format(m.group(1)))
+            func, args = fallbacks[m.group(1)]
+            try:
+                return func(*args)
+            except Exception:
+                logger.error("Error making HighCharts plot '{}':\n{}".format(m.group(1), traceback.format_exc()))
+        return m.group(2)
+    def replace(m):
+        return images.get(m.group(1), m.group(0))
+    def fill(s):
+        if isinstance(s, string_types) and '<!-- mqc_flat_plot' in s:
+            s = _group_re.sub(replace_group, s)
+            return _placeholder_re.sub(replace, s)
+        return s
+    for m in report.modules_output:
+        if getattr(m, 'intro', None) is not None:
+            m.intro = fill(m.intro)
+        for section in getattr(m, 'sections', []):
+            for k, v in section.items():
+                section[k] = fill(v)
+    report.general_stats_html = fill(report.general_stats_html)
+
+
+def _init_worker():
+    """ Let the main process handle Ctrl-C """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _render_job(idx):
+    """ Draw one queued plot. Returns a dict of file format: image bytes,
+    and a traceback if it broke.
+    :param idx: Index of the job in _jobs
+    """
+    job = _jobs[idx]
+    formats = _job_formats(job)
+    if len(formats) == 0:
+        return dict(), None
+    try:
+        fig, extra_args = job['render'](*job['args'])
+        savefig_args = {'bbox_inches': 'tight'}
+        savefig_args.update(extra_args)
+        try:
+            # The PNG is drawn once and used for the exported file and the embedded image
+            images = dict()
+            for fformat in formats:
+                img_buffer = io.BytesIO()
+                fig.savefig(img_buffer, format=fformat, **savefig_args)
+                images[fformat] = img_buffer.getvalue()
+                img_buffer.close()
+            return images, None
+        finally:
+            plt.close(fig)
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _export_formats():
+    """ Return the file formats to save plots in """
+    if config.export_plots and config.plots_dir is not None:
+        return config.export_plot_formats
+    return []
+
+
+def _job_formats(job):
+    """ Return the file formats that a queued plot needs to be drawn in """
+    formats = list(_export_formats())
+    if job['embed'] and 'png' not in formats:
+        formats.append('png')
+    return formats
+
+
+def _cache_key(job):
+    """ Return the flat plot cache key for a queued plot, or None if it can't be cached.
+    Plot IDs are left out, as they don't change the image and are often random. """
+    args = [dict((k, v) for k, v in a.items() if k != 'id') if isinstance(a, dict) else a for a in job['args']]
+    return cache.PlotCache.make_key(job['render'], args, _job_formats(job), config.template, matplotlib.__version__)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+
+""" Columnar store for General Statistics and other table data.
+
+Instead of a dict of dicts for every sample, each table section keeps one
+typed array per column (integers and floats), with a mask of which samples
+have a value. Sample names are kept once in an index shared by all sections.
+Sections can still be read like a dict of sample name: dict of values,
+but the table code reads whole columns at a time.
+
+General Statistics sections added as dicts are kept as they are until the
+table is built, so that plugins and hooks can still change them. """
+
+from __future__ import print_function
+from array import array
+from collections import OrderedDict
+from itertools import chain, compress
+try:
+    from collections.abc import Mapping, MutableSequence
+except ImportError:
+    from collections import Mapping, MutableSequence # Python 2
+
+# 64 bit integers where available
+try:
+    array('q')
+    int_typecode = 'q'
+except ValueError:
+    int_typecode = 'l' # Python 2
+
+
+class _Missing(object):
+    """ Marks rows without a value when building a column """
+_missing = _Missing()
+
+
+# Types of values that are kept in typed arrays. Only plain ints and floats,
+# so that values come back out as exactly the same type.
+_typecodes = {float: 'd', int: int_typecode}
+
+def _typecode(value):
+    """ Return the array typecode to keep a value in, or None if it can't go in a typed array """
+    return _typecodes.get(type(value))
+
+
+class SampleIndex(object):
+    """ Sample names, each with a number used to refer to it in table sections """
+
+    def __init__(self):
+        self.names = list()
+        self.numbers = dict()
+
+    def add(self, s_name):
+        """ Return the number for a sample name, adding it if it's new """
+        try:
+            return self.numbers[s_name]
+        except KeyError:
+            self.numbers[s_name] = len(self.names)
+            self.names.append(s_name)
+            return self.numbers[s_name]
+
+    def extend(self, s_names):
+        """ Add sample names that aren't already in the index """
+        new = [ s_name for s_name in s_names if s_name not in self.numbers ]
+        self.numbers.update(zip(new, range(len(self.names), len(self.names) + len(new))))
+        self.names.extend(new)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Column(object):
+    """ Values of one table column, in the row order of its section.
+    Kept in a typed array while all values are ints or all floats,
+    otherwise in a list. """
+    __slots__ = ('values', 'present')
+
+    def __init__(self):
+        self.values = None
+        self.present = bytearray()
+
+    @classmethod
+    def from_list(cls, values):
+        """ Make a column from a list of values, with _missing for rows without a value """
+        col = cls()
+        types = set(map(type, values))
+        missing = _Missing in types
+        types.discard(_Missing)
+        typecode = _typecodes.get(types.pop()) if len(types) == 1 else None
+        if missing:
+            col.present = bytearray([ val is not _missing for val in values ])
+            blank = None if typecode is None else 0
+            values = [ blank if val is _missing else val for val in values ]
+        else:
+            col.present = bytearray(b'\x01' * len(values))
+        if typecode is not None:
+            try:
+                col.values = array(typecode, values)
+                return col
+            except OverflowError:
+                pass # Big integers - keep in a list
+        col.values = values
+        return col
+
+    def set(self, row, value):
+        """ Set the value for a row """
+        if self.values is None:
+            typecode = _typecode(value)
+            self.values = array(typecode) if typecode is not None else list()
+        missing = row + 1 - len(self.present)
+        if missing > 0:
+            self.present.extend(b'\x00' * missing)
+            self.values.extend([0 if type(self.values) is array else None] * missing)
+        self.present[row] = 1
+        if type(self.values) is array:
+            if _typecode(value) == self.values.typecode:
+                try:
+                    self.values[row] = value
+                    return
+                except OverflowError:
+                    pass
+            # Mixed types or a big integer - fall back to a list
+            self.values = list(self.values)
+        self.values[row] = value
+
+    def unset(self, row):
+        """ Remove the value for a row """
+        if row < len(self.present):
+            self.present[row] = 0
+
+    def count(self):
+        """ Number of rows with a value """
+        return self.present.count(b'\x01')
+
+
+class Section(Mapping):
+    """ One table section, eg. the columns added by one module.
+    Behaves as a read-only dict of sample name: dict of values. """
+
+    def __init__(self, data=None, index=None):
+        """
+        :param data: Optional dict of sample name: dict of values to add
+        :param index: SampleIndex to share with other sections
+        """
+        self.index = SampleIndex() if index is None else index
+        self.rows = array(int_typecode)
+        self._row_numbers = dict()
+        self.columns = OrderedDict()
+        if data is not None:
+            self._load(data)
+
+    def _load(self, data):
+        """ Add a dict of sample name: dict of values to an empty section,
+        building each column in one go """
+        s_names = [ str(s_name) for s_name in data.keys() ]
+        samples = list(data.values())
+        keys = list(OrderedDict.fromkeys(chain.from_iterable(samples)))
+        s_keys = [ str(k) for k in keys ]
+        if len(set(s_names)) < len(s_names) or len(set(s_keys)) < len(s_keys):
+            # Names that are the same once converted to strings - add one at a time
+            for s_name, values in data.items():
+                self.set_sample(s_name, values)
+            return
+        self.index.extend(s_names)
+        self.rows = array(int_typecode, map(self.index.numbers.__getitem__, s_names))
+        self._row_numbers = None
+        for k, s_k in zip(keys, s_keys):
+            self.columns[s_k] = Column.from_list([ samp.get(k, _missing) for samp in samples ])
+
+    @property
+    def row_numbers(self):
+        """ Dict of sample number: row, made when first needed """
+        if self._row_numbers is None:
+            self._row_numbers = dict(zip(self.rows, range(len(self.rows))))
+        return self._row_numbers
+
+    def _row(self, s_name):
+        """ Return the row for a sample, adding it if it's new """
+        num = self.index.add(str(s_name))
+        try:
+            return self.row_numbers[num]
+        except KeyError:
+            self.row_numbers[num] = len(self.rows)
+            self.rows.append(num)
+            return self.row_numbers[num]
+
+    def set_sample(self, s_name, values):
+        """ Set all values for a sample, replacing any it already has.
+        Sample names and keys are converted to strings.
+        :param s_name: Sample name
+        :param values: Dict of key: value
+        """
+        exists = self.index.numbers.get(str(s_name)) in self.row_numbers
+        row = self._row(s_name)
+        if exists:
+            for col in self.columns.values():
+                col.unset(row)
+        for k, v in values.items():
+            self._set(row, str(k), v)
+
+    def set_value(self, s_name, k, value):
+        """ Set one value for a sample """
+        self._set(self._row(s_name), str(k), value)
+
+    def set_column(self, k, s_names, values):
+        """ Set a whole column, replacing any column with the same key
+        :param k: Column key
+        :param s_names: List of sample names, each only once
+        :param values: List of values for the samples
+        """
+        s_names = list(map(str, s_names))
+        self.index.extend(s_names)
+        nums = list(map(self.index.numbers.__getitem__, s_names))
+        row_numbers = self.row_numbers
+        new = [ num for num in nums if num not in row_numbers ]
+        row_numbers.update(zip(new, range(len(self.rows), len(self.rows) + len(new))))
+        self.rows.extend(new)
+        if len(nums) == len(self.rows) and nums == self.rows.tolist():
+            full = list(values)
+        else:
+            full = [_missing] * len(self.rows)
+            for row, val in zip(map(row_numbers.__getitem__, nums), values):
+                full[row] = val
+        self.columns[str(k)] = Column.from_list(full)
+
+    def _set(self, row, k, value):
+        try:
+            col = self.columns[k]
+        except KeyError:
+            col = self.columns[k] = Column()
+        col.set(row, value)
+
+    def column_keys(self):
+        """ Return the keys of columns that have values, in the order they were added """
+        return [k for k, col in self.columns.items() if col.count() > 0]
+
+    def column(self, k):
+        """ Return a list of sample names and a list of values for a column,
+        in row order, skipping samples without a value """
+        col = self.columns.get(k)
+        if col is None:
+            return list(), list()
+        s_names = list(map(self.index.names.__getitem__, compress(self.rows, col.present)))
+        return s_names, list(compress(col.values, col.present))
+
+    def column_items(self, k):
+        """ Return a list of (sample name, value) for a column, in row order,
+        skipping samples without a value """
+        return list(zip(*self.column(k)))
+
+    def column_values(self, k):
+        """ Return a list of the values in a column, skipping samples without a value """
+        col = self.columns.get(k)
+        if col is None:
+            return list()
+        return list(compress(col.values, col.present))
+
+    def column_is_numeric(self, k):
+        """ Check if a column only has ints or only has floats """
+        col = self.columns.get(k)
+        return col is not None and type(col.values) is array
+
+    def column_count(self, k):
+        """ Return the number of samples with a value for a column """
+        col = self.columns.get(k)
+        return 0 if col is None else col.count()
+
+    def sample_numbers(self):
+        """ Return the sample index numbers of the rows """
+        return self.rows
+
+    def rebase(self, index):
+        """ Move the section to another SampleIndex. Columns are kept
+        in row order, so only the sample numbers of the rows change. """
+        names = self.index.names
+        self.rows = array(int_typecode, [ index.add(names[num]) for num in self.rows ])
+        self._row_numbers = None
+        self.index = index
+
+    def to_dict(self):
+        """ Return the section as a dict of sample name: dict of values """
+        return dict(self.items())
+
+    def __getitem__(self, s_name):
+        row = self.row_numbers[self.index.numbers[s_name]]
+        return dict(
+            (k, col.values[row]) for k, col in self.columns.items()
+            if row < len(col.present) and col.present[row]
+        )
+
+    def __contains__(self, s_name):
+        return self.index.numbers.get(s_name) in self.row_numbers
+
+    def __iter__(self):
+        names = self.index.names
+        for num in self.rows:
+            yield names[num]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class GeneralStats(MutableSequence):
+    """ Store for the General Statistics table. A list of table sections,
+    added with append() in the same way as a list of dicts. Sections added as
+    dicts are kept as they are until build() copies them into columns that
+    share one sample index. """
+
+    def __init__(self, data=None):
+        """
+        :param data: Optional list of dicts of sample name: dict of values
+        """
+        self.index = SampleIndex()
+        self.sections = list()
+        if data is not None:
+            self.extend(data)
+
+    def _add(self, data):
+        """ Prepare a Section or dict of sample name: dict of values to be added """
+        if isinstance(data, Section) and data.index is not self.index:
+            data.rebase(self.index)
+        return data
+
+    def insert(self, idx, data):
+        """ Add a table section
+        :param data: Section or dict of sample name: dict of values
+        """
+        self.sections.insert(idx, self._add(data))
+
+    def build(self):
+        """ Copy the sections that were added as dicts into columns. Called when
+        the table is made, so that changes to the dicts until then are used. """
+        for idx, data in enumerate(self.sections):
+            if not isinstance(data, Section):
+                self.sections[idx] = Section(data, self.index)
+
+    def sample_names(self):
+        """ Return a set of the names of samples in any section """
+        self.build()
+        found = bytearray(len(self.index))
+        for section in self.sections:
+            for num in section.sample_numbers():
+                found[num] = 1
+        names = self.index.names
+        return set(names[num] for num, f in enumerate(found) if f)
+
+    def __getitem__(self, idx):
+        return self.sections[idx]
+
+    def __setitem__(self, idx, data):
+        if isinstance(idx, slice):
+            self.sections[idx] = [ self._add(d) for d in data ]
+        else:
+            self.sections[idx] = self._add(data)
+
+    def __delitem__(self, idx):
+        del self.sections[idx]
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
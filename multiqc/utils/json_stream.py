@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+""" Encode large data structures as JSON a piece at a time, so that the
+whole JSON string never needs to be held in memory. Used to write the
+report plot data, multiqc_data.json and the MegaQC upload. """
+
+from __future__ import print_function
+import json
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence # Python 2
+
+try:
+    string_types = basestring # Python 2
+    integer_types = (int, long)
+except NameError:
+    string_types = str
+    integer_types = (int,)
+
+# How many levels of nested dicts and lists to walk through before encoding
+# whatever is inside in one go. Deep enough to reach single plot series
+# and single samples within the exported report data.
+default_depth = 5
+
+def iterencode(obj, depth=default_depth, cls=json.JSONEncoder, **kwargs):
+    """ Encode obj as JSON, yielding the text in pieces. Gives exactly
+    the same text as json.dumps(obj, cls=cls, **kwargs).
+    :param obj: Data to encode
+    :param depth: Number of levels of dicts and lists to walk through.
+                  Anything nested deeper is encoded with a single call to the encoder.
+    :param cls: JSON encoder class to use
+    :param kwargs: Arguments for the encoder, eg. indent and ensure_ascii
+    :return: Generator of JSON strings
+    """
+    encoder = cls(**kwargs)
+    if encoder.skipkeys:
+        raise ValueError("skipkeys is not supported")
+    indent = encoder.indent
+    if indent is not None and not isinstance(indent, string_types):
+        indent = ' ' * indent
+    return _iterencode(obj, encoder, indent, depth, 0)
+
+def dump(obj, fh, depth=default_depth, cls=json.JSONEncoder, **kwargs):
+    """ Write obj as JSON to a file handle, a piece at a time """
+    for chunk in iterencode(obj, depth, cls, **kwargs):
+        fh.write(chunk)
+
+def dump_dict(d, write, level=0, skip_invalid=False, depth=default_depth, cls=json.JSONEncoder, **kwargs):
+    """ Write a dict as JSON one value at a time. Each value is encoded to a
+    string before it is written, so a value that can't be encoded is never
+    partly written. Gives the same text as json.dumps(d, cls=cls, **kwargs),
+    less any keys that are left out.
+    :param d: Dict to write
+    :param write: Function to write each piece of text with, eg. fh.write
+    :param level: Indent level of the dict, if it's written inside another object
+    :param skip_invalid: Leave out keys whose values can't be encoded, instead of raising
+    :param depth: Number of levels of dicts and lists to walk through
+    :param cls: JSON encoder class to use
+    :param kwargs: Arguments for the encoder, eg. indent and ensure_ascii
+    :return: List of keys that were left out
+    """
+    encoder = cls(**kwargs)
+    if encoder.skipkeys:
+        raise ValueError("skipkeys is not supported")
+    indent = encoder.indent
+    if indent is not None and not isinstance(indent, string_types):
+        indent = ' ' * indent
+    if indent is not None:
+        inner = '\n' + indent * (level + 1)
+        outer = '\n' + indent * level
+    else:
+        inner = outer = ''
+    separator = encoder.item_separator + inner
+    items = sorted(d.items()) if encoder.sort_keys else d.items()
+    skipped = list()
+    num_written = 0
+    for k, v in items:
+        try:
+            text = _encode_key(k, encoder) + encoder.key_separator + \
+                ''.join(_iterencode(v, encoder, indent, depth - 1, level + 1))
+        except (TypeError, ValueError, OverflowError):
+            if not skip_invalid:
+                raise
+            skipped.append(k)
+            continue
+        write(('{' + inner) if num_written == 0 else separator)
+        write(text)
+        num_written += 1
+    write((outer + '}') if num_written > 0 else '{}')
+    return skipped
+
+def _iterencode(obj, encoder, indent, depth, level):
+    """ Yield the JSON for obj, walking through dicts and lists up to depth levels.
+    Other mappings and sequences, such as the columnar table data, are always
+    walked through, as the json module can't encode them. """
+    walk = depth > 0 and isinstance(obj, (dict, list, tuple))
+    if not walk and _is_container(obj):
+        if len(obj) == 0:
+            yield '{}' if isinstance(obj, Mapping) else '[]'
+            return
+        walk = True
+    if walk and len(obj) > 0:
+        if indent is not None:
+            inner = '\n' + indent * (level + 1)
+            outer = '\n' + indent * level
+        else:
+            inner = outer = ''
+        separator = encoder.item_separator + inner
+        if isinstance(obj, Mapping):
+            yield '{' + inner
+            items = sorted(obj.items()) if encoder.sort_keys else obj.items()
+            for i, (k, v) in enumerate(items):
+                yield (separator if i > 0 else '') + _encode_key(k, encoder) + encoder.key_separator
+                for chunk in _iterencode(v, encoder, indent, depth - 1, level + 1):
+                    yield chunk
+            yield outer + '}'
+        else:
+            yield '[' + inner
+            for i, v in enumerate(obj):
+                if i > 0:
+                    yield separator
+                for chunk in _iterencode(v, encoder, indent, depth - 1, level + 1):
+                    yield chunk
+            yield outer + ']'
+    else:
+        text = encoder.encode(obj)
+        if indent is not None and level > 0:
+            # Newlines in strings are escaped, so these are all line breaks between items
+            text = text.replace('\n', '\n' + indent * level)
+        yield text
+
+def _is_container(obj):
+    """ Check if obj is a mapping or sequence that isn't a dict, list, tuple or string """
+    if isinstance(obj, (dict, list, tuple, string_types, bytes)):
+        return False
+    return isinstance(obj, (Mapping, Sequence))
+
+def _encode_key(k, encoder):
+    """ Encode a dict key in the same way as the json module """
+    if isinstance(k, string_types):
+        pass
+    elif isinstance(k, float) or k is True or k is False or k is None:
+        k = encoder.encode(k)
+    elif isinstance(k, integer_types):
+        k = str(int(k))
+    else:
+        raise TypeError("keys must be str, int, float, bool or None, not {}".format(type(k).__name__))
+    return encoder.encode(k)
@@ -8,8 +8,11 @@ import io
 import json
 import os
 import requests
+import shutil
+import tempfile
 
 from multiqc import config
+from multiqc.utils import json_stream
 log = config.logger
 
 # Custom encoder to handle lambda functions
@@ -54,7 +57,7 @@ def multiqc_dump_json(report):
                     d = {'{}_{}'.format(s, k): getattr(config, k)}
                 elif s == 'report':
                     d = {'{}_{}'.format(s, k): getattr(report, k)}
-                json.dumps(d, cls=MQCJSONEncoder, ensure_ascii=False) # Test that exporting to JSON works
+                # Keys that can't be exported to JSON are left out when written
                 exported_data.update(d)
             except (TypeError, KeyError, AttributeError):
                 log.warn("Couldn't export data key '{}.{}'".format(s, k))
@@ -68,18 +71,39 @@ def multiqc_dump_json(report):
     return exported_data
 
 
+def multiqc_dump_file(exported_data):
+    """ Write the exported data to multiqc_data.json in the data directory.
+    Keys that can't be encoded as JSON are left out, and are also removed
+    from exported_data so that they aren't sent to MegaQC. """
+    if config.data_dir is None:
+        return
+    fn = 'multiqc_data.{}'.format(config.data_format_extensions['json'])
+    with io.open(os.path.join(config.data_dir, fn), 'w', encoding='utf-8') as f:
+        write = lambda chunk: f.write(chunk.encode('utf-8', 'ignore').decode('utf-8'))
+        for k in json_stream.dump_dict(exported_data, write, skip_invalid=True, indent=4, cls=MQCJSONEncoder, ensure_ascii=False):
+            log.warn("Couldn't export data key '{}'".format(k))
+            del exported_data[k]
+        f.write(u'\n')
+
+
 def multiqc_api_post(exported_data):
     headers = { 'Content-Type': 'application/json', 'content-encoding': 'gzip' }
     if config.megaqc_access_token is not None:
         headers['access_token'] = config.megaqc_access_token
-    post_data = json.dumps({'data': exported_data}, cls=MQCJSONEncoder, ensure_ascii=False, indent=2)
-    post_data = post_data.encode('utf-8', 'ignore')
 
-    # Gzip the JSON for massively decreased filesize
-    sio_obj = io.BytesIO()
-    gzfh = gzip.GzipFile(fileobj=sio_obj, mode='w')
-    gzfh.write(post_data)
-    gzfh.close()
+    # Write the JSON to a temporary file a piece at a time, leaving out keys that can't be encoded
+    with tempfile.TemporaryFile() as tmp:
+        write = lambda chunk: tmp.write(chunk.encode('utf-8', 'ignore'))
+        write('{\n  "data": ')
+        for k in json_stream.dump_dict(exported_data, write, level=1, skip_invalid=True, cls=MQCJSONEncoder, ensure_ascii=False, indent=2):
+            log.warn("Couldn't export data key '{}'".format(k))
+        write('\n}')
+        # Gzip the JSON for massively decreased filesize
+        tmp.seek(0)
+        sio_obj = io.BytesIO()
+        gzfh = gzip.GzipFile(fileobj=sio_obj, mode='w')
+        shutil.copyfileobj(tmp, gzfh)
+        gzfh.close()
     request_body = sio_obj.getvalue()
 
     log.info("Sending data to MegaQC")
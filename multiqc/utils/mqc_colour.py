@@ -12,6 +12,19 @@ import re
 import logging
 logger = logging.getLogger(__name__)
 
+_clean_value_re = re.compile("[^0-9\.]")
+
+# Colour scales that have been made already, shared between tables
+_scales = dict()
+
+def get_colour_scale(name='GnBu', minval=0, maxval=100):
+	""" Return a colour scale, reusing it if one has already been made
+	with the same name and range """
+	key = (str(name), str(minval), str(maxval))
+	if key not in _scales:
+		_scales[key] = mqc_colour_scale(name, minval, maxval)
+	return _scales[key]
+
 
 class mqc_colour_scale(object):
 	""" Class to hold a colour scheme. """
@@ -38,30 +51,78 @@ class mqc_colour_scale(object):
 			self.minval = float(minval)
 			self.maxval = float(maxval)
 
+		# Lookup table for the scale: the domain value and RGB colour of each step
+		self.domain = np.linspace(self.minval, self.maxval, len(self.colours))
+		self.rgb = np.array([ spectra.html(c).rgb for c in self.colours ], dtype=float)
+
 	def get_colour(self, val, colformat='hex'):
 		""" Given a value, return a colour within the colour scale """
+		return self.get_colour_column([val], colformat)[0]
+
+	def get_colour_column(self, vals, colformat='hex'):
+		""" Given a list of values, return a list of colours within the colour scale.
+		Colours are worked out for all values at once, giving the same results as
+		interpolating each value with spectra.scale()
+		"""
+		colours = [''] * len(vals)
 		try:
 			# Sanity checks
-			val = re.sub("[^0-9\.]", "", str(val))
-			if val == '':
-				val = self.minval
-			val = float(val)
-			val = max(val, self.minval)
-			val = min(val, self.maxval)
-
-			domain_nums = list( np.linspace(self.minval, self.maxval, len(self.colours)) )
-			my_scale = spectra.scale(self.colours).domain(domain_nums)
+			nums = np.empty(len(vals))
+			valid = np.ones(len(vals), dtype=bool)
+			for i, val in enumerate(vals):
+				num = self._clean_value(val)
+				if num is None:
+					valid[i] = False
+					num = self.minval
+				nums[i] = num
+			nums = np.minimum(np.maximum(nums, self.minval), self.maxval)
+
+			# Find the step of the scale that each value falls within
+			domain = self.domain
+			valid &= (nums >= domain[0]) & (nums <= domain[-1])
+			step = np.clip(np.searchsorted(domain, nums, side='left') - 1, 0, len(domain) - 2)
+			x0 = domain[step]
+			num_range = domain[step + 1] - x0
+			valid &= num_range != 0
+			with np.errstate(divide='ignore', invalid='ignore'):
+				prop = (nums - x0) / num_range
+
+			# Blend the colours either side, same as spectra.Color.blend()
+			keep = 1.0 - prop
+			rgb = self.rgb[step] * keep[:, None] + self.rgb[step + 1] * prop[:, None]
 
 			# Weird, I know. I ported this from the original JavaScript for continuity
 			# Seems to work better than adjusting brightness / saturation / luminosity
-			rgb_converter = lambda x: max(0, min(1, 1+((x-1)*0.3)))
-			thecolour = spectra.rgb( *[rgb_converter(v) for v in my_scale(val).rgb] )
+			rgb = np.maximum(0, np.minimum(1, 1+((rgb-1)*0.3)))
+			rgb = np.floor(0.5 + rgb * 255).astype(int)
 
-			return thecolour.hexcode
+			for i in np.flatnonzero(valid):
+				colours[i] = '#{:02x}{:02x}{:02x}'.format(*rgb[i])
 
 		except:
 			# Shouldn't crash all of MultiQC just for colours
-			return ''
+			return [''] * len(vals)
+		return colours
+
+	def _clean_value(self, val):
+		""" Turn a table value into a number for the colour scale, ignoring
+		anything that isn't a digit or a decimal point. Returns None if this
+		doesn't leave a valid number.
+		"""
+		# Numbers are common, so skip the regex unless str() gives an exponent
+		if type(val) in (int, float) or isinstance(val, float):
+			if val != val or val in (float('inf'), float('-inf')):
+				return self.minval
+			val_abs = abs(val)
+			if val_abs < 1e16 and (val_abs >= 1e-4 or val_abs == 0 or type(val) is int):
+				return float(val_abs)
+		try:
+			val = _clean_value_re.sub("", str(val))
+			if val == '':
+				return self.minval
+			return float(val)
+		except:
+			return None
 
 
 	def get_colours(self, name='GnBu'):
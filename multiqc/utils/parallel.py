@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+
+""" Run MultiQC modules in parallel worker processes. Each module runs
+in a forked process starting from the same report state, and its results
+are merged back in to the main process in the original module order so
+that the report is the same as when modules are run one after another. """
+
+from __future__ import print_function
+from collections import defaultdict
+import importlib
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import tempfile
+import traceback
+import types
+try:
+    import cPickle as pickle # Python 2
+except ImportError:
+    import pickle
+
+from multiqc.utils import cache, config, general_stats, report, timing
+logger = config.logger
+
+# Report and config state when the worker processes were started
+_base_state = dict()
+
+# Config attributes that are set for each module run and not copied back
+_worker_config_keys = ['data_dir', 'plots_dir']
+
+# Config value types that are copied back to the main process if a module changes them
+try:
+    _simple_types = (str, unicode, int, long, float, bool, type(None)) # Python 2
+except NameError:
+    _simple_types = (str, int, float, bool, type(None))
+
+
+class ModuleError(Exception):
+    """ Raised in the main process when a module broke in a worker process.
+    module_traceback holds the traceback from the worker. """
+    def __init__(self, module_traceback):
+        super(ModuleError, self).__init__(module_traceback)
+        self.module_traceback = module_traceback
+
+
+class ModulePool(object):
+    """ Pool of worker processes running MultiQC modules. Modules are all
+    started when the pool is created. Modules that set serial_only = True
+    are not sent to the pool and should be run in the main process. """
+
+    def __init__(self, run_modules, processes, tmp_dir):
+        """ Start running modules in worker processes
+        :param run_modules: List of {module name: custom config} dicts, as in config.module_order
+        :param processes: Number of worker processes
+        :param tmp_dir: Temporary directory for worker output files
+        """
+        self.results = dict()
+        self.pool = None
+        if not hasattr(os, 'fork'):
+            logger.warning("Running modules in parallel is not supported on this platform, running them one at a time")
+            return
+
+        _base_state['html_ids'] = list(report.html_ids)
+        _base_state['config'] = _get_config_values()
+        _base_state['tmp_dir'] = tmp_dir
+
+        # Load the modules before forking so that each worker doesn't import them again
+        tasks = list()
+        for idx, mod_dict in enumerate(run_modules):
+            this_module = list(mod_dict.keys())[0]
+            try:
+                mod = config.avail_modules[this_module].load()
+            except Exception:
+                continue # Reported when the module is run in the main process
+            if getattr(mod, 'serial_only', False):
+                logger.debug("Module {} can't run in parallel, will run in the main process".format(this_module))
+                continue
+            tasks.append((idx, this_module, list(mod_dict.values())[0]))
+        if len(tasks) == 0:
+            return
+
+        try:
+            ctx = multiprocessing.get_context('fork')
+        except AttributeError:
+            ctx = multiprocessing # Python 2 always forks
+        self.pool = ctx.Pool(min(processes, len(tasks)), initializer=_init_worker)
+        for idx, this_module, mod_cust_config in tasks:
+            self.results[idx] = self.pool.apply_async(_run_module, (this_module, mod_cust_config))
+        self.pool.close()
+        logger.debug("Running {} modules in {} worker processes".format(len(tasks), min(processes, len(tasks))))
+
+    def get_output(self, idx):
+        """ Wait for a module to finish and merge its results in to the report.
+        Returns the list of module objects, or None if the module should
+        be run in the main process instead. Raises UserWarning if the module
+        found no samples and ModuleError if it broke.
+        :param idx: Index of the module in run_modules
+        """
+        if idx not in self.results:
+            return None
+        result = self.results.pop(idx).get()
+        try:
+            result = pickle.loads(result)
+        except Exception as e:
+            logger.debug("Could not load results from worker process: {}".format(e))
+            return None
+        if result['status'] == 'unpicklable':
+            logger.debug("Results for {} can't be copied between processes, running again in the main process: {}".format(result['name'], result['reason']))
+            _remove_dir(result['task_dir'])
+            return None
+
+        # Check that the module didn't use IDs or data file names already taken by earlier modules
+        if any(i in report.html_ids for i in result['html_ids']) or any(fn in report.saved_raw_data for fn in result['saved_raw_data']):
+            logger.debug("Module {} clashed with the output of an earlier module, running again in the main process".format(result['name']))
+            _remove_dir(result['task_dir'])
+            return None
+
+        # Recreate functions and modules before changing the report, so that nothing is half merged
+        try:
+            result['general_stats_headers'] = _unpack_functions(result['general_stats_headers'])
+            result['flat_plot_jobs'] = _unpack_functions(result['flat_plot_jobs'])
+            modules = [_unpack_module(m) for m in result['modules']]
+        except Exception as e:
+            logger.debug("Could not load results for {} from worker process, running again in the main process: {}".format(result['name'], e))
+            _remove_dir(result['task_dir'])
+            return None
+
+        _merge_result(result)
+        if result['status'] == 'no_samples':
+            raise UserWarning
+        if result['status'] == 'error':
+            raise ModuleError(result['traceback'])
+        return modules
+
+    def terminate(self):
+        """ Stop all worker processes """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+    def join(self):
+        """ Wait for the worker processes to exit """
+        if self.pool is not None:
+            self.pool.join()
+
+
+def _init_worker():
+    """ Set up a newly started worker process """
+    # Let the main process handle Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Forked processes share the random state, which is used for plot IDs
+    random.seed()
+    # Don't share the main process parsed data cache connection
+    cache.parse_cache = None
+
+
+def _run_module(this_module, mod_cust_config):
+    """ Run one module in a worker process. Returns the pickled
+    module output and changes made to the report. """
+    task_dir = tempfile.mkdtemp(dir=_base_state['tmp_dir'])
+    _reset_state(task_dir)
+    result = {'name': this_module, 'task_dir': task_dir, 'status': 'ok', 'modules': list()}
+    try:
+        mod = config.avail_modules[this_module].load()
+        mod.mod_cust_config = mod_cust_config
+        with timing.module_timer(this_module):
+            output = mod()
+        if type(output) != list:
+            output = [output]
+        result['modules'] = output
+    except UserWarning:
+        result['status'] = 'no_samples'
+    except Exception:
+        result['status'] = 'error'
+        result['traceback'] = traceback.format_exc()
+
+    # Save any newly parsed data for the main process and for next time
+    if cache.parse_cache is not None:
+        try:
+            cache.parse_cache.save()
+        except Exception as e:
+            logger.warning("Could not save parsed data cache: {}".format(e))
+
+    result.update({
+        'general_stats_data': [ _plain_dict(d) for d in report.general_stats_data ],
+        'general_stats_headers': report.general_stats_headers,
+        'data_sources': _plain_dict(report.data_sources),
+        'plot_data': report.plot_data,
+        'html_ids': report.html_ids[len(_base_state['html_ids']):],
+        'lint_errors': report.lint_errors,
+        'num_hc_plots': report.num_hc_plots,
+        'num_mpl_plots': report.num_mpl_plots,
+        'flat_plot_jobs': report.flat_plot_jobs,
+        'saved_raw_data': report.saved_raw_data,
+        'last_found_file': report.last_found_file,
+        'parse_cache_stats': cache.parse_cache_stats,
+        'timings': timing.timings,
+        'module_files': timing.module_files,
+        'config': _changed_config_values(),
+    })
+    try:
+        result['general_stats_headers'] = _pack_functions(result['general_stats_headers'])
+        result['flat_plot_jobs'] = _pack_functions(result['flat_plot_jobs'])
+        result['modules'] = [_pack_module(m) for m in result['modules']]
+        return pickle.dumps(result, 2)
+    except Exception as e:
+        return pickle.dumps({'name': this_module, 'task_dir': task_dir, 'status': 'unpicklable', 'reason': str(e)}, 2)
+
+
+def _reset_state(task_dir):
+    """ Put the report back to how it was when the worker started """
+    report.general_stats_data = general_stats.GeneralStats()
+    report.general_stats_headers = list()
+    report.data_sources = defaultdict(lambda:defaultdict(lambda:defaultdict()))
+    report.plot_data = dict()
+    report.html_ids = report.HtmlIds(_base_state['html_ids'])
+    report.lint_errors = list()
+    report.num_hc_plots = 0
+    report.num_mpl_plots = 0
+    report.flat_plot_jobs = list()
+    report.saved_raw_data = dict()
+    report.last_found_file = None
+    cache.parse_cache_stats.clear()
+    del timing.timings[:]
+    timing.module_files.clear()
+    for k, v in _base_state['config'].items():
+        setattr(config, k, v)
+    # Write data and plot files to a directory for this module, moved in to place when merged
+    for k in _worker_config_keys:
+        if getattr(config, k, None) is not None:
+            setattr(config, k, os.path.join(task_dir, k))
+            os.makedirs(getattr(config, k))
+
+
+def _merge_result(result):
+    """ Add the changes a worker process made to the report. Functions
+    must already have been unpacked with _unpack_functions(). """
+    report.general_stats_data.extend(result['general_stats_data'])
+    report.general_stats_headers.extend(result['general_stats_headers'])
+    for module, sections in result['data_sources'].items():
+        for section, sources in sections.items():
+            report.data_sources[module][section].update(sources)
+    report.plot_data.update(result['plot_data'])
+    report.html_ids.extend(result['html_ids'])
+    report.lint_errors.extend(result['lint_errors'])
+    report.num_hc_plots += result['num_hc_plots']
+    report.num_mpl_plots += result['num_mpl_plots']
+    report.flat_plot_jobs.extend(result['flat_plot_jobs'])
+    report.saved_raw_data.update(result['saved_raw_data'])
+    report.last_found_file = result['last_found_file']
+    for module, (hits, misses) in result['parse_cache_stats'].items():
+        stats = cache.parse_cache_stats.setdefault(module, [0, 0])
+        stats[0] += hits
+        stats[1] += misses
+    timing.timings.extend(result['timings'])
+    for module, (num_files, seconds) in result['module_files'].items():
+        t = timing.module_files.setdefault(module, [0, 0.0])
+        t[0] += num_files
+        t[1] += seconds
+    for k, v in result['config'].items():
+        setattr(config, k, v)
+    for k in _worker_config_keys:
+        src = os.path.join(result['task_dir'], k)
+        if os.path.isdir(src) and getattr(config, k, None) is not None:
+            _move_files(src, getattr(config, k))
+    _remove_dir(result['task_dir'])
+
+
+def _get_config_values():
+    """ Return a dict of the config values with simple types """
+    return dict((k, v) for k, v in vars(config).items() if not k.startswith('_') and type(v) in _simple_types)
+
+
+def _changed_config_values():
+    """ Return the config values that a module has set or changed """
+    changed = dict()
+    for k, v in _get_config_values().items():
+        if k in _worker_config_keys:
+            continue
+        if k not in _base_state['config'] or _base_state['config'][k] != v:
+            changed[k] = v
+    return changed
+
+
+def _plain_dict(d):
+    """ Convert nested defaultdicts to dicts so that they can be pickled """
+    if isinstance(d, dict):
+        return dict((k, _plain_dict(v)) for k, v in d.items())
+    return d
+
+
+def _move_files(src, dest):
+    """ Move all files in src to the same place in dest, replacing existing files """
+    for root, dirnames, filenames in os.walk(src):
+        dest_root = os.path.join(dest, os.path.relpath(root, src))
+        if not os.path.isdir(dest_root):
+            os.makedirs(dest_root)
+        for fn in filenames:
+            dest_fn = os.path.join(dest_root, fn)
+            if os.path.exists(dest_fn):
+                os.remove(dest_fn)
+            shutil.move(os.path.join(root, fn), dest_fn)
+
+
+def _remove_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _pack_module(m):
+    """ Return the class and attributes of a module object that can be
+    pickled. Attributes that can't be pickled are left out. """
+    cls = m.__class__
+    try:
+        pickle.dumps(cls, 2)
+    except Exception:
+        from multiqc.modules.base_module import BaseMultiqcModule
+        cls = BaseMultiqcModule
+    attrs = dict()
+    for k, v in vars(m).items():
+        try:
+            pickle.dumps(v, 2)
+        except Exception:
+            logger.debug("Not copying attribute '{}' of module {} from worker process".format(k, m.name))
+        else:
+            attrs[k] = v
+    return (cls, attrs)
+
+
+def _unpack_module(packed):
+    """ Recreate a module object from _pack_module() """
+    cls, attrs = packed
+    m = cls.__new__(cls)
+    m.__dict__.update(attrs)
+    return m
+
+
+class _FunctionRef(object):
+    """ Picklable reference to a module-level function, found again in the
+    main process by its module and qualified name. Lambdas, closures and
+    other functions that can't be found this way raise TypeError. """
+
+    def __init__(self, func):
+        self.module = func.__module__
+        self.name = getattr(func, '__qualname__', func.__name__) # Python 2 has no __qualname__
+        if _find_function(self.module, self.name) is not func:
+            raise TypeError("Function '{}' in {} is not a module-level function".format(self.name, self.module))
+
+    def unpack(self):
+        func = _find_function(self.module, self.name)
+        if func is None:
+            raise TypeError("Could not find function '{}' in {}".format(self.name, self.module))
+        return func
+
+
+def _find_function(module_name, name):
+    """ Return a function from its module and qualified name, or None """
+    try:
+        # The module may only have been imported by the worker process
+        obj = importlib.import_module(module_name)
+        for attr in name.split('.'):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError):
+        return None
+    return obj
+
+
+def _pack_functions(obj):
+    """ Replace functions in nested dicts and lists with references
+    to them by name. Raises TypeError for functions that aren't
+    module-level functions. """
+    if isinstance(obj, types.FunctionType):
+        return _FunctionRef(obj)
+    if isinstance(obj, dict):
+        return obj.__class__((k, _pack_functions(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return obj.__class__(_pack_functions(v) for v in obj)
+    return obj
+
+
+def _unpack_functions(obj):
+    """ Reverse _pack_functions() """
+    if isinstance(obj, _FunctionRef):
+        return obj.unpack()
+    if isinstance(obj, dict):
+        return obj.__class__((k, _unpack_functions(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return obj.__class__(_unpack_functions(v) for v in obj)
+    return obj
@@ -6,39 +6,103 @@ helper functions to generate markup for report. """
 
 from __future__ import print_function
 from collections import defaultdict, OrderedDict
+import base64
 import click
+import codecs
 import fnmatch
 import io
 import json
 import inspect
+import linecache
 import lzstring
 import mimetypes
+import mmap
 import os
 import re
+import sqlite3
+import time
 import yaml
+import zlib
+from multiprocessing.pool import ThreadPool
+try:
+    from os import scandir
+except ImportError:
+    scandir = None # Python 2
 
 from multiqc import config
+from multiqc.utils import cache, general_stats, json_stream
 logger = config.logger
 
-# Treat defaultdict and OrderedDict as normal dicts for YAML output
+# Treat defaultdict, OrderedDict and table data as normal dicts and lists for YAML output
 from yaml.representer import Representer, SafeRepresenter
 yaml.add_representer(defaultdict, Representer.represent_dict)
 yaml.add_representer(OrderedDict, Representer.represent_dict)
+yaml.add_representer(general_stats.Section, Representer.represent_dict)
+yaml.add_representer(general_stats.GeneralStats, Representer.represent_list)
 try:
     yaml.add_representer(unicode, SafeRepresenter.represent_unicode)
 except NameError:
     pass # Python 3
 
+class HtmlIds(object):
+    """ HTML IDs used in the report, in the order they were added. A set is
+    kept for lookups, with the last '-N' suffix given to each duplicated ID so
+    that the next free suffix can be found without starting again from 1. """
+
+    def __init__(self, ids=None):
+        self.ids = list()
+        self.seen = set()
+        self.suffixes = dict()
+        if ids is not None:
+            self.extend(ids)
+
+    def add(self, html_id):
+        """ Save a HTML ID """
+        if html_id not in self.seen:
+            self.seen.add(html_id)
+            self.ids.append(html_id)
+
+    def extend(self, ids):
+        """ Save several HTML IDs """
+        for html_id in ids:
+            self.add(html_id)
+
+    def unique(self, html_id):
+        """ Return the ID if it's free, otherwise the ID with the first free '-N' suffix """
+        if html_id not in self.seen:
+            return html_id
+        # IDs are never removed, so lower suffixes are still taken
+        i = self.suffixes.get(html_id, 0) + 1
+        while '{}-{}'.format(html_id, i) in self.seen:
+            i += 1
+        self.suffixes[html_id] = i
+        return '{}-{}'.format(html_id, i)
+
+    def __contains__(self, html_id):
+        return html_id in self.seen
+
+    def __getitem__(self, idx):
+        return self.ids[idx]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
 # Set up global variables shared across modules
-general_stats_data = list()
+general_stats_data = general_stats.GeneralStats()
 general_stats_headers = list()
 general_stats_html = ''
 data_sources = defaultdict(lambda:defaultdict(lambda:defaultdict()))
 plot_data = dict()
-html_ids = list()
+plot_data_chunks = list()
+html_ids = HtmlIds()
 lint_errors = list()
 num_hc_plots = 0
 num_mpl_plots = 0
+flat_plot_jobs = list()
 saved_raw_data = dict()
 last_found_file = None
 
@@ -51,15 +115,213 @@ def get_filelist(run_module_names):
     list of files to search. Then fire search functions for each file.
     """
     # Prep search patterns
+    spatterns = prep_search_patterns(run_module_names)
+    for patterns in spatterns:
+        for key in patterns:
+            files[key] = list()
+    search_patterns = compile_search_patterns(spatterns)
+
+    # Search patterns can set max_filesize above log_filesize_limit. Larger
+    # files are only checked against those patterns.
+    max_filesize = max([config.log_filesize_limit] +
+        [csp['max_filesize'] for key, sps in search_patterns for sp, csp in sps if csp['max_filesize'] is not None])
+
+    # Load previous search results so that we only need to open new or changed files
+    search_cache = None
+    if config.search_cache:
+        try:
+            search_cache = cache.SearchCache(spatterns, rebuild=config.search_cache_rebuild)
+        except (sqlite3.Error, IOError, OSError) as e:
+            logger.warning("Could not load search cache, searching all files: {}".format(e))
+
+    def add_file(fn, root):
+        """
+        Function applied to each file found when walking the analysis
+        directories. Runs through all search patterns and returns the file
+        dict with a list of the search keys that it matches.
+        """
+        f = {'fn': fn, 'root': root}
+
+        # Check that this is a file and not a pipe or anything weird
+        if not os.path.isfile(os.path.join(root, fn)):
+            return None
+
+        # Check that we don't want to ignore this file
+        i_matches = [n for n in config.fn_ignore_files if fnmatch.fnmatch(fn, n)]
+        if len(i_matches) > 0:
+            logger.debug("Ignoring file as matched an ignore pattern: {}".format(fn))
+            return None
+
+        # Limit search to small files, to avoid 30GB FastQ files etc.
+        st = None
+        try:
+            st = os.stat(os.path.join(root,fn))
+            f['filesize'] = st.st_size
+        except (IOError, OSError, ValueError, UnicodeDecodeError):
+            logger.debug("Couldn't read file when checking filesize: {}".format(fn))
+        else:
+            if f['filesize'] > max_filesize:
+                return False
+
+        # Use the cached result if the file hasn't changed since the last run
+        if search_cache is not None and st is not None:
+            keys = search_cache.get(os.path.join(root, fn), st)
+            if keys is None:
+                keys = scan_file(f, search_patterns)
+                search_cache.add(os.path.join(root, fn), st, keys)
+            return f, keys
+
+        # Test file for all search patterns in a single pass
+        return f, scan_file(f, search_patterns)
+
+    # Use a pool of threads to walk and search files if requested.
+    # Helps a lot on network filesystems, where we are mostly waiting on I/O.
+    pool = None
+    if config.search_threads > 1:
+        logger.debug("Searching files using {} threads".format(config.search_threads))
+        # Load the mimetypes database before the threads try to
+        if not mimetypes.inited:
+            mimetypes.init()
+        pool = ThreadPool(config.search_threads)
+
+    # Go through the analysis directories and get file list
+    walk_start = time.time()
+    for path in config.analysis_dir:
+        if os.path.isfile(path):
+            searchfiles.append([os.path.basename(path), os.path.dirname(path)])
+        elif os.path.isdir(path):
+            searchfiles.extend(walk_dir(path, pool))
+    logger.debug("Found {} files to search in {:.2f}s".format(len(searchfiles), time.time() - walk_start))
+
+    # Search through collected files. Results come back in the same order
+    # as searchfiles so that report.files is the same for every run.
+    search_start = time.time()
+    if pool is not None:
+        results = pool.imap(lambda sf: add_file(sf[0], sf[1]), searchfiles, chunksize=16)
+    else:
+        results = (add_file(sf[0], sf[1]) for sf in searchfiles)
+    with click.progressbar(results, length=len(searchfiles), label="Searching {} files..".format(len(searchfiles))) as sresults:
+        for res in sresults:
+            if res:
+                f, keys = res
+                for key in keys:
+                    files[key].append(f)
+    if pool is not None:
+        pool.close()
+        pool.join()
+    logger.debug("Searched {} files in {:.2f}s".format(len(searchfiles), time.time() - search_start))
+
+    if search_cache is not None:
+        try:
+            search_cache.save([p for p in config.analysis_dir if os.path.isdir(p)])
+            search_cache.close()
+        except sqlite3.Error as e:
+            logger.warning("Could not save search cache: {}".format(e))
+
+def walk_dir(path, pool=None):
+    """
+    Walk an analysis directory, skipping anything matching the ignore config.
+    Each level of the directory tree is listed in parallel if given a thread pool.
+    :param path: Directory to walk
+    :param pool: Optional multiprocessing ThreadPool
+    :return: List of [filename, root] pairs, in the same order as os.walk()
+    """
+    tree = dict()
+    level = [path]
+    while len(level) > 0:
+        if pool is not None:
+            listings = pool.map(_list_dir, level)
+        else:
+            listings = [_list_dir(root) for root in level]
+        next_level = list()
+        for root, listing in zip(level, listings):
+            if listing is None:
+                continue
+            dirnames, filenames = listing
+            bname = os.path.basename(root)
+
+            # Skip any sub-directories matching ignore params
+            orig_dirnames = dirnames[:]
+            for n in config.fn_ignore_dirs:
+                dirnames[:] = [d for d in dirnames if not fnmatch.fnmatch(d, n.rstrip(os.sep))]
+                if len(orig_dirnames) != len(dirnames):
+                    removed_dirs = [os.path.join(root, d) for d in set(orig_dirnames).symmetric_difference(set(dirnames))]
+                    logger.debug("Ignoring directory as matched fn_ignore_dirs: {}".format(", ".join(removed_dirs)))
+                    orig_dirnames = dirnames[:]
+            for n in config.fn_ignore_paths:
+                dirnames[:] = [d for d in dirnames if not fnmatch.fnmatch(os.path.join(root, d), n.rstrip(os.sep))]
+                if len(orig_dirnames) != len(dirnames):
+                    removed_dirs = [os.path.join(root, d) for d in set(orig_dirnames).symmetric_difference(set(dirnames))]
+                    logger.debug("Ignoring directory as matched fn_ignore_paths: {}".format(", ".join(removed_dirs)))
+            subdirs = [os.path.join(root, d) for d in dirnames]
+            next_level.extend(subdirs)
+
+            # Skip *this* directory if matches ignore params
+            d_matches = [n for n in config.fn_ignore_dirs if fnmatch.fnmatch(bname, n.rstrip(os.sep))]
+            p_matches = [n for n in config.fn_ignore_paths if fnmatch.fnmatch(root, n.rstrip(os.sep))]
+            if len(d_matches) > 0:
+                logger.debug("Ignoring directory as matched fn_ignore_dirs: {}".format(bname))
+                filenames = []
+            elif len(p_matches) > 0:
+                logger.debug("Ignoring directory as matched fn_ignore_paths: {}".format(root))
+                filenames = []
+            tree[root] = (filenames, subdirs)
+        level = next_level
+
+    # Put the files back into top-down walk order
+    found_files = list()
+    stack = [path]
+    while len(stack) > 0:
+        root = stack.pop()
+        if root not in tree:
+            continue
+        filenames, subdirs = tree[root]
+        found_files.extend([[fn, root] for fn in filenames])
+        stack.extend(reversed(subdirs))
+    return found_files
+
+def _list_dir(root):
+    """
+    List the contents of a single directory, following symlinks.
+    :return: Tuple of (dirnames, filenames) as given by os.walk(),
+             or None if the directory could not be read
+    """
+    dirnames = list()
+    filenames = list()
+    try:
+        if scandir is not None:
+            for entry in scandir(root):
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dirnames.append(entry.name)
+                else:
+                    filenames.append(entry.name)
+        else:
+            for name in os.listdir(root):
+                if os.path.isdir(os.path.join(root, name)):
+                    dirnames.append(name)
+                else:
+                    filenames.append(name)
+    except (IOError, OSError):
+        return None
+    return dirnames, filenames
+
+def prep_search_patterns(run_module_names):
+    """
+    Collect the search patterns for the modules that we are running.
+    Returns a list of dicts, with the patterns split into groups
+    according to their speed of execution.
+    """
     spatterns = [{},{},{},{},{},{},{}]
-    epatterns = [{}, {}]
     ignored_patterns = []
     for key, sps in config.sp.items():
         mod_name = key.split('/', 1)[0]
         if mod_name.lower() not in [m.lower() for m in run_module_names]:
             ignored_patterns.append(key)
             continue
-        files[key] = list()
         if not isinstance(sps, list):
             sps = [sps]
 
@@ -72,6 +334,7 @@ def get_filelist(run_module_names):
             'num_lines',
             'shared',
             'max_filesize',
+            'compressed',
             'exclude_fn',
             'exclude_fn_re',
             'exclude_contents',
@@ -102,87 +365,297 @@ def get_filelist(run_module_names):
     if len(ignored_patterns) > 0:
         logger.debug("Ignored search patterns as didn't match running modules: {}".format(', '.join(ignored_patterns)))
 
-    def add_file(fn, root):
-        """
-        Function applied to each file found when walking the analysis
-        directories. Runs through all search patterns and returns True
-        if a match is found.
-        """
-        f = {'fn': fn, 'root': root}
+    return spatterns
 
-        # Check that this is a file and not a pipe or anything weird
-        if not os.path.isfile(os.path.join(root, fn)):
-            return None
-
-        # Check that we don't want to ignore this file
-        i_matches = [n for n in config.fn_ignore_files if fnmatch.fnmatch(fn, n)]
-        if len(i_matches) > 0:
-            logger.debug("Ignoring file as matched an ignore pattern: {}".format(fn))
-            return None
-
-        # Limit search to small files, to avoid 30GB FastQ files etc.
-        try:
-            f['filesize'] = os.path.getsize(os.path.join(root,fn))
-        except (IOError, OSError, ValueError, UnicodeDecodeError):
-            logger.debug("Couldn't read file when checking filesize: {}".format(fn))
+def compile_search_patterns(spatterns):
+    """
+    Compile the grouped search patterns returned by prep_search_patterns()
+    into a flat, ordered list of (key, [(pattern, compiled pattern)]) tuples.
+    Glob and regex patterns are compiled once here instead of for every file.
+    """
+    search_patterns = list()
+    for patterns in spatterns:
+        for key, sps in patterns.items():
+            search_patterns.append((key, [(sp, _compile_search_pattern(sp)) for sp in sps]))
+    return search_patterns
+
+# Regex features that can match differently on bytes and decoded text:
+# non-ASCII or control characters, escape sequences such as \s or \n,
+# any character, anchors, negated classes and inline flags
+_byte_unsafe_re = re.compile(r'[^\x20-\x7e]|\\[a-zA-Z0-9]|[.^$]|\(\?')
+
+def _compile_search_pattern(sp):
+    """ Precompile a single search pattern dict """
+    csp = {
+        'fn': None,
+        'fn_re': None,
+        'contents': sp.get('contents'),
+        'contents_re': None,
+        'contents_re_text': None,
+        'contents_bytes': None,
+        'contents_re_bytes': None,
+        'num_lines': sp.get('num_lines'),
+        'max_filesize': sp.get('max_filesize'),
+        'compressed': sp.get('compressed', False),
+    }
+    if sp.get('fn') is not None:
+        csp['fn'] = re.compile(fnmatch.translate(os.path.normcase(sp['fn'])))
+    if sp.get('fn_re') is not None:
+        csp['fn_re'] = re.compile(sp['fn_re'])
+    if sp.get('contents_re') is not None:
+        # We only need to know whether there is a match, so leading and
+        # trailing wildcards just make the regex engine backtrack
+        pattern = sp['contents_re']
+        if re.match(r'\.\*\??(?![*+?{])', pattern):
+            pattern = re.sub(r'^\.\*\??', '', pattern)
+        if pattern.endswith('.*') and not pattern.endswith('\\.*'):
+            pattern = pattern[:-2]
+        csp['contents_re'] = re.compile(pattern)
+        # Quick check against the whole buffer. Only used where anchors and
+        # lookarounds can't make this miss a match found line by line.
+        if not any(x in pattern for x in ['$', '\\A', '\\Z', '(?']):
+            csp['contents_re_text'] = re.compile(pattern, re.MULTILINE)
+        # Simple ASCII patterns give the same matches when run on raw bytes
+        if not _byte_unsafe_re.search(re.sub(r'\\[^a-zA-Z0-9]', '', pattern)):
+            csp['contents_re_bytes'] = re.compile(pattern.encode('utf-8'))
+    # Strings can be matched against raw bytes if they don't contain line breaks
+    if csp['contents'] is not None and '\n' not in csp['contents'] and '\r' not in csp['contents']:
+        csp['contents_bytes'] = csp['contents'].encode('utf-8')
+    csp['has_fn'] = csp['fn'] is not None or csp['fn_re'] is not None
+    csp['has_contents'] = csp['contents'] is not None or csp['contents_re'] is not None
+    return csp
+
+def scan_file(f, search_patterns):
+    """
+    Search a single file against all compiled search patterns.
+    Content patterns are first checked against the raw bytes of the file,
+    which rules out most files without decoding them. The file is then
+    decoded at most once, reading only as many lines as the remaining
+    content patterns need. Gives the same result as running search_file()
+    and exclude_file() for each pattern in turn.
+    :param f: File dict with 'fn', 'root' and (optionally) 'filesize'
+    :param search_patterns: List returned by compile_search_patterns()
+    :return: List of search pattern keys that the file belongs to
+    """
+    # Use mimetypes to exclude binary files where possible.
+    # Gzipped files are only matched by filename, for patterns that ask for them.
+    # Files with any other compression can't be read, so are always skipped.
+    (ftype, encoding) = mimetypes.guess_type(os.path.join(f['root'], f['fn']))
+    compressed = encoding is not None
+    if compressed and encoding != 'gzip':
+        return []
+    if compressed and not any(csp['compressed'] for key, sps in search_patterns for sp, csp in sps):
+        return []
+    if ftype is not None and ftype.startswith('image'):
+        return []
+
+    # Match filenames
+    fn_norm = os.path.normcase(f['fn'])
+    candidates = list()
+    for key, sps in search_patterns:
+        key_candidates = list()
+        for sp, csp in sps:
+            if compressed and (not csp['compressed'] or csp['has_contents']):
+                continue
+            # Search pattern specific filesize limit
+            if 'filesize' in f:
+                if f['filesize'] > (csp['max_filesize'] if csp['max_filesize'] is not None else config.log_filesize_limit):
+                    continue
+            fn_matched = False
+            if csp['fn'] is not None and csp['fn'].match(fn_norm):
+                fn_matched = True
+            if csp['fn_re'] is not None and csp['fn_re'].match(f['fn']):
+                fn_matched = True
+            if not csp['has_contents']:
+                if fn_matched:
+                    key_candidates.append((sp, csp))
+                continue
+            # Contents will only give a match if the filename also matched
+            if csp['has_fn'] and not fn_matched:
+                continue
+            key_candidates.append((sp, csp))
+        if len(key_candidates) > 0:
+            candidates.append((key, key_candidates))
+
+    # Drop content patterns that don't match the raw bytes
+    path = os.path.join(f['root'], f['fn'])
+    byte_csps = [csp for key, kcs in candidates for sp, csp in kcs
+        if csp['contents_bytes'] is not None or csp['contents_re_bytes'] is not None]
+    if len(byte_csps) > 0:
+        possible = _search_bytes(path, byte_csps)
+        if possible is not None:
+            ruled_out = set(id(csp) for csp in byte_csps) - set(id(csp) for csp in possible)
+            candidates = [(key, [(sp, csp) for sp, csp in kcs if id(csp) not in ruled_out]) for key, kcs in candidates]
+            candidates = [(key, kcs) for key, kcs in candidates if len(kcs) > 0]
+
+    # Read the start of the file once for all remaining content patterns
+    lines = None
+    text = None
+    read_lines = 0
+    for key, kcs in candidates:
+        for sp, csp in kcs:
+            if csp['has_contents'] and read_lines is not None:
+                read_lines = None if not csp['num_lines'] else max(read_lines, csp['num_lines'])
+    if any(csp['has_contents'] for key, kcs in candidates for sp, csp in kcs):
+        lines = _read_search_lines(path, read_lines)
+        if lines is None:
+            if config.report_readerrors:
+                logger.debug("Couldn't read file when looking for output: {}".format(f['fn']))
         else:
-            if f['filesize'] > config.log_filesize_limit:
-                return False
+            text = ''.join(lines)
 
-        # Test file for each search pattern
-        for patterns in spatterns:
-            for key, sps in patterns.items():
-                for sp in sps:
-                    if search_file (sp, f):
-                        # Check that we shouldn't exclude this file
-                        if not exclude_file(sp, f):
-                            # Looks good! Remember this file
-                            files[key].append(f)
-                        # Don't keep searching this file for other modules
-                        if not sp.get('shared', False):
-                            return
-                        # Don't look at other patterns for this module
-                        else:
-                            break
-
-    # Go through the analysis directories and get file list
-    for path in config.analysis_dir:
-        if os.path.isfile(path):
-            searchfiles.append([os.path.basename(path), os.path.dirname(path)])
-        elif os.path.isdir(path):
-            for root, dirnames, filenames in os.walk(path, followlinks=True, topdown=True):
-                bname = os.path.basename(root)
-
-                # Skip any sub-directories matching ignore params
-                orig_dirnames = dirnames[:]
-                for n in config.fn_ignore_dirs:
-                    dirnames[:] = [d for d in dirnames if not fnmatch.fnmatch(d, n.rstrip(os.sep))]
-                    if len(orig_dirnames) != len(dirnames):
-                        removed_dirs = [os.path.join(root, d) for d in set(orig_dirnames).symmetric_difference(set(dirnames))]
-                        logger.debug("Ignoring directory as matched fn_ignore_dirs: {}".format(", ".join(removed_dirs)))
-                        orig_dirnames = dirnames[:]
-                for n in config.fn_ignore_paths:
-                    dirnames[:] = [d for d in dirnames if not fnmatch.fnmatch(os.path.join(root, d), n.rstrip(os.sep))]
-                    if len(orig_dirnames) != len(dirnames):
-                        removed_dirs = [os.path.join(root, d) for d in set(orig_dirnames).symmetric_difference(set(dirnames))]
-                        logger.debug("Ignoring directory as matched fn_ignore_paths: {}".format(", ".join(removed_dirs)))
-
-                # Skip *this* directory if matches ignore params
-                d_matches = [n for n in config.fn_ignore_dirs if fnmatch.fnmatch(bname, n.rstrip(os.sep))]
-                if len(d_matches) > 0:
-                    logger.debug("Ignoring directory as matched fn_ignore_dirs: {}".format(bname))
+    matched_keys = list()
+    for key, key_candidates in candidates:
+        for sp, csp in key_candidates:
+            if csp['has_contents']:
+                if lines is None:
                     continue
-                p_matches = [n for n in config.fn_ignore_paths if fnmatch.fnmatch(root, n.rstrip(os.sep))]
-                if len(p_matches) > 0:
-                    logger.debug("Ignoring directory as matched fn_ignore_paths: {}".format(root))
-                    continue
-                # Search filenames in this directory
-                for fn in filenames:
-                    searchfiles.append([fn, root])
-    # Search through collected files
-    with click.progressbar(searchfiles, label="Searching {} files..".format(len(searchfiles))) as sfiles:
-        for sf in sfiles:
-            add_file(sf[0], sf[1])
+                search_lines = lines[:csp['num_lines']] if csp['num_lines'] else lines
+                # Search by file contents (string)
+                if csp['contents'] is not None:
+                    # Cheap check against the whole buffer before looking line by line
+                    if csp['contents'] not in text:
+                        continue
+                    if not any(csp['contents'] in line for line in search_lines):
+                        continue
+                # Search by file contents (regex)
+                else:
+                    if csp['contents_re_text'] is not None and not csp['contents_re_text'].search(text):
+                        continue
+                    if not any(csp['contents_re'].search(line) for line in search_lines):
+                        continue
+            # Check that we shouldn't exclude this file
+            if not exclude_file(sp, f):
+                matched_keys.append(key)
+            # Don't keep searching this file for other modules
+            if not sp.get('shared', False):
+                return matched_keys
+            # Don't look at other patterns for this module
+            break
+    return matched_keys
+
+def _search_bytes(path, byte_csps):
+    """
+    Match content patterns against the raw bytes of a file without decoding it.
+    A pattern that doesn't match the bytes can't match the decoded text either,
+    so only the patterns returned need to be checked line by line. Only reads
+    the start of the file if all patterns have num_lines, otherwise the whole
+    file is memory-mapped.
+    :param path: Path to the file
+    :param byte_csps: Compiled search patterns with contents_bytes or contents_re_bytes
+    :return: List of the patterns that might match, or None if the file could not be read
+    """
+    num_lines = 0
+    for csp in byte_csps:
+        if num_lines is not None:
+            num_lines = None if not csp['num_lines'] else max(num_lines, csp['num_lines'])
+    possible = list()
+    try:
+        with io.open(path, 'rb') as fh:
+            buf = _read_search_head(fh, num_lines) if num_lines is not None else _map_search_file(fh)
+            try:
+                for csp in byte_csps:
+                    # Lines are counted by \n only, so this may look further than
+                    # num_lines into files with \r line endings, but never less far
+                    end = _line_end_offset(buf, csp['num_lines']) if csp['num_lines'] else len(buf)
+                    if csp['contents_bytes'] is not None:
+                        if buf.find(csp['contents_bytes'], 0, end) != -1:
+                            possible.append(csp)
+                    elif csp['contents_re_bytes'].search(buf, 0, end):
+                        possible.append(csp)
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+    except (IOError, OSError, ValueError):
+        return None
+    return possible
+
+def _read_search_head(fh, num_lines):
+    """ Read blocks from an open binary file until it has num_lines \\n line endings """
+    blocks = list()
+    num_breaks = 0
+    while num_breaks < num_lines:
+        block = fh.read(_SEARCH_CHUNK_SIZE * 8)
+        if not block:
+            break
+        blocks.append(block)
+        num_breaks += block.count(b'\n')
+    return b''.join(blocks)
+
+def _map_search_file(fh):
+    """ Memory-map a whole open binary file, or read it if that isn't possible """
+    try:
+        if os.fstat(fh.fileno()).st_size > 0:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError):
+        pass
+    return fh.read()
+
+def _line_end_offset(buf, num_lines):
+    """ Return the offset just after the num_lines'th \\n in buf, or the buffer length """
+    pos = -1
+    for i in range(num_lines):
+        pos = buf.find(b'\n', pos + 1)
+        if pos == -1:
+            return len(buf)
+    return pos + 1
+
+# Files are decoded in blocks of this many bytes, the same as io.open()
+# in text mode, so that files with encoding errors part way through
+# give the same search results as reading them line by line.
+_SEARCH_CHUNK_SIZE = 8192
+
+def _read_search_lines(path, num_lines=None):
+    """
+    Read lines from the start of a file for content searching.
+    Lines are decoded as UTF-8 with universal newlines and keep their
+    line endings, as when iterating over a file opened with io.open().
+    :param path: Path to the file
+    :param num_lines: Maximum number of lines needed. None to read whole file.
+    :return: List of lines, or None if the file could not be read
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = list()
+    num_breaks = 0
+    prev_cr = False
+    complete = True
+    try:
+        with io.open(path, 'rb') as fh:
+            while True:
+                block = fh.read(_SEARCH_CHUNK_SIZE * 8)
+                try:
+                    if not block:
+                        chunks.append(decoder.decode(b'', True))
+                        break
+                    for i in range(0, len(block), _SEARCH_CHUNK_SIZE):
+                        chunk = decoder.decode(block[i:i+_SEARCH_CHUNK_SIZE])
+                        if not chunk:
+                            continue
+                        chunks.append(chunk)
+                        # Count line breaks, including \r\n split across two chunks
+                        num_breaks += chunk.count('\n') + chunk.count('\r') - chunk.count('\r\n')
+                        if prev_cr and chunk.startswith('\n'):
+                            num_breaks -= 1
+                        prev_cr = chunk.endswith('\r')
+                except UnicodeDecodeError:
+                    complete = False
+                    break
+                if num_lines is not None and num_breaks >= num_lines:
+                    break
+    except (IOError, OSError, ValueError):
+        return None
+
+    text = ''.join(chunks)
+    if not complete:
+        # Lines running into the undecodable block would never be seen
+        text = text[:max(text.rfind('\n'), text.rfind('\r', 0, len(text)-1)) + 1]
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+        lines = [l + '\n' for l in lines]
+    else:
+        lines = [l + '\n' for l in lines[:-1]] + [lines[-1]]
+    return lines
 
 def search_file (pattern, f):
     """
@@ -195,7 +668,8 @@ def search_file (pattern, f):
     # Use mimetypes to exclude binary files where possible
     (ftype, encoding) = mimetypes.guess_type(os.path.join(f['root'], f['fn']))
     if encoding is not None:
-        return False
+        if encoding != 'gzip' or not pattern.get('compressed') or pattern.get('contents') is not None or pattern.get('contents_re') is not None:
+            return False
     if ftype is not None and ftype.startswith('image'):
         return False
 
@@ -308,11 +782,12 @@ def data_sources_tofile ():
             body = '\n'.join(["\t".join(l) for l in lines])
             print( body.encode('utf-8', 'ignore').decode('utf-8'), file=f)
 
-def save_htmlid(html_id, skiplint=False):
-    """ Take a HTML ID, sanitise for HTML, check for duplicates and save.
-    Returns sanitised, unique ID """
-    global html_ids
-    global lint_errors
+_htmlid_start_re = re.compile(r'^[a-zA-Z]')
+_htmlid_illegal_re = re.compile('[^a-zA-Z0-9_-]+')
+
+def clean_htmlid(html_id):
+    """ Take a HTML ID and sanitise it for HTML, without saving it.
+    Also safe to use as a filename. Returns sanitised ID """
 
     # Trailing whitespace
     html_id_clean = html_id.strip()
@@ -321,48 +796,87 @@ def save_htmlid(html_id, skiplint=False):
     html_id_clean = html_id_clean.strip('_')
 
     # Must begin with a letter
-    if re.match(r'^[a-zA-Z]', html_id_clean) is None:
+    if _htmlid_start_re.match(html_id_clean) is None:
         html_id_clean = 'mqc_{}'.format(html_id_clean)
 
     # Replace illegal characters
-    html_id_clean = re.sub('[^a-zA-Z0-9_-]+', '_', html_id_clean)
+    return _htmlid_illegal_re.sub('_', html_id_clean)
+
+def save_htmlid(html_id, skiplint=False):
+    """ Take a HTML ID, sanitise for HTML, check for duplicates and save.
+    Returns sanitised, unique ID """
+    global html_ids
+
+    html_id_clean = clean_htmlid(html_id)
 
     # Validate if linting
-    if config.lint and not skiplint:
-        modname = ''
-        codeline = ''
-        callstack = inspect.stack()
-        for n in callstack:
-            if 'multiqc/modules/' in n[1] and 'base_module.py' not in n[1]:
-                callpath = n[1].split('multiqc/modules/',1)[-1]
-                modname = '>{}< '.format(callpath)
-                codeline = n[4][0].strip()
-                break
-    if config.lint and not skiplint and html_id != html_id_clean:
-        errmsg = "LINT: {}HTML ID was not clean ('{}' -> '{}') ## {}".format(modname, html_id, html_id_clean, codeline)
-        logger.error(errmsg)
-        lint_errors.append(errmsg)
+    lint = config.lint and not skiplint
+    if lint and html_id != html_id_clean:
+        _htmlid_lint_error("HTML ID was not clean ('{}' -> '{}')".format(html_id, html_id_clean))
 
     # Check for duplicates
-    i = 1
-    html_id_base = html_id_clean
-    while html_id_clean in html_ids:
-        html_id_clean = '{}-{}'.format(html_id_base, i)
-        i += 1
-        if config.lint and not skiplint:
-            errmsg = "LINT: {}HTML ID was a duplicate ({}) ## {}".format(modname, html_id_clean, codeline)
-            logger.error(errmsg)
-            lint_errors.append(errmsg)
+    html_id_unique = html_ids.unique(html_id_clean)
+    if lint and html_id_unique != html_id_clean:
+        _htmlid_lint_error("HTML ID was a duplicate ({})".format(html_id_unique))
 
     # Remember and return
-    html_ids.append(html_id_clean)
-    return html_id_clean
+    html_ids.add(html_id_unique)
+    return html_id_unique
+
+def _htmlid_lint_error(msg):
+    """ Log a HTML ID lint error, saying which module code asked for the ID.
+    The call stack is only looked at here, as that's slow. """
+    modname = ''
+    codeline = ''
+    frame = inspect.currentframe()
+    while frame is not None:
+        fn = frame.f_code.co_filename
+        if 'multiqc/modules/' in fn and 'base_module.py' not in fn:
+            modname = '>{}< '.format(fn.split('multiqc/modules/',1)[-1])
+            codeline = linecache.getline(fn, frame.f_lineno).strip()
+            break
+        frame = frame.f_back
+    del frame
+    errmsg = "LINT: {}{} ## {}".format(modname, msg, codeline)
+    logger.error(errmsg)
+    lint_errors.append(errmsg)
 
 
 def compress_json(data):
-    """ Take a Python data object. Convert to JSON and compress using lzstring """
+    """ Take a Python data object. Convert to JSON and compress using
+    lzstring or zlib, depending on config.plot_data_compression.
+    zlib data is base64 encoded and prefixed with 'zlib:' so that the
+    report JavaScript can tell which one was used. """
+    if config.plot_data_compression == 'zlib':
+        # Compress the JSON as it is made, a few plot series at a time
+        compressor = zlib.compressobj()
+        compressed = list()
+        chunks = list()
+        chunks_size = 0
+        for chunk in json_stream.iterencode(data, depth=4):
+            chunks.append(chunk)
+            chunks_size += len(chunk)
+            if chunks_size > 1048576:
+                # JSON.parse() doesn't handle `NaN`, but it does handle `null`.
+                compressed.append(compressor.compress(''.join(chunks).replace('NaN', 'null').encode('utf-8')))
+                chunks = list()
+                chunks_size = 0
+        compressed.append(compressor.compress(''.join(chunks).replace('NaN', 'null').encode('utf-8')))
+        compressed.append(compressor.flush())
+        return 'zlib:' + base64.b64encode(b''.join(compressed)).decode('ascii')
     json_string = json.dumps(data).encode('utf-8', 'ignore').decode('utf-8')
     # JSON.parse() doesn't handle `NaN`, but it does handle `null`.
     json_string = json_string.replace('NaN', 'null');
+    if config.plot_data_compression != 'lzstring':
+        logger.warning("Unknown plot_data_compression '{}', using lzstring".format(config.plot_data_compression))
     x = lzstring.LZString()
     return x.compressToBase64(json_string)
+
+def compress_plot_chunks(data):
+    """ Compress the data for each plot on its own, so that the report
+    only needs to decompress a plot's data when it is shown.
+    Used when config.plot_data_lazy is set.
+    :param data: Dict of plot ID: plot data, as in report.plot_data
+    :return: List of (plot ID, compressed data) tuples
+    """
+    return [ (pid, compress_json(data[pid])) for pid in sorted(data) ]
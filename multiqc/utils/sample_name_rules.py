@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+""" Sample name cleaning and ignoring. The fn_clean_exts, fn_clean_trim,
+prepend_dirs and sample_names_ignore config options are turned in to a
+list of functions once, and the results for each name are remembered, as
+modules clean the same names many times. Call compile_rules() again if
+any of these config options are changed. """
+
+from __future__ import print_function
+import fnmatch
+import os
+import re
+
+from multiqc.utils import config
+logger = config.logger
+
+_rules = None
+
+
+def get_rules():
+    """ Return the compiled sample name rules, compiling them if needed """
+    if _rules is None:
+        compile_rules()
+    return _rules
+
+
+def compile_rules():
+    """ Compile the sample name rules from the current config """
+    global _rules
+    _rules = SampleNameRules()
+    return _rules
+
+
+class SampleNameRules(object):
+    """ Functions to clean and ignore sample names, made from the config """
+
+    def __init__(self):
+        self.prepend_dirs = config.prepend_dirs
+        self.prepend_dirs_sep = config.prepend_dirs_sep
+        self.prepend_dirs_depth = config.prepend_dirs_depth
+        self.steps = list()
+        if config.fn_clean_sample_names:
+            for ext in config.fn_clean_exts:
+                step = self._compile_ext(ext)
+                if step is not None:
+                    self.steps.append(step)
+            for chrs in config.fn_clean_trim:
+                self.steps.append(self._trim(chrs))
+        self.ignore_globs = None
+        if len(config.sample_names_ignore) > 0:
+            self.ignore_globs = re.compile('|'.join(
+                '(?:{})'.format(fnmatch.translate(os.path.normcase(sn))) for sn in config.sample_names_ignore
+            ))
+        self.ignore_res = [ re.compile(sn) for sn in config.sample_names_ignore_re ]
+        self.cleaned = dict()
+        self.ignored = dict()
+
+    @staticmethod
+    def _compile_ext(ext):
+        """ Return a function for one fn_clean_exts pattern """
+        if type(ext) is str:
+            ext = {'type': 'truncate', 'pattern': ext}
+        pattern = ext['pattern']
+        if ext['type'] == 'truncate':
+            # Split then take first section to remove everything after these matches
+            def truncate(s_name):
+                return os.path.basename(s_name.split(pattern, 1)[0])
+            return truncate
+        elif ext['type'] in ('remove', 'replace'):
+            if ext['type'] == 'replace':
+                logger.warning("use 'config.fn_clean_sample_names.remove' instead "
+                               "of 'config.fn_clean_sample_names.replace' [deprecated]")
+            def remove(s_name):
+                return s_name.replace(pattern, '')
+            return remove
+        elif ext['type'] == 'regex':
+            regex = re.compile(pattern)
+            def regex_remove(s_name):
+                return regex.sub('', s_name)
+            return regex_remove
+        elif ext['type'] == 'regex_keep':
+            regex = re.compile(pattern)
+            def regex_keep(s_name):
+                match = regex.search(s_name)
+                return match.group() if match else s_name
+            return regex_keep
+        logger.error('Unrecognised config.fn_clean_exts type: {}'.format(ext['type']))
+        return None
+
+    @staticmethod
+    def _trim(chrs):
+        """ Return a function to trim off characters at the ends of names """
+        def trim(s_name):
+            if s_name.endswith(chrs):
+                s_name = s_name[:-len(chrs)]
+            if s_name.startswith(chrs):
+                s_name = s_name[len(chrs):]
+            return s_name
+        return trim
+
+    def clean(self, s_name, root):
+        """ Clean a sample name, see BaseMultiqcModule.clean_s_name() """
+        if root is None:
+            root = ''
+        key = (s_name, root) if self.prepend_dirs else s_name
+        try:
+            return self.cleaned[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return self._clean(s_name, root) # Can't be remembered
+        self.cleaned[key] = self._clean(s_name, root)
+        return self.cleaned[key]
+
+    def _clean(self, s_name, root):
+        if self.prepend_dirs:
+            sep = self.prepend_dirs_sep
+            root = root.lstrip('.{}'.format(os.sep))
+            dirs = [d.strip() for d in root.split(os.sep) if d.strip() != '']
+            if self.prepend_dirs_depth != 0:
+                d_idx = self.prepend_dirs_depth * -1
+                if self.prepend_dirs_depth > 0:
+                    dirs = dirs[d_idx:]
+                else:
+                    dirs = dirs[:d_idx]
+            if len(dirs) > 0:
+                s_name = "{}{}{}".format(sep.join(dirs), sep, s_name)
+        for step in self.steps:
+            s_name = step(s_name)
+        # Remove trailing whitespace
+        return s_name.strip()
+
+    def is_ignored(self, s_name):
+        """ Check if a sample name matches sample_names_ignore or sample_names_ignore_re """
+        try:
+            return self.ignored[s_name]
+        except KeyError:
+            pass
+        ignored = (self.ignore_globs is not None and self.ignore_globs.match(os.path.normcase(s_name)) is not None) \
+            or any( regex.match(s_name) for regex in self.ignore_res )
+        self.ignored[s_name] = ignored
+        return ignored
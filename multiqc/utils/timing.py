@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+""" Record how long each part of a MultiQC run takes. Times for
+each phase of the run, each module and each plot are saved to
+multiqc_timings.json in the data directory if save_timings is set. """
+
+from __future__ import print_function
+import functools
+import inspect
+import io
+import json
+import os
+import sys
+import time
+try:
+    import resource
+except ImportError:
+    resource = None # Windows
+
+from multiqc.utils import config
+logger = config.logger
+
+# Recorded timings, in the order that they finished
+timings = list()
+
+# Name of the module that is running, used to label its plots
+current_module = None
+
+# Time spent by find_log_files() for each module, as [num files, seconds]
+module_files = dict()
+
+def process_peak_memory_mb():
+    """ Return the peak memory use of this process so far in MB, or None if unknown.
+    This is the highest memory use since the process started, not just during one phase. """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return maxrss / (1024.0 * 1024.0)
+    return maxrss / 1024.0
+
+def cpu_time():
+    """ Return the user + system CPU time used by this process so far """
+    t = os.times()
+    return t[0] + t[1]
+
+
+class timer(object):
+    """ Context manager to time a block of code and add it to timings.
+    Can also be used by calling start() and stop().
+    :param name: Name of the phase, module or plot
+    :param kind: One of 'phase', 'module' or 'plot'
+    :param extra: Additional values to save with the timing
+    """
+    def __init__(self, name, kind='phase', **extra):
+        self.record = {'name': name, 'type': kind}
+        self.record.update(extra)
+
+    def start(self):
+        global current_module
+        if self.record['type'] == 'module':
+            current_module = self.record['name']
+        self.start_wall = time.time()
+        self.start_cpu = cpu_time()
+        return self
+
+    def stop(self):
+        global current_module
+        self.record['wall_time'] = time.time() - self.start_wall
+        self.record['cpu_time'] = cpu_time() - self.start_cpu
+        self.record['process_peak_memory_mb'] = process_peak_memory_mb()
+        timings.append(self.record)
+        if self.record['type'] == 'module':
+            current_module = None
+
+    def __enter__(self):
+        self.start()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+
+def module_timer(name):
+    """ Time a module run, labelling any plots that it makes with its name """
+    return timer(name, 'module')
+
+def add_file_time(seconds):
+    """ Add time spent on a file by find_log_files() for the current module, including
+    the time taken by the module to read and parse it before asking for the next file """
+    t = module_files.setdefault(current_module, [0, 0.0])
+    t[0] += 1
+    t[1] += seconds
+
+def time_plot(plot_type):
+    """ Decorator to time a plot function. The plot ID is taken
+    from its pconfig argument after the plot has been made. """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(None, 'plot', plot_type=plot_type, module=current_module) as record:
+                result = func(*args, **kwargs)
+                try:
+                    pconfig = inspect.getcallargs(func, *args, **kwargs).get('pconfig')
+                    record['name'] = pconfig.get('id') if isinstance(pconfig, dict) else None
+                except (TypeError, ValueError):
+                    pass
+            return result
+        return wrapper
+    return decorator
+
+def get_timings():
+    """ Return all timings, grouped by type and rounded """
+    results = {'phases': list(), 'modules': list(), 'plots': list()}
+    for t in timings:
+        t = dict(t)
+        for k in ['wall_time', 'cpu_time', 'process_peak_memory_mb']:
+            if t.get(k) is not None:
+                t[k] = round(t[k], 4)
+        if t['type'] == 'module' and t['name'] in module_files:
+            t['num_files'] = module_files[t['name']][0]
+            t['file_time'] = round(module_files[t['name']][1], 4)
+        results[t.pop('type') + 's'].append(t)
+    return results
+
+def write_timings(data_dir):
+    """ Save timings to multiqc_timings.json in the data directory """
+    fn = os.path.join(data_dir, 'multiqc_timings.json')
+    try:
+        with io.open(fn, 'w', encoding='utf-8') as f:
+            jsonstr = json.dumps(get_timings(), indent=4, sort_keys=True, ensure_ascii=False)
+            print(jsonstr.encode('utf-8', 'ignore').decode('utf-8'), file=f)
+    except (IOError, OSError) as e:
+        logger.warning("Could not save run timings: {}".format(e))
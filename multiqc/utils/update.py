@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+""" Incremental reports with --update-from. Loads the data saved by a
+previous run (multiqc_data.json), so that modules can reuse the samples
+they parsed last time and only read files that are new or have changed since. """
+
+from __future__ import print_function
+from collections import OrderedDict
+import io
+import json
+import os
+
+from multiqc.utils import config
+logger = config.logger
+
+# Previous run being updated, set by load()
+previous = None
+
+
+class PreviousRun(object):
+    """ Parsed data and data sources saved by a previous run """
+
+    def __init__(self, path):
+        """ Load multiqc_data.json from a previous run
+        :param path: multiqc_data directory, or the multiqc_data.json file in it
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, 'multiqc_data.json')
+        self.path = path
+        # Files changed after this was written are read again
+        self.mtime = os.path.getmtime(path)
+        with io.open(path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh, object_pairs_hook=OrderedDict)
+        # Only keep what modules need, the plot data can be big
+        self.saved_raw_data = data.get('report_saved_raw_data') or dict()
+        self.data_sources = data.get('report_data_sources') or dict()
+
+    def samples_by_source(self, module, section, fn):
+        """ Return the samples saved with write_data_file() as fn, grouped by
+        the file that they came from
+        :param module: Module name, as used for data sources
+        :param section: Data source section, as given to add_data_source()
+        :param fn: Data file name given to write_data_file()
+        :return: Dict of file path: list of (sample name, data)
+        """
+        data = self.saved_raw_data.get(fn)
+        sources = self.data_sources.get(module, dict()).get(section, dict())
+        by_source = dict()
+        if isinstance(data, dict):
+            for s_name, d in data.items():
+                if isinstance(d, dict) and s_name in sources:
+                    by_source.setdefault(sources[s_name], list()).append((s_name, d))
+        return by_source
+
+    def is_unchanged(self, path):
+        """ Check if a file hasn't been changed since the previous run
+        :param path: Path to the file
+        """
+        try:
+            return os.path.getmtime(path) <= self.mtime
+        except (IOError, OSError):
+            return False
+
+
+def load(path):
+    """ Load the previous run to update
+    :param path: multiqc_data directory, or the multiqc_data.json file in it
+    """
+    global previous
+    previous = PreviousRun(path)
+    # Count the samples in the General Statistics table, as modules have their own sample names
+    general_stats = previous.saved_raw_data.get('multiqc_general_stats')
+    if isinstance(general_stats, dict):
+        logger.info("Updating    : {} ({} samples)".format(os.path.relpath(previous.path), len(general_stats)))
+    else:
+        logger.info("Updating    : {}".format(os.path.relpath(previous.path)))
@@ -12,6 +12,7 @@ import shutil
 import sys
 
 from multiqc import config
+from multiqc.utils import general_stats, json_stream
 
 def robust_rmtree(path, logger=None, max_retries=10):
     """Robustly tries to delete paths.
@@ -41,7 +42,7 @@ def write_data_file(data, fn, sort_cols=False, data_format=None):
     """ Write a data file to the report directory. Will not do anything
     if config.data_dir is not set.
     :param: data - a 2D dict, first key sample name (row header),
-            second key field (column header).
+            second key field (column header). Can also be a general_stats.Section.
     :param: fn - Desired filename. Directory will be prepended automatically.
     :param: sort_cols - Sort columns alphabetically
     :param: data_format - Output format. Defaults to config.data_format (usually tsv)
@@ -67,18 +68,25 @@ def write_data_file(data, fn, sort_cols=False, data_format=None):
         # Save file
         with io.open (os.path.join(config.data_dir, fn), 'w', encoding='utf-8') as f:
             if data_format == 'json':
-                jsonstr = json.dumps(data, indent=4, cls=MQCJSONEncoder, ensure_ascii=False)
-                print( jsonstr.encode('utf-8', 'ignore').decode('utf-8'), file=f)
+                for chunk in json_stream.iterencode(data, indent=4, cls=MQCJSONEncoder, ensure_ascii=False):
+                    f.write(chunk.encode('utf-8', 'ignore').decode('utf-8'))
+                f.write(u'\n')
             elif data_format == 'yaml':
                 yaml.dump(data, f, default_flow_style=False)
+            elif isinstance(data, general_stats.Section):
+                # Table data - read the values straight from the columns
+                body = '\n'.join(section_tsv_rows(data, sort_cols))
+                print( body.encode('utf-8', 'ignore').decode('utf-8'), file=f)
             else:
                 # Default - tab separated output
                 # Get all headers
                 h = ['Sample']
+                h_seen = set(h)
                 for sn in sorted(data.keys()):
                     for k in data[sn].keys():
-                        if type(data[sn][k]) is not dict and k not in h:
+                        if type(data[sn][k]) is not dict and k not in h_seen:
                             h.append(str(k))
+                            h_seen.add(str(k))
                 if sort_cols:
                     h = sorted(h)
 
@@ -92,3 +100,36 @@ def write_data_file(data, fn, sort_cols=False, data_format=None):
                 body = '\n'.join(rows)
 
                 print( body.encode('utf-8', 'ignore').decode('utf-8'), file=f)
+
+
+def section_tsv_rows(section, sort_cols=False):
+    """ Make tab separated rows for a general_stats.Section, in
+    the same layout that write_data_file() gives for a 2D dict.
+    :param: section - general_stats.Section with the data
+    :param: sort_cols - Sort columns alphabetically
+    :return: List of lines, starting with the header """
+    def has_value(col, row):
+        return row < len(col.present) and col.present[row] == 1
+    s_names = sorted(section.keys())
+    s_rows = [ section.row_numbers[section.index.numbers[sn]] for sn in s_names ]
+
+    # Columns are in the order that they are first found, going through the sorted samples
+    h = ['Sample']
+    remaining = list(section.columns.items())
+    for row in s_rows:
+        if len(remaining) == 0:
+            break
+        found = [ (k, col) for k, col in remaining if has_value(col, row) and type(col.values[row]) is not dict ]
+        if len(found) > 0:
+            h.extend([ k for k, col in found ])
+            found_keys = set(k for k, col in found)
+            remaining = [ (k, col) for k, col in remaining if k not in found_keys ]
+    if sort_cols:
+        h = sorted(h)
+    h_cols = [ section.columns[k] for k in h if k != 'Sample' ]
+
+    rows = [ "\t".join(h) ]
+    for sn, row in zip(s_names, s_rows):
+        l = [str(sn)] + [ str(col.values[row]) if has_value(col, row) else '' for col in h_cols ]
+        rows.append( "\t".join(l) )
+    return rows
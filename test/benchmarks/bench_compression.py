@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+""" Benchmark for compressing the plot data embedded in MultiQC reports.
+
+Builds synthetic report.plot_data for a number of samples (line graphs
+and bar graphs like those made by FastQC and Picard), then compresses it
+with report.compress_json() using each of the plot_data_compression
+backends in separate processes. Reports the time taken, the increase in
+peak memory and the size of the compressed string, and checks that the
+zlib data decompresses back to the same plot data.
+
+Usage: python test/benchmarks/bench_compression.py [num_samples]
+"""
+
+from __future__ import print_function
+import argparse
+import base64
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+import zlib
+
+def make_plot_data(num_samples, seed=1):
+    """ Return synthetic plot data in the same structure as report.plot_data """
+    rand = random.Random(seed)
+    s_names = ['sample_{:05d}'.format(i) for i in range(num_samples)]
+    plot_data = dict()
+    # Line graphs, one series per sample
+    for pid, num_points in [('per_base_quality', 151), ('gc_content', 101), ('coverage_histogram', 200), ('insert_size', 500)]:
+        series = list()
+        for s_name in s_names:
+            series.append({'name': s_name, 'data': [[x, round(rand.random() * 100, 4)] for x in range(num_points)]})
+        plot_data['mqc_{}_plot'.format(pid)] = {'plot_type': 'xy_line', 'datasets': [series], 'config': {'id': pid, 'title': pid}}
+    # Bar graphs, one category per series
+    for pid, num_cats in [('alignment_stats', 4), ('featurecounts', 11)]:
+        series = list()
+        for c in range(num_cats):
+            series.append({'name': 'category_{}'.format(c), 'data': [rand.randint(0, 10000000) for s in s_names]})
+        plot_data['mqc_{}_plot'.format(pid)] = {'plot_type': 'bar_graph', 'samples': [s_names], 'datasets': [series], 'config': {'id': pid, 'title': pid}}
+    return plot_data
+
+def compress(backend, num_samples):
+    """ Compress synthetic plot data with a backend, returning timings and size """
+    from multiqc.utils import config, report
+    config.plot_data_compression = backend
+    plot_data = make_plot_data(num_samples)
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    compressed = report.compress_json(plot_data)
+    seconds = time.time() - start
+    rss_increase = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start) / 1024.0
+    json_size = len(json.dumps(plot_data))
+    ok = True
+    if backend == 'zlib':
+        ok = json.loads(zlib.decompress(base64.b64decode(compressed[5:])).decode('utf-8')) == plot_data
+    return {
+        'seconds': seconds,
+        'rss_increase_mb': rss_increase,
+        'json_size': json_size,
+        'size': len(compressed),
+        'ok': ok
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_samples', nargs='?', type=int, default=1000)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(compress(args.child, args.num_samples)))
+        return 0
+
+    for backend in ['lzstring', 'zlib']:
+        # Run each backend in a new process so that peak memory use is separate
+        out = subprocess.check_output([sys.executable, __file__, '--child', backend, str(args.num_samples)])
+        r = json.loads(out.decode('utf-8'))
+        print('{:>10}: {:.2f}s, peak memory +{:.1f}MB, {:.1f}MB of JSON compressed to {:.1f}MB'.format(
+            backend, r['seconds'], r['rss_increase_mb'], r['json_size'] / 1048576.0, r['size'] / 1048576.0))
+        if not r['ok']:
+            print('ERROR: {} data does not decompress to the original plot data!'.format(backend))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
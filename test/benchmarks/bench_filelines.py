@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+""" Benchmark for reading log files line by line in MultiQC modules.
+
+Writes synthetic samtools stats files, then parses the summary numbers
+from them in separate processes, either from slurped file contents
+(find_log_files() default) or by streaming lines and stopping after the
+SN block (find_log_files(filelines=True)). Reports the time taken and
+the increase in peak memory, and checks that both give identical results.
+
+Usage: python test/benchmarks/bench_filelines.py [num_files] [file_size_mb]
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+def make_stats_file(fn, size_mb, seed):
+    """ Write a samtools stats file padded out with per-cycle and coverage sections """
+    rand = random.Random(seed)
+    with open(fn, 'w') as fh:
+        fh.write('# This file was produced by samtools stats (1.6+htslib-1.6) and can be plotted using plot-bamstats\n')
+        fh.write('# CHK, Checksum\t[2]Read Names\t[3]Sequences\t[4]Qualities\n')
+        fh.write('CHK\t4a0f3ec8\t1bdd5b8e\t6f7f6c2d\n')
+        fh.write('# Summary Numbers. Use `grep ^SN | cut -f 2-` to extract this part.\n')
+        for field in ['raw total sequences', 'filtered sequences', 'sequences', 'reads mapped',
+                      'reads mapped and paired', 'reads unmapped', 'reads properly paired', 'reads paired',
+                      'reads duplicated', 'reads MQ0', 'reads QC failed', 'non-primary alignments',
+                      'total length', 'bases mapped', 'bases mapped (cigar)', 'mismatches', 'error rate',
+                      'average length', 'maximum length', 'average quality', 'insert size average']:
+            fh.write('SN\t{}:\t{}\n'.format(field, rand.randint(0, 10000000)))
+        fh.write('# First Fragment Qualitites. Use `grep ^FFQ | cut -f 2-` to extract this part.\n')
+        target = size_mb * 1024 * 1024
+        written = 0
+        cycle = 0
+        while written < target:
+            cycle += 1
+            line = 'COV\t[{0}-{0}]\t{0}\t{1}\n'.format(cycle, rand.randint(0, 100000))
+            fh.write(line)
+            written += len(line)
+
+def parse(mode, analysis_dir):
+    """ Parse summary numbers from all files and return them with the peak memory increase """
+    from multiqc.utils import report
+    from multiqc.modules.base_module import BaseMultiqcModule
+    report.files['samtools/stats'] = [{'fn': fn, 'root': analysis_dir} for fn in sorted(os.listdir(analysis_dir))]
+    mod = BaseMultiqcModule(name='Samtools', anchor='samtools')
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    data = dict()
+    if mode == 'contents':
+        for f in mod.find_log_files('samtools/stats'):
+            parsed_data = dict()
+            for line in f['f'].splitlines():
+                if not line.startswith("SN"):
+                    continue
+                sections = line.split("\t")
+                parsed_data[sections[1].strip()[:-1].replace(' ', '_')] = float(sections[2].strip())
+            data[f['s_name']] = parsed_data
+    else:
+        for f in mod.find_log_files('samtools/stats', filelines=True):
+            parsed_data = dict()
+            for line in f['f']:
+                if not line.startswith("SN"):
+                    if len(parsed_data) > 0 and not line.startswith("#"):
+                        break
+                    continue
+                sections = line.split("\t")
+                parsed_data[sections[1].strip()[:-1].replace(' ', '_')] = float(sections[2].strip())
+            data[f['s_name']] = parsed_data
+    return {
+        'seconds': time.time() - start,
+        'rss_increase_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start) / 1024.0,
+        'data': data
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_files', nargs='?', type=int, default=20)
+    parser.add_argument('file_size_mb', nargs='?', type=int, default=9)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(parse(*args.child)))
+        return 0
+
+    num_files, file_size_mb = args.num_files, args.file_size_mb
+    base = tempfile.mkdtemp()
+    try:
+        for i in range(num_files):
+            make_stats_file(os.path.join(base, 'sample_{}.stats'.format(i)), file_size_mb, i)
+        results = dict()
+        for mode in ['contents', 'filelines']:
+            # Run each mode in a new process so that peak memory use is separate
+            out = subprocess.check_output([sys.executable, __file__, '--child', mode, base])
+            results[mode] = json.loads(out.decode('utf-8'))
+            print('{:>10}: {:.2f}s, peak memory +{:.1f}MB'.format(mode, results[mode]['seconds'], results[mode]['rss_increase_mb']))
+        if results['contents']['data'] != results['filelines']['data']:
+            print('ERROR: parsed data differs!')
+            return 1
+        print('Results identical: {} files of {}MB'.format(num_files, file_size_mb))
+    finally:
+        shutil.rmtree(base)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
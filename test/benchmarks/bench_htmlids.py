@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+""" Benchmark for saving HTML IDs with report.save_htmlid().
+
+Saves a mix of synthetic HTML IDs: unique table column IDs, IDs that need
+cleaning, and IDs that are used many times over (as when a module makes a
+plot or table for every sample with the same ID), which get '-N' suffixes.
+Reports how long it took and a checksum of the returned IDs.
+
+Give the path to another copy of MultiQC (eg. a git worktree of an older
+commit) with --reference to save the same IDs with that code too and check
+that the returned IDs are exactly the same. Use --lint to time it with
+config.lint set (lint messages aren't printed).
+
+Usage: python test/benchmarks/bench_htmlids.py [--reference DIR] [--lint] [num_ids]
+"""
+
+from __future__ import print_function
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+def make_ids(num_ids, seed=1):
+    """ Return a list of synthetic HTML IDs """
+    rand = random.Random(seed)
+    ids = list()
+    for i in range(num_ids):
+        r = rand.random()
+        if r < 0.6:
+            ids.append('mqc-generalstats-module_{}-column_{}'.format(i % 50, i))
+        elif r < 0.7:
+            ids.append(' 1_Sample {}: plot (#{})__'.format(i, i % 7))
+        else:
+            ids.append('module_{}_plot'.format(rand.randint(0, 20)))
+    return ids
+
+def build(num_ids, lint):
+    """ Save the IDs, returning the time taken and a checksum of the saved IDs """
+    from multiqc.utils import config, report
+    config.lint = lint
+    ids = make_ids(num_ids)
+    start = time.time()
+    saved = [report.save_htmlid(html_id) for html_id in ids]
+    seconds = time.time() - start
+    return {'seconds': seconds, 'num_unique': len(set(saved)), 'md5': hashlib.md5('\n'.join(saved).encode('utf-8')).hexdigest()}
+
+def run(code_dir, num_ids, lint):
+    """ Save the IDs in a new process using the MultiQC code in code_dir """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.abspath(code_dir)] + [p for p in [env.get('PYTHONPATH')] if p])
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', str(num_ids)] + (['--lint'] if lint else [])
+    out = subprocess.check_output(cmd, env=env, cwd=os.path.abspath(code_dir))
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_ids', nargs='?', type=int, default=100000)
+    parser.add_argument('--reference', help='Another copy of MultiQC to compare the IDs with')
+    parser.add_argument('--lint', action='store_true', help='Set config.lint')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Lint errors are logged for every duplicate ID
+        logging.getLogger('multiqc').setLevel(logging.CRITICAL)
+        print(json.dumps(build(args.num_ids, args.lint)))
+        return 0
+
+    print('Saving {} HTML IDs{}'.format(args.num_ids, ' with lint' if args.lint else ''))
+    results = [('this copy', run(package_dir, args.num_ids, args.lint))]
+    if args.reference:
+        results.append(('reference', run(args.reference, args.num_ids, args.lint)))
+    for name, r in results:
+        print('{:>10}: {:.2f}s, {} unique IDs, md5 {}'.format(name, r['seconds'], r['num_unique'], r['md5']))
+    if args.reference:
+        if results[0][1]['md5'] != results[1][1]['md5']:
+            print('ERROR: HTML IDs are different to the reference!')
+            return 1
+        print('HTML IDs are identical')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+""" End-to-end benchmark for MultiQC reports at different cohort sizes.
+
+Writes synthetic FastQC, Qualimap BamQC, Picard, samtools stats,
+featureCounts and custom content logs (see synthetic.py) for each
+number of samples, runs MultiQC on them in a separate process and reads
+the run timings that it saves in multiqc_timings.json. Times and peak
+memory are reported for each stage of the run:
+
+    discovery - searching for log files
+    parsing   - running modules, minus the time spent making plots
+    plotting  - making plots and the General Statistics table
+    rendering - compressing plot data, exporting data files and writing the report
+
+Results can be saved as a baseline and later runs compared against it,
+to catch performance regressions locally. Nothing needs network access.
+
+Usage: python test/benchmarks/bench_report.py [options] [num_samples ...]
+
+    python test/benchmarks/bench_report.py --baseline baseline.json 10 1000
+    python test/benchmarks/bench_report.py --baseline baseline.json 10 1000 10000
+
+The baseline file is written if it doesn't exist yet (or with
+--update-baseline), otherwise results are compared against it and the
+script exits with an error if any stage is slower or uses more memory
+than the baseline by more than --tolerance.
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+multiqc_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'multiqc')
+
+# Only run the modules that there are synthetic logs for
+modules = ['custom_content', 'fastqc', 'qualimap', 'picard', 'samtools', 'featureCounts']
+
+stages = ['discovery', 'parsing', 'plotting', 'rendering', 'total']
+
+# Timings below this many seconds are too short to compare reliably
+min_seconds = 0.1
+
+def get_cohort(fixtures_dir, num_samples):
+    """ Return the directory of synthetic logs for num_samples samples, writing them if needed """
+    cohort_dir = os.path.join(fixtures_dir, 'samples_{}'.format(num_samples))
+    done_fn = os.path.join(cohort_dir, '.complete')
+    if not os.path.exists(done_fn):
+        if os.path.isdir(cohort_dir):
+            shutil.rmtree(cohort_dir)
+        start = time.time()
+        synthetic.make_cohort(cohort_dir, num_samples)
+        open(done_fn, 'w').close()
+        print('Wrote synthetic logs for {} samples in {:.1f}s'.format(num_samples, time.time() - start))
+    return cohort_dir
+
+def run_multiqc(cohort_dir, extra_args):
+    """ Run MultiQC on a cohort and return its saved timings """
+    out_dir = tempfile.mkdtemp()
+    try:
+        cmd = [sys.executable, multiqc_script, cohort_dir, '-o', out_dir, '-f', '-q', '--no-search-cache',
+               '--cl_config', 'no_version_check: true', '--cl_config', 'parse_cache: false', '--cl_config', 'save_timings: true']
+        for m in modules:
+            cmd.extend(['-m', m])
+        cmd.extend(extra_args)
+        subprocess.check_call(cmd)
+        with open(os.path.join(out_dir, 'multiqc_data', 'multiqc_timings.json')) as fh:
+            return json.load(fh)
+    finally:
+        shutil.rmtree(out_dir)
+
+def summarise(timings):
+    """ Group MultiQC run timings into benchmark stages.
+    Returns a dict of stage: {'seconds', 'peak_memory_mb'} """
+    phases = dict((p['name'], p) for p in timings['phases'])
+    plot_time = sum(p['wall_time'] for p in timings['plots'])
+    module_time = sum(m['wall_time'] for m in timings['modules'])
+    def peak(*names):
+        mem = [phases[n]['process_peak_memory_mb'] for n in names if phases.get(n, {}).get('process_peak_memory_mb') is not None]
+        return max(mem) if len(mem) > 0 else None
+    def wall(*names):
+        return sum(phases[n]['wall_time'] for n in names if n in phases)
+    return {
+        'discovery': {'seconds': wall('file_search'), 'peak_memory_mb': peak('file_search')},
+        'parsing': {'seconds': module_time - plot_time, 'peak_memory_mb': peak('modules')},
+        'plotting': {'seconds': plot_time + wall('general_stats'), 'peak_memory_mb': peak('modules', 'general_stats')},
+        'rendering': {'seconds': wall('compress_plot_data', 'data_export', 'template'),
+                      'peak_memory_mb': peak('compress_plot_data', 'data_export', 'template')},
+        'total': {'seconds': wall('total'), 'peak_memory_mb': peak('total')},
+    }
+
+def benchmark(cohort_dir, repeats, extra_args):
+    """ Run MultiQC repeats times, keeping the fastest time and lowest memory for each stage """
+    best = None
+    for i in range(repeats):
+        result = summarise(run_multiqc(cohort_dir, extra_args))
+        if best is None:
+            best = result
+            continue
+        for stage in stages:
+            for k in ['seconds', 'peak_memory_mb']:
+                if result[stage][k] is not None and best[stage][k] is not None:
+                    best[stage][k] = min(best[stage][k], result[stage][k])
+    for stage in stages:
+        best[stage] = dict((k, round(v, 3) if v is not None else None) for k, v in best[stage].items())
+    return best
+
+def compare(results, baseline, tolerance):
+    """ Print results alongside the baseline. Returns a list of regressions. """
+    regressions = list()
+    print('{:>8}  {:<10} {:>10} {:>10} {:>8}   {:>10} {:>10} {:>8}'.format(
+        'samples', 'stage', 'seconds', 'baseline', 'change', 'peak MB', 'baseline', 'change'))
+    for num_samples in sorted(results, key=int):
+        for stage in stages:
+            r = results[num_samples][stage]
+            b = baseline.get(num_samples, {}).get(stage, {})
+            cols = ['{:>8}'.format(num_samples), '{:<10}'.format(stage)]
+            for k, fmt in [('seconds', '{:.3f}'), ('peak_memory_mb', '{:.1f}')]:
+                cols.append('{:>10}'.format(fmt.format(r[k]) if r[k] is not None else '-'))
+                if r[k] is None or b.get(k) is None:
+                    cols.append('{:>10} {:>8}'.format('-', ''))
+                    continue
+                change = (r[k] - b[k]) / b[k] if b[k] > 0 else 0
+                cols.append('{:>10} {:>+7.0%}'.format(fmt.format(b[k]), change))
+                if change > tolerance and (k != 'seconds' or r[k] >= min_seconds):
+                    regressions.append('{} samples, {} {}: {} vs {} baseline'.format(
+                        num_samples, stage, k, fmt.format(r[k]), fmt.format(b[k])))
+            print(' '.join(cols))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_samples', nargs='*', type=int, default=[10, 1000],
+        help='Cohort sizes to benchmark (default: 10 1000)')
+    parser.add_argument('--baseline', help='JSON file of baseline results to compare against or create')
+    parser.add_argument('--update-baseline', action='store_true', help='Overwrite baseline results for these cohort sizes')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed fractional increase over baseline (default: 0.2)')
+    parser.add_argument('--repeats', type=int, default=1, help='Run MultiQC this many times and keep the best result')
+    parser.add_argument('--fixtures', help='Directory to keep synthetic logs in between runs (default: temporary)')
+    parser.add_argument('--multiqc-args', default='', help='Extra command line arguments for MultiQC, eg. "--parallel-modules 4"')
+    args = parser.parse_args()
+
+    fixtures_dir = args.fixtures or tempfile.mkdtemp()
+    try:
+        results = dict()
+        for num_samples in args.num_samples:
+            cohort_dir = get_cohort(fixtures_dir, num_samples)
+            results[str(num_samples)] = benchmark(cohort_dir, args.repeats, args.multiqc_args.split())
+    finally:
+        if args.fixtures is None:
+            shutil.rmtree(fixtures_dir)
+
+    baseline = dict()
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh).get('results', dict())
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.baseline and (args.update_baseline or not os.path.exists(args.baseline)):
+        baseline.update(results)
+        with open(args.baseline, 'w') as fh:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': baseline
+            }, fh, indent=4, sort_keys=True)
+        print('Saved baseline results to {}'.format(args.baseline))
+    elif len(regressions) > 0:
+        print('\nRegressions against {} (tolerance {:.0%}):'.format(args.baseline, args.tolerance))
+        for r in regressions:
+            print('  {}'.format(r))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+""" Benchmark for MultiQC file discovery.
+
+Builds a synthetic directory tree with files matching the built-in search
+patterns plus non-matching noise, then classifies it with both the original
+one-pattern-at-a-time search (report.search_file) and the single-pass
+scanner (report.scan_file). Checks that both give identical results.
+
+Usage: python test/benchmarks/bench_search.py [num_files]
+"""
+
+from __future__ import print_function
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from multiqc.utils import config, report
+
+def make_tree(base, num_files, seed=1):
+    """ Write a synthetic analysis directory. Returns number of files written. """
+    rand = random.Random(seed)
+    patterns = list()
+    for key, sps in config.sp.items():
+        for sp in (sps if isinstance(sps, list) else [sps]):
+            patterns.append((key, sp))
+    noise_lines = ['{}\t{}\t{}\n'.format(i, i*3, 'x'*rand.randint(5, 80)) for i in range(2000)]
+    for i in range(num_files):
+        d = os.path.join(base, 'sample_{}'.format(i % 500))
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        kind = rand.random()
+        if kind < 0.4:
+            # File that should match one of the search patterns
+            key, sp = rand.choice(patterns)
+            fn = sp.get('fn', 'log_{}.txt').replace('*', 's{}'.format(i)).replace('?', 'x')
+            body = rand.sample(noise_lines, rand.randint(0, 50))
+            if 'contents' in sp:
+                body.insert(rand.randint(0, max(0, sp.get('num_lines', 5) - 1)), sp['contents'] + '\n')
+            with open(os.path.join(d, fn.format(i)), 'w') as fh:
+                fh.write(''.join(body))
+        elif kind < 0.9:
+            # Large non-matching text log
+            with open(os.path.join(d, 'noise_{}.log'.format(i)), 'w') as fh:
+                fh.write(''.join(rand.sample(noise_lines, rand.randint(50, 2000))))
+        else:
+            # Binary junk that fails UTF-8 decoding part way through
+            with open(os.path.join(d, 'binary_{}.dat'.format(i)), 'wb') as fh:
+                fh.write(b'header line\r\n' * rand.randint(0, 2000) + bytes(bytearray(rand.randint(0, 255) for _ in range(512))))
+    return num_files
+
+def file_dict(fn, root):
+    """ Same pre-checks as the add_file() function in report.get_filelist() """
+    f = {'fn': fn, 'root': root}
+    if not os.path.isfile(os.path.join(root, fn)):
+        return None
+    f['filesize'] = os.path.getsize(os.path.join(root, fn))
+    if f['filesize'] > config.log_filesize_limit:
+        return None
+    return f
+
+def classify_legacy(searchfiles, spatterns):
+    files = {k: list() for patterns in spatterns for k in patterns}
+    for fn, root in searchfiles:
+        f = file_dict(fn, root)
+        if f is None:
+            continue
+        def add_file():
+            for patterns in spatterns:
+                for key, sps in patterns.items():
+                    for sp in sps:
+                        if report.search_file(sp, f):
+                            if not report.exclude_file(sp, f):
+                                files[key].append(f)
+                            if not sp.get('shared', False):
+                                return
+                            else:
+                                break
+        add_file()
+    return files
+
+def classify_single_pass(searchfiles, spatterns):
+    files = {k: list() for patterns in spatterns for k in patterns}
+    search_patterns = report.compile_search_patterns(spatterns)
+    for fn, root in searchfiles:
+        f = file_dict(fn, root)
+        if f is None:
+            continue
+        for key in report.scan_file(f, search_patterns):
+            files[key].append(f)
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_files', nargs='?', type=int, default=5000)
+    args = parser.parse_args()
+
+    num_files = args.num_files
+    base = tempfile.mkdtemp()
+    try:
+        make_tree(base, num_files)
+        searchfiles = [[fn, root] for root, dirs, fns in os.walk(base) for fn in fns]
+        spatterns = report.prep_search_patterns(list(config.avail_modules.keys()))
+
+        results = {}
+        for name, func in [('legacy', classify_legacy), ('single-pass', classify_single_pass)]:
+            start = time.time()
+            results[name] = func(searchfiles, spatterns)
+            print('{:>12}: {:.2f}s'.format(name, time.time() - start))
+
+        simplify = lambda r: {k: sorted(os.path.join(f['root'], f['fn']) for f in v) for k, v in r.items()}
+        if simplify(results['legacy']) != simplify(results['single-pass']):
+            print('ERROR: search results differ!')
+            return 1
+        num_found = sum(len(v) for v in results['legacy'].values())
+        print('Results identical: {} files searched, {} matches'.format(len(searchfiles), num_found))
+    finally:
+        shutil.rmtree(base)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+""" Benchmark for building the HTML of MultiQC tables.
+
+Makes a synthetic General Statistics style table, with numeric columns,
+colour scales, PASS / WARN / FAIL text columns and column-specific
+conditional formatting rules, and times table.plot() on it. Reports how
+long it took and a checksum of the HTML.
+
+Give the path to another copy of MultiQC (eg. a git worktree of an older
+commit) with --reference to build the same table with that code too and
+check that the HTML is exactly the same.
+
+Usage: python test/benchmarks/bench_table.py [--reference DIR] [num_samples] [num_columns]
+"""
+
+from __future__ import print_function
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+def make_table_data(num_samples, num_columns, seed=1):
+    """ Return synthetic data, headers and conditional formatting rules for a table """
+    rand = random.Random(seed)
+    data = dict()
+    headers = dict()
+    rules = dict()
+    for c in range(num_columns):
+        cid = 'column_{}'.format(c)
+        if c % 5 == 4:
+            headers[cid] = {'title': 'Status {}'.format(c), 'scale': False}
+        else:
+            headers[cid] = {'title': 'Column {}'.format(c), 'format': '{:,.2f}', 'suffix': '%' if c % 3 == 0 else '',
+                            'scale': ['RdYlGn', 'Blues', 'OrRd-rev'][c % 3], 'hidden': c % 7 == 6}
+            rules[cid] = {'warn': [{'lt': 25}], 'fail': [{'lt': 10}, {'s_eq': 'NA'}], 'pass': [{'gt': 75}]}
+    for s in range(num_samples):
+        s_name = 'sample_{:05d}'.format(s)
+        data[s_name] = dict()
+        for c in range(num_columns):
+            cid = 'column_{}'.format(c)
+            # Leave some cells empty
+            if rand.random() < 0.05:
+                continue
+            if c % 5 == 4:
+                data[s_name][cid] = rand.choice(['PASS', 'warn', 'Fail', 'unknown', 'n/a'])
+            elif rand.random() < 0.02:
+                data[s_name][cid] = 'NA'
+            else:
+                data[s_name][cid] = rand.random() * 100
+    return data, headers, rules
+
+def build(num_samples, num_columns):
+    """ Build the table HTML, returning the time taken and a checksum of the HTML """
+    from multiqc.utils import config
+    from multiqc.plots import table
+    data, headers, rules = make_table_data(num_samples, num_columns)
+    config.table_cond_formatting_rules.update(rules)
+    pconfig = {'id': 'bench_table', 'table_title': 'Benchmark', 'no_beeswarm': True}
+    start = time.time()
+    html = table.plot(data, headers, pconfig)
+    seconds = time.time() - start
+    return {'seconds': seconds, 'size': len(html), 'md5': hashlib.md5(html.encode('utf-8')).hexdigest()}
+
+def run(code_dir, num_samples, num_columns):
+    """ Build the table in a new process using the MultiQC code in code_dir """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.abspath(code_dir)] + [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', str(num_samples), str(num_columns)],
+        env=env, cwd=os.path.abspath(code_dir))
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('num_samples', nargs='?', type=int, default=450)
+    parser.add_argument('num_columns', nargs='?', type=int, default=30)
+    parser.add_argument('--reference', help='Another copy of MultiQC to compare the HTML with')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Values that can't be compared with the rules are logged for every cell
+        logging.getLogger('multiqc').setLevel(logging.ERROR)
+        print(json.dumps(build(args.num_samples, args.num_columns)))
+        return 0
+
+    print('Table with {} samples and {} columns'.format(args.num_samples, args.num_columns))
+    results = [('this copy', run(package_dir, args.num_samples, args.num_columns))]
+    if args.reference:
+        results.append(('reference', run(args.reference, args.num_samples, args.num_columns)))
+    for name, r in results:
+        print('{:>10}: {:.2f}s, {:.1f}MB of HTML, md5 {}'.format(name, r['seconds'], r['size'] / 1048576.0, r['md5']))
+    if args.reference:
+        if results[0][1]['md5'] != results[1][1]['md5']:
+            print('ERROR: table HTML is different to the reference!')
+            return 1
+        print('Table HTML is identical')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+
+""" Synthetic log files for MultiQC benchmarks.
+
+Writes realistic-looking output for FastQC, Qualimap BamQC, Picard,
+samtools stats, featureCounts and custom content for any number of
+samples. Values are random but seeded, so the same cohort is written
+every time for a given number of samples.
+
+Usage: python test/benchmarks/synthetic.py <output_dir> <num_samples>
+"""
+
+from __future__ import print_function
+import argparse
+import io
+import os
+import random
+import sys
+import zipfile
+
+def fastqc_text(s_name, rand):
+    """ Return the contents of a FastQC fastqc_data.txt file """
+    l = ['##FastQC\t0.11.5']
+    l.append('>>Basic Statistics\tpass')
+    l.append('#Measure\tValue')
+    l.append('Filename\t{}.fastq.gz'.format(s_name))
+    l.append('File type\tConventional base calls')
+    l.append('Encoding\tSanger / Illumina 1.9')
+    l.append('Total Sequences\t{}'.format(rand.randint(100000, 10000000)))
+    l.append('Sequences flagged as poor quality\t0')
+    l.append('Sequence length\t35-151')
+    l.append('%GC\t{}'.format(rand.randint(38, 52)))
+    l.append('>>END_MODULE')
+    l.append('>>Per base sequence quality\tpass')
+    l.append('#Base\tMean\tMedian\tLower Quartile\tUpper Quartile\t10th Percentile\t90th Percentile')
+    for b in range(1, 152):
+        l.append('{}\t{:.2f}\t34.0\t31.0\t37.0\t28.0\t38.0'.format(b, 30 + rand.random() * 8))
+    l.append('>>END_MODULE')
+    l.append('>>Per sequence quality scores\twarn')
+    l.append('#Quality\tCount')
+    for q in range(2, 41):
+        l.append('{}\t{:.1f}'.format(q, rand.random() * 100000))
+    l.append('>>END_MODULE')
+    l.append('>>Per base sequence content\tfail')
+    l.append('#Base\tG\tA\tT\tC')
+    for b in range(1, 152):
+        g, a, t = [20 + rand.random() * 10 for _ in range(3)]
+        l.append('{}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}'.format(b, g, a, t, 100 - g - a - t))
+    l.append('>>END_MODULE')
+    l.append('>>Per sequence GC content\tpass')
+    l.append('#GC Content\tCount')
+    for gc in range(0, 101):
+        l.append('{}\t{:.1f}'.format(gc, rand.random() * 10000))
+    l.append('>>END_MODULE')
+    l.append('>>Per base N content\tpass')
+    l.append('#Base\tN-Count')
+    for b in range(1, 152):
+        l.append('{}\t{:.4f}'.format(b, rand.random() * 0.01))
+    l.append('>>END_MODULE')
+    l.append('>>Sequence Length Distribution\twarn')
+    l.append('#Length\tCount')
+    l.append('35-39\t{}.0'.format(rand.randint(1, 100)))
+    l.append('151\t{}.0'.format(rand.randint(100000, 1000000)))
+    l.append('>>END_MODULE')
+    l.append('>>Sequence Duplication Levels\tpass')
+    l.append('#Total Deduplicated Percentage\t{:.2f}'.format(50 + rand.random() * 40))
+    l.append('#Duplication Level\tPercentage of deduplicated\tPercentage of total')
+    for d in ['1', '2', '3', '4', '5', '6', '7', '8', '9', '>10', '>50', '>100', '>500', '>1k', '>5k', '>10k+']:
+        l.append('{}\t{:.2f}\t{:.2f}'.format(d, rand.random() * 10, rand.random() * 10))
+    l.append('>>END_MODULE')
+    l.append('>>Overrepresented sequences\tpass')
+    l.append('>>END_MODULE')
+    l.append('>>Adapter Content\tpass')
+    l.append('#Position\tIllumina Universal Adapter\tNextera Transposase Sequence')
+    for b in range(1, 150):
+        l.append('{}\t{:.3f}\t0.0'.format(b, rand.random() * b / 50.0))
+    l.append('>>END_MODULE')
+    return '\n'.join(l) + '\n'
+
+def qualimap_genome_results(s_name, rand):
+    """ Return the contents of a Qualimap BamQC genome_results.txt file """
+    total = rand.randint(1000000, 50000000)
+    mapped = int(total * (0.8 + rand.random() * 0.2))
+    l = ['BamQC report', '-----------------------------------', '']
+    l.append('>>>>>>> Input')
+    l.append('')
+    l.append('     bam file = /data/{}.bam'.format(s_name))
+    l.append('     outfile = {}/genome_results.txt'.format(s_name))
+    l.append('')
+    l.append('>>>>>>> Globals')
+    l.append('')
+    l.append('     number of windows = 400')
+    l.append('     number of reads = {:,}'.format(total))
+    l.append('     number of mapped reads = {:,} ({:.2f}%)'.format(mapped, 100.0 * mapped / total))
+    l.append('     number of mapped bases = {:,} bp'.format(mapped * 100))
+    l.append('     number of sequenced bases = {:,} bp'.format(mapped * 99))
+    l.append('')
+    l.append('>>>>>>> Insert size')
+    l.append('')
+    l.append('     mean insert size = {:.2f}'.format(250 + rand.random() * 100))
+    l.append('     median insert size = {}'.format(rand.randint(250, 350)))
+    l.append('')
+    l.append('>>>>>>> Mapping quality')
+    l.append('')
+    l.append('     mean mapping quality = {:.4f}'.format(30 + rand.random() * 30))
+    l.append('')
+    l.append('>>>>>>> Mismatches and indels')
+    l.append('')
+    l.append('    general error rate = {:.4f}'.format(rand.random() * 0.02))
+    l.append('')
+    l.append('>>>>>>> Coverage per contig')
+    l.append('')
+    for c in range(1, 23):
+        l.append('\tchr{}\t{}\t{}\t{:.4f}\t{:.4f}'.format(c, 50000000, rand.randint(1000000, 9000000), rand.random() * 40, rand.random() * 20))
+    return '\n'.join(l) + '\n'
+
+def qualimap_coverage_histogram(rand):
+    """ Return the contents of a Qualimap BamQC coverage_histogram.txt file """
+    l = ['#Coverage\tNumber of genomic locations']
+    peak = rand.randint(20, 40)
+    for c in range(0, 201):
+        l.append('{:.1f}\t{:.1f}'.format(c, int(1000000.0 / (1 + (c - peak) ** 2)) + rand.randint(0, 100)))
+    return '\n'.join(l) + '\n'
+
+def qualimap_insert_size_histogram(rand):
+    """ Return the contents of a Qualimap BamQC insert_size_histogram.txt file """
+    l = ['#Insert size (bp)\tInsert size frequency']
+    peak = rand.randint(250, 350)
+    for i in range(0, 1001, 2):
+        l.append('{:.1f}\t{:.1f}'.format(i, int(10000000.0 / (1 + ((i - peak) / 20.0) ** 2))))
+    return '\n'.join(l) + '\n'
+
+def picard_header(tool, s_name):
+    """ Return the header lines that Picard writes at the top of a metrics file """
+    return [
+        '## htsjdk.samtools.metrics.StringHeader',
+        '# picard.sam.{} INPUT=[/data/{}.bam] OUTPUT=/data/{}.txt'.format(tool, s_name, s_name),
+        '## htsjdk.samtools.metrics.StringHeader',
+        '# Started on: Mon Jan 01 00:00:00 GMT 2018',
+        '',
+    ]
+
+def picard_markdups(s_name, rand):
+    """ Return the contents of a Picard MarkDuplicates metrics file """
+    pairs = rand.randint(1000000, 20000000)
+    dups = int(pairs * rand.random() * 0.3)
+    l = picard_header('markduplicates.MarkDuplicates', s_name)
+    l.append('## METRICS CLASS\tpicard.sam.DuplicationMetrics')
+    l.append('\t'.join(['LIBRARY', 'UNPAIRED_READS_EXAMINED', 'READ_PAIRS_EXAMINED', 'SECONDARY_OR_SUPPLEMENTARY_RDS',
+        'UNMAPPED_READS', 'UNPAIRED_READ_DUPLICATES', 'READ_PAIR_DUPLICATES', 'READ_PAIR_OPTICAL_DUPLICATES',
+        'PERCENT_DUPLICATION', 'ESTIMATED_LIBRARY_SIZE']))
+    l.append('\t'.join([str(v) for v in [s_name, rand.randint(0, 10000), pairs, 0, rand.randint(0, 100000),
+        rand.randint(0, 1000), dups, int(dups * 0.01), round(float(dups) / pairs, 6), pairs * 3]]))
+    l.append('')
+    return '\n'.join(l) + '\n'
+
+def picard_alignment_metrics(s_name, rand):
+    """ Return the contents of a Picard CollectAlignmentSummaryMetrics file """
+    keys = ['CATEGORY', 'TOTAL_READS', 'PF_READS', 'PCT_PF_READS', 'PF_NOISE_READS', 'PF_READS_ALIGNED',
+        'PCT_PF_READS_ALIGNED', 'PF_ALIGNED_BASES', 'PF_HQ_ALIGNED_READS', 'PF_HQ_ALIGNED_BASES',
+        'PF_HQ_ALIGNED_Q20_BASES', 'PF_HQ_MEDIAN_MISMATCHES', 'PF_MISMATCH_RATE', 'PF_HQ_ERROR_RATE',
+        'PF_INDEL_RATE', 'MEAN_READ_LENGTH', 'READS_ALIGNED_IN_PAIRS', 'PCT_READS_ALIGNED_IN_PAIRS',
+        'BAD_CYCLES', 'STRAND_BALANCE', 'PCT_CHIMERAS', 'PCT_ADAPTER', 'SAMPLE', 'LIBRARY', 'READ_GROUP']
+    l = picard_header('analysis.CollectAlignmentSummaryMetrics', s_name)
+    l.append('## METRICS CLASS\tpicard.analysis.AlignmentSummaryMetrics')
+    l.append('\t'.join(keys))
+    for category in ['FIRST_OF_PAIR', 'SECOND_OF_PAIR', 'PAIR']:
+        total = rand.randint(1000000, 20000000)
+        aligned = int(total * (0.8 + rand.random() * 0.2))
+        l.append('\t'.join([str(v) for v in [category, total, total, 1, 0, aligned, round(float(aligned) / total, 6),
+            aligned * 100, aligned, aligned * 99, aligned * 95, 0, round(rand.random() * 0.01, 6),
+            round(rand.random() * 0.01, 6), round(rand.random() * 0.001, 6), 100, aligned, 0.99, 0,
+            0.5, round(rand.random() * 0.01, 6), 0, '', '', '']]))
+    l.append('')
+    return '\n'.join(l) + '\n'
+
+def picard_insert_size(s_name, rand):
+    """ Return the contents of a Picard CollectInsertSizeMetrics file """
+    keys = ['MEDIAN_INSERT_SIZE', 'MEDIAN_ABSOLUTE_DEVIATION', 'MIN_INSERT_SIZE', 'MAX_INSERT_SIZE',
+        'MEAN_INSERT_SIZE', 'STANDARD_DEVIATION', 'READ_PAIRS', 'PAIR_ORIENTATION', 'WIDTH_OF_10_PERCENT',
+        'WIDTH_OF_90_PERCENT', 'SAMPLE', 'LIBRARY', 'READ_GROUP']
+    peak = rand.randint(250, 350)
+    l = picard_header('analysis.CollectInsertSizeMetrics', s_name)
+    l.append('## METRICS CLASS\tpicard.analysis.InsertSizeMetrics')
+    l.append('\t'.join(keys))
+    l.append('\t'.join([str(v) for v in [peak, 40, 2, 1000, peak + rand.random() * 10, 60.5,
+        rand.randint(1000000, 10000000), 'FR', 21, 161, '', '', '']]))
+    l.append('')
+    l.append('## HISTOGRAM\tjava.lang.Integer')
+    l.append('insert_size\tAll_Reads.fr_count')
+    for i in range(2, 1001):
+        l.append('{}\t{}'.format(i, int(100000.0 / (1 + ((i - peak) / 20.0) ** 2))))
+    l.append('')
+    return '\n'.join(l) + '\n'
+
+def samtools_stats(s_name, rand):
+    """ Return the contents of a samtools stats file """
+    total = rand.randint(1000000, 20000000)
+    mapped = int(total * (0.8 + rand.random() * 0.2))
+    l = ['# This file was produced by samtools stats (1.6+htslib-1.6) and can be plotted using plot-bamstats']
+    l.append('# The command line was:  stats /data/{}.bam'.format(s_name))
+    l.append('# CHK, Checksum\t[2]Read Names\t[3]Sequences\t[4]Qualities')
+    l.append('CHK\t4a0f3ec8\t1bdd5b8e\t6f7f6c2d')
+    l.append('# Summary Numbers. Use `grep ^SN | cut -f 2-` to extract this part.')
+    sn = [
+        ('raw total sequences', total), ('filtered sequences', 0), ('sequences', total),
+        ('is sorted', 1), ('1st fragments', total // 2), ('last fragments', total // 2),
+        ('reads mapped', mapped), ('reads mapped and paired', mapped - 1000),
+        ('reads unmapped', total - mapped), ('reads properly paired', mapped - 5000),
+        ('reads paired', total), ('reads duplicated', int(mapped * rand.random() * 0.3)),
+        ('reads MQ0', rand.randint(0, 10000)), ('reads QC failed', 0),
+        ('non-primary alignments', rand.randint(0, 10000)), ('total length', total * 100),
+        ('bases mapped', mapped * 100), ('bases mapped (cigar)', mapped * 99),
+        ('bases trimmed', 0), ('bases duplicated', 0), ('mismatches', rand.randint(100000, 1000000)),
+        ('error rate', '{:.6e}'.format(rand.random() * 0.01)), ('average length', 100),
+        ('maximum length', 100), ('average quality', '{:.1f}'.format(30 + rand.random() * 8)),
+        ('insert size average', '{:.1f}'.format(250 + rand.random() * 100)),
+        ('insert size standard deviation', '{:.1f}'.format(50 + rand.random() * 20)),
+        ('inward oriented pairs', mapped // 2), ('outward oriented pairs', 100),
+        ('pairs with other orientation', 10), ('pairs on different chromosomes', 1000),
+    ]
+    for k, v in sn:
+        l.append('SN\t{}:\t{}'.format(k, v))
+    l.append('# Coverage distribution. Use `grep ^COV | cut -f 2-` to extract this part.')
+    for c in range(1, 501):
+        l.append('COV\t[{0}-{0}]\t{0}\t{1}'.format(c, rand.randint(0, 100000)))
+    return '\n'.join(l) + '\n'
+
+def featurecounts_summary(s_name, rand):
+    """ Return the contents of a featureCounts .summary file """
+    l = ['Status\t/data/{}.bam'.format(s_name)]
+    for k in ['Assigned', 'Unassigned_Ambiguity', 'Unassigned_MultiMapping', 'Unassigned_NoFeatures',
+              'Unassigned_Unmapped', 'Unassigned_MappingQuality', 'Unassigned_FragmentLength',
+              'Unassigned_Chimera', 'Unassigned_Secondary', 'Unassigned_Nonjunction', 'Unassigned_Duplicate']:
+        l.append('{}\t{}'.format(k, rand.randint(0, 10000000)))
+    return '\n'.join(l) + '\n'
+
+def custom_content_tsv(s_name, rand):
+    """ Return the contents of a custom content _mqc.tsv file, one row per sample """
+    l = ['# id: \'synthetic_assembly_stats\'']
+    l.append('# section_name: \'Synthetic assembly stats\'')
+    l.append('# plot_type: \'table\'')
+    l.append('Sample\tContigs\tN50\tLargest contig\tGC')
+    l.append('{}\t{}\t{}\t{}\t{:.2f}'.format(s_name, rand.randint(10, 5000), rand.randint(1000, 500000),
+        rand.randint(100000, 5000000), 38 + rand.random() * 14))
+    return '\n'.join(l) + '\n'
+
+def write_file(fn, contents):
+    d = os.path.dirname(fn)
+    if not os.path.isdir(d):
+        os.makedirs(d)
+    with io.open(fn, 'w', encoding='utf-8') as fh:
+        fh.write(contents if isinstance(contents, type(u'')) else contents.decode('utf-8'))
+
+def make_sample(base, s_name, rand, fastqc_zip=False):
+    """ Write all synthetic log files for one sample in its own directory """
+    d = os.path.join(base, s_name)
+    # FastQC - alternate between zip files and unzipped directories, like real runs
+    if fastqc_zip:
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        with zipfile.ZipFile(os.path.join(d, '{}_fastqc.zip'.format(s_name)), 'w') as z:
+            z.writestr('{}_fastqc/'.format(s_name), '')
+            z.writestr('{}_fastqc/fastqc_data.txt'.format(s_name), fastqc_text(s_name, rand))
+    else:
+        write_file(os.path.join(d, '{}_fastqc'.format(s_name), 'fastqc_data.txt'), fastqc_text(s_name, rand))
+    # Qualimap - sample name comes from the report directory name
+    qm_dir = os.path.join(d, 'qualimap', s_name)
+    write_file(os.path.join(qm_dir, 'genome_results.txt'), qualimap_genome_results(s_name, rand))
+    write_file(os.path.join(qm_dir, 'raw_data_qualimapReport', 'coverage_histogram.txt'), qualimap_coverage_histogram(rand))
+    write_file(os.path.join(qm_dir, 'raw_data_qualimapReport', 'insert_size_histogram.txt'), qualimap_insert_size_histogram(rand))
+    # Picard
+    write_file(os.path.join(d, '{}.markdups_metrics.txt'.format(s_name)), picard_markdups(s_name, rand))
+    write_file(os.path.join(d, '{}.alignment_summary_metrics.txt'.format(s_name)), picard_alignment_metrics(s_name, rand))
+    write_file(os.path.join(d, '{}.insert_size_metrics.txt'.format(s_name)), picard_insert_size(s_name, rand))
+    # samtools stats, featureCounts and custom content
+    write_file(os.path.join(d, '{}.sorted.bam.stats'.format(s_name)), samtools_stats(s_name, rand))
+    write_file(os.path.join(d, '{}.featureCounts.summary'.format(s_name)), featurecounts_summary(s_name, rand))
+    write_file(os.path.join(d, '{}_assembly_mqc.tsv'.format(s_name)), custom_content_tsv(s_name, rand))
+
+def make_cohort(base, num_samples, seed=1):
+    """ Write synthetic log files for num_samples samples. Returns the sample names. """
+    rand = random.Random(seed)
+    s_names = ['sample_{:05d}'.format(i) for i in range(num_samples)]
+    for i, s_name in enumerate(s_names):
+        make_sample(base, s_name, rand, fastqc_zip=(i % 2 == 1))
+    return s_names
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('output_dir')
+    parser.add_argument('num_samples', type=int)
+    args = parser.parse_args()
+    make_cohort(args.output_dir, args.num_samples)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+""" Check the keys used to cache flat plot images.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.utils import cache
+
+
+def make_formatter(decimals):
+    return lambda x: '{:.{}f}'.format(x, decimals)
+
+
+class TestPlotCacheKeys(unittest.TestCase):
+
+    def test_lambdas(self):
+        """ Lambdas all have the same name, so must be told apart by their code """
+        key_a = cache.PlotCache.make_key({'id': 'plot'}, {'tt_formatter': lambda x: x + 1})
+        key_b = cache.PlotCache.make_key({'id': 'plot'}, {'tt_formatter': lambda x: x * 2})
+        self.assertIsNotNone(key_a)
+        self.assertNotEqual(key_a, key_b)
+
+    def test_closures(self):
+        """ Closures with the same code differ by the values that they close over """
+        key_a = cache.PlotCache.make_key({'tt_formatter': make_formatter(1)})
+        key_b = cache.PlotCache.make_key({'tt_formatter': make_formatter(2)})
+        self.assertNotEqual(key_a, key_b)
+        self.assertEqual(key_a, cache.PlotCache.make_key({'tt_formatter': make_formatter(1)}))
+
+    def test_uncacheable(self):
+        """ Plots with values that can't be saved as JSON aren't cached """
+        self.assertIsNone(cache.PlotCache.make_key({'modify': object()}))
+        self.assertIsNone(cache.PlotCache.make_key({'modify': self.test_uncacheable}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+""" Check that custom content files are found and read, whether they are
+plain text, gzipped or columnar (Parquet, Feather or Arrow).
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.modules.custom_content import custom_content
+from multiqc.utils import config, report
+
+tsv = u'Sample\treads\tgc\ns1\t100\t40.5\ns2\t200\t42\n'
+
+
+class TestCustomContentFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.search_patterns = report.compile_search_patterns([{'custom_content': [config.sp['custom_content']]}])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def found(self, fn):
+        """ Whether the custom content search pattern picks up a file """
+        f = {'fn': fn, 'root': self.tmp_dir}
+        scanned = report.scan_file(f, self.search_patterns) == ['custom_content']
+        self.assertEqual(scanned, report.search_file(config.sp['custom_content'], f))
+        return scanned
+
+    def test_plain_and_gzipped(self):
+        """ Allowing compressed files doesn't stop plain files being found """
+        with open(os.path.join(self.tmp_dir, 'stats_mqc.tsv'), 'w') as fh:
+            fh.write(tsv)
+        with gzip.open(os.path.join(self.tmp_dir, 'stats_mqc.tsv.gz'), 'wb') as fh:
+            fh.write(tsv.encode('utf-8'))
+        for fn in ['stats_mqc.tsv', 'stats_mqc.tsv.gz']:
+            self.assertTrue(self.found(fn), fn)
+            f_base, f_extension, compressed = custom_content._split_extension(fn)
+            self.assertEqual((f_base, f_extension, compressed), ('stats_mqc', '.tsv', fn.endswith('.gz')))
+            self.assertEqual(custom_content._read_text({'fn': fn, 'root': self.tmp_dir}, compressed), tsv)
+
+    def test_not_custom_content(self):
+        self.assertFalse(self.found('stats.tsv.gz'))
+        self.assertFalse(self.found('stats_mqc.tsv.bz2'))
+        self.assertFalse(self.found('stats_mqc.png'))
+
+
+class TestColumnarFiles(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            self.pa = pytest.importorskip('pyarrow')
+        except pytest.skip.Exception as e:
+            raise unittest.SkipTest(str(e))
+        self.tmp_dir = tempfile.mkdtemp()
+        self.table = self.pa.table([
+            self.pa.array(['s1', 's2']),
+            self.pa.array([100, 200], type=self.pa.int64()),
+            self.pa.array([40.5, None]),
+            self.pa.array([True, False]),
+            self.pa.array(['ok', None]),
+        ], names=['Sample', 'reads', 'gc', 'passed', 'note'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def read(self, fn):
+        f = {'fn': fn, 'root': self.tmp_dir, 's_name': fn}
+        return custom_content._read_columnar(f, custom_content._split_extension(fn)[1])
+
+    def check(self, fn):
+        rows, mconfig = self.read(fn)
+        self.assertEqual(rows[0], ['Sample', 'reads', 'gc', 'passed', 'note'])
+        # Numbers and booleans are floats, anything else is a string. Missing values are empty.
+        self.assertEqual([list(r) for r in rows[1:]], [['s1', 100.0, 40.5, 1.0, 'ok'], ['s2', 200.0, '', 0.0, '']])
+        self.assertEqual([type(v) for v in rows[1]], [type(u''), float, float, float, type(u'')])
+
+        data, conf = custom_content._parse_rows({'fn': fn}, {}, rows, len(rows))
+        self.assertEqual(list(data.keys()), ['s1', 's2'])
+        self.assertEqual(conf['plot_type'], 'table')
+        self.assertEqual(conf['pconfig']['col1_header'], 'Sample')
+        self.assertEqual(data['s1']['reads'], 100.0)
+        return mconfig
+
+    def test_parquet(self):
+        import pyarrow.parquet
+        table = self.table.replace_schema_metadata({'multiqc': 'id: my_stats\nsection_name: My stats'})
+        pyarrow.parquet.write_table(table, os.path.join(self.tmp_dir, 'stats_mqc.parquet'))
+        self.assertTrue(report.search_file(config.sp['custom_content'], {'fn': 'stats_mqc.parquet', 'root': self.tmp_dir}))
+        self.assertEqual(self.check('stats_mqc.parquet'), {'id': 'my_stats', 'section_name': 'My stats'})
+
+    def test_feather(self):
+        import pyarrow.feather
+        pyarrow.feather.write_feather(self.table, os.path.join(self.tmp_dir, 'stats_mqc.feather'))
+        self.assertIsNone(self.check('stats_mqc.feather'))
+
+    def test_arrow_file_and_stream(self):
+        import pyarrow.ipc
+        for new_writer in [self.pa.ipc.new_file, self.pa.ipc.new_stream]:
+            with self.pa.OSFile(os.path.join(self.tmp_dir, 'stats_mqc.arrow'), 'wb') as fh:
+                with new_writer(fh, self.table.schema) as writer:
+                    writer.write_table(self.table)
+            self.check('stats_mqc.arrow')
+
+    def test_unreadable(self):
+        with open(os.path.join(self.tmp_dir, 'stats_mqc.parquet'), 'w') as fh:
+            fh.write(tsv)
+        self.assertIsNone(self.read('stats_mqc.parquet'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+""" Check the General Statistics store used by modules, plugins and the table.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.plots import table_object
+from multiqc.utils import general_stats
+
+
+class TestGeneralStats(unittest.TestCase):
+
+    def setUp(self):
+        self.store = general_stats.GeneralStats()
+        self.store.append({'sample_1': {'reads': 100}, 'sample_2': {'reads': 200}})
+
+    def test_change_before_build(self):
+        """ Plugins and hooks can change values after modules have added them """
+        self.store[0]['sample_1']['reads'] = 150
+        self.store[0]['sample_2']['gc'] = 41.5
+        self.store[0]['sample_3'] = {'reads': 300}
+        dt = table_object.datatable(self.store, [{'reads': {}, 'gc': {}}])
+        section = dt.data[0]
+        self.assertIsInstance(section, general_stats.Section)
+        self.assertEqual(section.column_items('reads'), [('sample_1', 150), ('sample_2', 200), ('sample_3', 300)])
+        self.assertEqual(section.column_items('gc'), [('sample_2', 41.5)])
+
+    def test_replace_section(self):
+        self.store.append({'sample_1': {'gc': 40}})
+        self.store[1] = {'sample_4': {'gc': 42}}
+        self.store.insert(0, {'sample_5': {'dups': 0.1}})
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.sample_names(), set(['sample_1', 'sample_2', 'sample_4', 'sample_5']))
+        self.assertEqual(dict(self.store[2]), {'sample_4': {'gc': 42}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+""" Check the values that heatmaps save in the report as typed arrays.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import base64
+import io
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.modules.vcftools import relatedness2
+from multiqc.plots import heatmap
+from multiqc.utils import report
+
+relatedness_file = u'''INDV1\tINDV2\tN_AaAa\tN_AAaa\tN1_Aa\tN2_Aa\tRELATEDNESS_PHI
+s1\ts1\t10\t0\t10\t10\t0.5
+s1\ts2\t4\t1\t10\t12\t0.0123457
+s2\ts1\t4\t1\t12\t10\t0.0123457
+s2\ts2\t12\t0\t12\t12\t0.5
+'''
+
+
+class TestTypedHeatmap(unittest.TestCase):
+
+    def setUp(self):
+        self.old_html_ids = report.html_ids
+        report.html_ids = report.HtmlIds()
+
+    def tearDown(self):
+        report.html_ids = self.old_html_ids
+        report.plot_data.pop('test_typed_heatmap', None)
+
+    def test_relatedness2_precision(self):
+        """ Values shown with 7 decimal places are saved without rounding """
+        m = relatedness2._Relatedness2Matrix({'f': io.StringIO(relatedness_file)})
+        self.assertEqual(m.x_labels, ['s1', 's2'])
+        self.assertEqual(m.data.tolist(), [[0.5, 0.0123457], [0.0123457, 0.5]])
+
+        heatmap.plot(m.data, m.x_labels, m.y_labels, {'id': 'test_typed_heatmap', 'decimalPlaces': 7})
+        typed_data = report.plot_data['test_typed_heatmap']['typed_data']
+        self.assertEqual(typed_data['dtype'], 'float64')
+        values = np.frombuffer(base64.b64decode(typed_data['data']), dtype='<f8')
+        self.assertEqual(values.tolist(), [0.5, 0.0123457, 0.0123457, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
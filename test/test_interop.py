@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+""" Check the values read from binary InterOp files, using small synthetic
+files for each supported version of each metric file.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+from collections import OrderedDict
+import math
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.modules.interop import interop_bin
+
+# A 4 cycle read and a 2 cycle index read
+run_info = '''<?xml version="1.0"?>
+<RunInfo><Run><Reads>
+<Read Number="1" NumCycles="4" IsIndexedRead="N" />
+<Read Number="2" NumCycles="2" IsIndexedRead="Y" />
+</Reads></Run></RunInfo>'''
+
+# Quality score bins: lower bounds, upper bounds and remapped scores
+q_bins = [2, 15, 30] + [14, 29, 41] + [7, 22, 37]
+
+
+def pack_string(s):
+    """ Pack a string for IndexMetricsOut.bin """
+    b = s.encode('utf-8')
+    return struct.pack('<H', len(b)) + b
+
+
+class TestInteropFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cycles = interop_bin.CycleMap(interop_bin.parse_run_info(run_info))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, fn, header, records):
+        """ Write a metric file from a header and a list of packed records """
+        path = os.path.join(self.tmp_dir, fn)
+        with open(path, 'wb') as fh:
+            fh.write(header)
+            for r in records:
+                fh.write(r)
+        return path
+
+    def assertNan(self, value):
+        self.assertTrue(math.isnan(value), value)
+
+    def test_tile_metrics_v2(self):
+        records = [(1, 1101, 100, 2000.0), (1, 1101, 102, 1000.0), (1, 1101, 103, 800.0),
+                   (1, 1101, 200, 0.25), (1, 1101, 201, 0.125), (1, 1101, 300, 1.5), (1, 1101, 301, 2.5),
+                   (2, 1101, 102, 500.0), (2, 1101, 103, 400.0)]
+        path = self.write('TileMetricsOut.bin', struct.pack('<BB', 2, 10), [struct.pack('<HHHf', *r) for r in records])
+        m = interop_bin.read_tile_metrics(path, 2)
+        self.assertEqual(m['lanes'].tolist(), [1, 2])
+        self.assertEqual(m['clusters'].tolist(), [1000.0, 500.0])
+        self.assertEqual(m['clusters_pf'].tolist(), [800.0, 400.0])
+        self.assertEqual(m['density'][0], 2000.0)
+        self.assertNan(m['density'][1])
+        self.assertEqual(m['phasing'][0, 0], 25.0)
+        self.assertEqual(m['prephasing'][0, 0], 12.5)
+        self.assertNan(m['phasing'][0, 1])
+        self.assertEqual(m['aligned'][0].tolist(), [1.5, 2.5])
+
+    def test_tile_metrics_v3(self):
+        records = [struct.pack('<HIBff', 1, 11101, ord('t'), 1000.0, 800.0),
+                   struct.pack('<HIBIf', 1, 11101, ord('r'), 1, 1.5)]
+        path = self.write('TileMetricsOut.bin', struct.pack('<BBf', 3, 15, 2.0), records)
+        m = interop_bin.read_tile_metrics(path, 2)
+        self.assertEqual(m['lanes'].tolist(), [1])
+        self.assertEqual(m['density'].tolist(), [500.0])
+        self.assertEqual(m['clusters'].tolist(), [1000.0])
+        self.assertEqual(m['clusters_pf'].tolist(), [800.0])
+        self.assertEqual(m['aligned'][0, 0], 1.5)
+        self.assertNan(m['aligned'][0, 1])
+        self.assertNan(m['phasing'][0, 0])
+
+    def check_error_metrics(self, path):
+        m = interop_bin.read_error_metrics(path, self.cycles)
+        self.assertEqual(m['lanes'].tolist(), [1])
+        # The last cycle of each read is left out
+        self.assertEqual(m['error'].tolist(), [[1.0, 2.5]])
+        self.assertEqual(dict(m['cycles']), {(1, 0): 3, (1, 1): 1})
+        # Reads are shorter than all of the cycle limits
+        self.assertNan(m['error_35'][0, 0])
+
+    def test_error_metrics_v3(self):
+        records = [struct.pack('<HHHf5I', 1, 1101, c, c * 0.5, 0, 0, 0, 0, 0) for c in range(1, 7)]
+        self.check_error_metrics(self.write('ErrorMetricsOut.bin', struct.pack('<BB', 3, 30), records))
+
+    def test_error_metrics_v4(self):
+        records = [struct.pack('<HIHf', 1, 11101, c, c * 0.5) for c in range(1, 7)]
+        self.check_error_metrics(self.write('ErrorMetricsOut.bin', struct.pack('<BB', 4, 12), records))
+
+    def test_error_metrics_v5(self):
+        """ Version 5 has the number of adapter rates in the header """
+        records = [struct.pack('<HIHff', 1, 11101, c, c * 0.5, 0.1) for c in range(1, 7)]
+        self.check_error_metrics(self.write('ErrorMetricsOut.bin', struct.pack('<BBH', 5, 16, 1), records))
+
+    def check_quality_metrics(self, path):
+        totals = interop_bin.read_quality_metrics(path, self.cycles)
+        # 100 bases at Q20 and 300 at Q35 for each usable cycle
+        self.assertEqual(totals, {(1, 0): [1200.0, 900.0], (1, 1): [400.0, 300.0]})
+
+    def quality_records(self, fmt, tile, nbins):
+        hist = [0] * nbins
+        if nbins == 50:
+            hist[19], hist[34] = 100, 300
+        else:
+            hist[0], hist[2] = 100, 300
+        return [struct.pack(fmt, 1, tile, c, *hist) for c in range(1, 7)]
+
+    def test_quality_metrics_v4(self):
+        records = self.quality_records('<HHH50I', 1101, 50)
+        self.check_quality_metrics(self.write('QMetricsOut.bin', struct.pack('<BB', 4, 206), records))
+
+    def test_quality_metrics_v5(self):
+        records = self.quality_records('<HHH50I', 1101, 50)
+        self.check_quality_metrics(self.write('QMetricsOut.bin', struct.pack('<BBB', 5, 206, 0), records))
+        header = struct.pack('<BBBB9B', 5, 206, 1, 3, *q_bins)
+        self.check_quality_metrics(self.write('QMetricsOut.bin', header, records))
+
+    def test_quality_metrics_v6(self):
+        """ Version 6 histograms only have the binned scores """
+        records = self.quality_records('<HHH3I', 1101, 3)
+        self.check_quality_metrics(self.write('QMetricsOut.bin', struct.pack('<BBBB9B', 6, 18, 1, 3, *q_bins), records))
+
+    def test_quality_metrics_v7(self):
+        records = self.quality_records('<HIH3I', 11101, 3)
+        self.check_quality_metrics(self.write('QMetricsOut.bin', struct.pack('<BBBB9B', 7, 20, 1, 3, *q_bins), records))
+
+    def test_extraction_metrics_v2(self):
+        records = [struct.pack('<HHH4f4HQ', 1, 1101, c, 2.5, 2.5, 2.5, 2.5, c * 100, 1, 1, 1, 0) for c in range(1, 7)]
+        path = self.write('ExtractionMetricsOut.bin', struct.pack('<BB', 2, 38), records)
+        m = interop_bin.read_extraction_metrics(path, self.cycles)
+        # Intensity of the first channel at the first cycle of each read
+        self.assertEqual(m['intensity'].tolist(), [[100.0, 500.0]])
+
+    def test_extraction_metrics_v3(self):
+        records = [struct.pack('<HIH2f2H', 1, 11101, c, 2.5, 2.5, c * 100, 1) for c in range(1, 7)]
+        path = self.write('ExtractionMetricsOut.bin', struct.pack('<BBB', 3, 20, 2), records)
+        m = interop_bin.read_extraction_metrics(path, self.cycles)
+        self.assertEqual(m['lanes'].tolist(), [1])
+        self.assertEqual(m['intensity'].tolist(), [[100.0, 500.0]])
+
+    def index_records(self, ids_fmt, count_fmt):
+        records = list()
+        for tile, read, name, sample, count in [
+                (1101, 2, 'ACGT-TTTT', 'S1', 400), (1101, 2, 'GGGG-CCCC', 'S2', 300),
+                (1102, 2, 'ACGT-TTTT', 'S1', 100), (1101, 3, 'ACGT-TTTT', 'S1', 999)]:
+            records.append(struct.pack(ids_fmt, 1, tile, read) + pack_string(name) +
+                           struct.pack(count_fmt, count) + pack_string(sample) + pack_string('P'))
+        return records
+
+    def check_index_metrics(self, path):
+        # Only the first index read of each lane is counted
+        expected = OrderedDict([(('ACGT-TTTT', 'S1', 'P'), 500), (('GGGG-CCCC', 'S2', 'P'), 300)])
+        self.assertEqual(interop_bin.read_index_metrics(path), {1: expected})
+
+    def test_index_metrics_v1(self):
+        self.check_index_metrics(self.write('IndexMetricsOut.bin', struct.pack('<B', 1), self.index_records('<HHH', '<I')))
+
+    def test_index_metrics_v2(self):
+        self.check_index_metrics(self.write('IndexMetricsOut.bin', struct.pack('<B', 2), self.index_records('<HIH', '<Q')))
+
+    def test_unsupported_version(self):
+        """ Files that can't be read are left out of the summary """
+        self.write('TileMetricsOut.bin', struct.pack('<BB', 9, 10), [])
+        self.assertIsNone(interop_bin.read_metrics(self.tmp_dir, 'TileMetricsOut.bin', interop_bin.read_tile_metrics, 2))
+        self.write('QMetricsOut.bin', struct.pack('<B', 4), [])
+        self.assertIsNone(interop_bin.read_metrics(self.tmp_dir, 'QMetricsOut.bin', interop_bin.read_quality_metrics, self.cycles))
+
+    def test_parse_run(self):
+        tile_records = [(1, 1101, 100, 2000.0), (1, 1101, 102, 1000.0), (1, 1101, 103, 800.0), (1, 1101, 300, 1.5)]
+        self.write('TileMetricsOut.bin', struct.pack('<BB', 2, 10), [struct.pack('<HHHf', *r) for r in tile_records])
+        self.write('QMetricsOut.bin', struct.pack('<BB', 4, 206), self.quality_records('<HHH50I', 1101, 50))
+        self.write('ErrorMetricsOut.bin', struct.pack('<BB', 4, 12),
+                   [struct.pack('<HIHf', 1, 1101, c, c * 0.5) for c in range(1, 7)])
+        self.write('IndexMetricsOut.bin', struct.pack('<B', 1), self.index_records('<HHH', '<I'))
+        run_summary, index_summary = interop_bin.parse_run(run_info, self.tmp_dir)
+
+        read_1 = run_summary['summary']['Read 1']
+        self.assertAlmostEqual(read_1['Yield'], 1200 / 1e9)
+        self.assertEqual(read_1['%>=Q30'], 75.0)
+        self.assertEqual(read_1['Aligned'], 1.5)
+        self.assertEqual(read_1['Error Rate'], 1.0)
+        self.assertNotIn('Intensity C1', read_1)
+        self.assertEqual(list(run_summary['summary'].keys()), ['Read 1', 'Read 2 (I)', 'Non-indexed', 'Total'])
+        self.assertAlmostEqual(run_summary['summary']['Total']['Yield'], 1600 / 1e9)
+
+        lane_1 = run_summary['details']['Lane 1 - Read 1']
+        self.assertEqual(lane_1['Tiles'], 1.0)
+        self.assertEqual(lane_1['Density'], 2.0)
+        self.assertEqual(lane_1['Cluster PF'], 80.0)
+        self.assertEqual(lane_1['Reads PF'], 0.0008)
+        self.assertEqual(lane_1['Cycles Error'], 3.0)
+
+        self.assertEqual(index_summary['summary']['Lane 1']['PF Reads'], 800.0)
+        self.assertEqual(index_summary['summary']['Lane 1']['% Read Identified (PF)'], 100.0)
+        s1 = index_summary['details']['S1 - Lane 1']
+        self.assertEqual((s1['Index 1 (I7)'], s1['Index 2 (I5)'], s1['% Read Identified (PF)']), ('ACGT', 'TTTT', 62.5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+""" Check that JSON written a piece at a time matches json.dumps().
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.utils import json_stream
+
+
+class TestDumpDict(unittest.TestCase):
+
+    data = {
+        'report_plot_data': {'plot': {'samples': [['s1', 's2']], 'datasets': [[{'name': 's1', 'data': [1, 2.5, None]}]]}},
+        'config_title': u'R\xe9port\nTitle',
+        'config_version': '1.5'
+    }
+
+    def dump(self, d, **kwargs):
+        chunks = list()
+        skipped = json_stream.dump_dict(d, chunks.append, **kwargs)
+        return ''.join(chunks), skipped
+
+    def test_same_as_json_dumps(self):
+        for kwargs in [dict(), dict(indent=4, ensure_ascii=False), dict(indent=2, sort_keys=True)]:
+            self.assertEqual(self.dump(self.data, **kwargs), (json.dumps(self.data, **kwargs), []))
+            self.assertEqual(self.dump({}, **kwargs), (json.dumps({}, **kwargs), []))
+
+    def test_invalid_value(self):
+        """ Values that can't be encoded raise, or are left out if asked """
+        d = dict(self.data, config_bad=object())
+        with self.assertRaises(TypeError):
+            self.dump(d, indent=4)
+        self.assertEqual(self.dump(d, indent=4, skip_invalid=True), (json.dumps(self.data, indent=4), ['config_bad']))
+        self.assertEqual(self.dump({'config_bad': object()}, skip_invalid=True), ('{}', ['config_bad']))
+
+if __name__ == '__main__':
+    unittest.main()
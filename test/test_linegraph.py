@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+""" Check line graph downsampling and the full resolution data files written for it.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.plots import linegraph
+from multiqc.utils import config
+
+
+class TestDownsampleDataFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.old_config = (getattr(config, 'data_dir', None), config.export_plots, config.data_format)
+        config.data_dir = self.tmp_dir
+        config.export_plots = False
+        config.data_format = 'tsv'
+
+    def tearDown(self):
+        config.data_dir, config.export_plots, config.data_format = self.old_config
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_dataset_label_with_slash(self):
+        """ Dataset labels such as 'Obs/Exp' (Cutadapt) can't be used as filenames as they are """
+        series = {'name': 'sample_1', 'data': [[x, x * x] for x in range(100)]}
+        plotdata = [[series], [dict(series)]]
+        pconfig = {
+            'id': 'test_plot',
+            'max_points': 10,
+            'data_labels': [{'name': 'Counts'}, {'name': 'Obs/Exp'}]
+        }
+        downsampled = linegraph.downsample_plotdata(plotdata, pconfig)
+        self.assertEqual(len(downsampled[1][0]['data']), 10)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['mqc_test_plot_Counts.txt', 'mqc_test_plot_Obs_Exp.txt'])
+
+    def test_endpoints_kept(self):
+        series = {'name': 'sample_1', 'data': [[x, (x * 37) % 11] for x in range(100)]}
+        downsampled = linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': 10})
+        data = downsampled[0][0]['data']
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data[0], [0, 0])
+        self.assertEqual(data[-1], [99, (99 * 37) % 11])
+        self.assertEqual(data, sorted(data))
+        self.assertEqual(len(series['data']), 100)
+
+    def test_fewer_points_than_limit(self):
+        for max_points in [10, 2]:
+            series = {'name': 'sample_1', 'data': [[x, x * x] for x in range(5)]}
+            downsampled = linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': max_points})
+            self.assertIs(downsampled[0][0], series)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_categorical_x(self):
+        """ Lines with categories or non-numeric x values are left as they are """
+        series = {'name': 'sample_1', 'data': [[x, x * x] for x in range(100)]}
+        downsampled = linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': 10, 'categories': True})
+        self.assertIs(downsampled[0][0], series)
+        series = {'name': 'sample_1', 'data': [['pos_{}'.format(x), x * x] for x in range(100)]}
+        downsampled = linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': 10})
+        self.assertIs(downsampled[0][0], series)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_none_values(self):
+        """ Lines with missing values are left as they are """
+        series = {'name': 'sample_1', 'data': [[x, None if x == 50 else x] for x in range(100)]}
+        downsampled = linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': 10})
+        self.assertIs(downsampled[0][0], series)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_data_file_when_exporting_plots(self):
+        """ The full resolution data is saved even if flat plots were meant to save it """
+        config.export_plots = True
+        series = {'name': 'sample_1', 'data': [[x, x * x] for x in range(100)]}
+        linegraph.downsample_plotdata([[series]], {'id': 'test_plot', 'max_points': 10})
+        self.assertEqual(os.listdir(self.tmp_dir), ['mqc_test_plot_1.txt'])
+        with open(os.path.join(self.tmp_dir, 'mqc_test_plot_1.txt')) as fh:
+            self.assertEqual(len(fh.readline().split('\t')), 101)
+
+if __name__ == '__main__':
+    unittest.main()
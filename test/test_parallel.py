@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+""" Check that running modules with --parallel-modules gives the same
+output as running them one at a time.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import filecmp
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+import synthetic
+from multiqc.utils import parallel
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+multiqc_script = os.path.join(package_dir, 'scripts', 'multiqc')
+
+def run_multiqc(data_dir, out_dir, args):
+    """ Run MultiQC in a new process, returning the exit code and the log """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.abspath(package_dir)] + [p for p in [env.get('PYTHONPATH')] if p])
+    env['XDG_CACHE_HOME'] = os.path.join(out_dir, 'cache')
+    cmd = [sys.executable, multiqc_script, data_dir, '-o', out_dir, '--no-search-cache',
+           '--cl_config', 'no_version_check: true', '--cl_config', 'parse_cache: false'] + args
+    p = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    log = p.communicate()[0].decode('utf-8', 'replace')
+    return p.returncode, log
+
+
+class TestParallelModules(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp_dir, 'data')
+        synthetic.make_cohort(self.data_dir, 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_qualimap(self):
+        """ Qualimap adds General Statistics columns with lambdas, so is
+        run again in the main process after the worker's results are dropped """
+        modules = ['-m', 'qualimap', '-m', 'samtools']
+        serial_dir = os.path.join(self.tmp_dir, 'serial')
+        parallel_dir = os.path.join(self.tmp_dir, 'parallel')
+        code, log = run_multiqc(self.data_dir, serial_dir, modules)
+        self.assertEqual(code, 0, log)
+        code, log = run_multiqc(self.data_dir, parallel_dir, modules + ['--parallel-modules', '2'])
+        self.assertEqual(code, 0, log)
+        self.assertNotIn('broke', log)
+
+        serial_data = os.path.join(serial_dir, 'multiqc_data')
+        parallel_data = os.path.join(parallel_dir, 'multiqc_data')
+        data_files = sorted(fn for fn in os.listdir(serial_data) if fn.endswith('.txt'))
+        self.assertIn('multiqc_general_stats.txt', data_files)
+        with open(os.path.join(parallel_data, 'multiqc_general_stats.txt')) as fh:
+            self.assertIn('QualiMap_', fh.readline())
+        self.assertEqual(data_files, sorted(fn for fn in os.listdir(parallel_data) if fn.endswith('.txt')))
+        match, mismatch, errors = filecmp.cmpfiles(serial_data, parallel_data, data_files, shallow=False)
+        self.assertEqual(mismatch + errors, [])
+
+
+def module_level(x):
+    return x * 100
+
+
+def make_closure(factor):
+    return lambda x: x * factor
+
+
+class TestPackFunctions(unittest.TestCase):
+
+    def test_module_level(self):
+        """ Module-level functions are copied by module and name """
+        packed = parallel._pack_functions([{'modify': module_level, 'format': '{:,.0f}'}])
+        self.assertEqual(packed[0]['modify'].name, 'module_level')
+        unpacked = parallel._unpack_functions(pickle.loads(pickle.dumps(packed, 2)))
+        self.assertIs(unpacked[0]['modify'], module_level)
+        self.assertEqual(unpacked[0]['format'], '{:,.0f}')
+
+    def test_other_functions(self):
+        """ Lambdas, closures and nested functions can't be copied """
+        def nested(x):
+            return x
+        for func in [lambda x: x * 100, make_closure(100), nested]:
+            with self.assertRaises(TypeError):
+                parallel._pack_functions({'modify': func})
+
+    def test_missing_function(self):
+        packed = parallel._pack_functions((module_level, ))
+        packed[0].name = 'not_a_function'
+        with self.assertRaises(TypeError):
+            parallel._unpack_functions(packed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+""" Check when tables are drawn in the browser from the plot data.
+
+Usage: python -m unittest discover test
+"""
+
+from __future__ import print_function
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multiqc.plots import table
+from multiqc.utils import config, report
+
+
+class TestVirtualTables(unittest.TestCase):
+
+    def setUp(self):
+        self.old_simple_output = config.simple_output
+        self.old_html_ids = report.html_ids
+        report.html_ids = report.HtmlIds()
+        self.data = {'sample_{}'.format(i): {'reads': i * 1000, 'gc': 40 + i} for i in range(5)}
+
+    def tearDown(self):
+        config.simple_output = self.old_simple_output
+        report.html_ids = self.old_html_ids
+        report.plot_data.pop('test_virtual_table', None)
+
+    def test_virtual(self):
+        config.simple_output = False
+        html = table.plot(self.data, pconfig={'id': 'test_virtual_table', 'virtual': True})
+        self.assertIn('test_virtual_table', report.plot_data)
+        self.assertNotIn('sample_3', html)
+
+    def test_simple_output(self):
+        """ Simple reports don't load the JavaScript that draws virtual tables """
+        config.simple_output = True
+        html = table.plot(self.data, pconfig={'id': 'test_virtual_table', 'virtual': True})
+        self.assertNotIn('test_virtual_table', report.plot_data)
+        self.assertIn('sample_3', html)
+
+if __name__ == '__main__':
+    unittest.main()